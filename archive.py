@@ -0,0 +1,342 @@
+"""
+Transaction Archive
+===================
+Transactions is range-partitioned by month on created_at (migrations 002
+and 003), so queries with a date range only read the months they cover and
+old months can be moved out whole.
+
+- partitions are named pYYYYMM and hold created_at < the next month's start;
+  pmax catches anything beyond the last month created
+- add_partitions keeps MONTHS_AHEAD empty months ready by splitting pmax
+- archive_partitions moves every month older than KEEP_MONTHS (a "closed"
+  month, nothing is booked there any more) into TransactionsArchive, a
+  compressed table clustered by (account_id, created_at), then drops the
+  partition, which is instant however many rows it had
+- the archived rows of every account are also summed into ArchivedBalances,
+  so the ledger can be replayed from that carry-forward plus the live rows,
+  without reading the archive
+- ArchiveLog records each archived month; the newest range end is the
+  archive boundary: live queries only read rows at or after it, archive
+  queries only rows before it
+
+Moving a month is restartable. The copy is INSERT IGNORE in primary-key
+chunks, the carry-forward and the ArchiveLog row are written in one
+transaction (once per month), and because readers already stop at the
+boundary, the rows still in the partition until it is dropped are never
+counted twice.
+
+Example (e.g. nightly from cron):
+    python archive.py maintain --keep-months 12
+    python archive.py status
+"""
+
+import argparse
+import threading
+import time
+from datetime import datetime
+
+import pymysql
+
+ARCHIVE_TABLE = 'TransactionsArchive'
+
+# Months kept in the live table / empty months kept ready ahead of today
+KEEP_MONTHS = 12
+MONTHS_AHEAD = 3
+
+# Rows copied per archive transaction
+BATCH_SIZE = 5000
+
+# Seconds between ArchiveJob runs
+ARCHIVE_INTERVAL = 3600.0
+
+# Boundary while nothing is archived (earliest TIMESTAMP in any time zone).
+# ArchivedBalances and TransactionsArchive are empty then, or don't exist
+# yet (before migration 002), so callers skip them.
+NO_BOUNDARY = datetime(1970, 1, 2)
+
+# MySQL error for a missing table (ArchiveLog before migration 002)
+ER_NO_SUCH_TABLE = 1146
+
+# Signed amount of a Transactions row, as seen from its account
+SIGNED_AMOUNT = "CASE WHEN transaction_type IN ('WITHDRAW', 'TRANSFER_OUT') THEN -amount ELSE amount END"
+
+TRANSACTION_COLUMNS = "transaction_id, account_id, transaction_type, amount, created_at"
+
+# Live rows and archived rows as one table; the parameter is the boundary
+ARCHIVE_UNION = (
+    f"(SELECT {TRANSACTION_COLUMNS} FROM Transactions WHERE created_at >= %s"
+    f" UNION ALL SELECT {TRANSACTION_COLUMNS} FROM {ARCHIVE_TABLE})"
+)
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"p{month:%Y%m}"
+
+
+def _partition_definitions(months: list) -> str:
+    """Monthly partitions for the given month starts, then pmax"""
+    parts = [f"PARTITION {partition_name(month)} VALUES LESS THAN"
+             f" (UNIX_TIMESTAMP('{add_months(month, 1):%Y-%m-%d %H:%M:%S}'))" for month in months]
+    parts.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    return ", ".join(parts)
+
+
+def partition_bounds(cursor) -> list:
+    """
+    (name, less_than) of every Transactions partition in order; less_than is
+    None for pmax. Empty if the table is not partitioned.
+    """
+    # FROM_UNIXTIME on the server: the same time zone as the UNIX_TIMESTAMP() bounds
+    cursor.execute(
+        "SELECT PARTITION_NAME AS name,"
+        " IF(PARTITION_DESCRIPTION = 'MAXVALUE', NULL, FROM_UNIXTIME(PARTITION_DESCRIPTION)) AS less_than"
+        " FROM information_schema.PARTITIONS"
+        " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Transactions' AND PARTITION_NAME IS NOT NULL"
+        " ORDER BY PARTITION_ORDINAL_POSITION"
+    )
+    return [(row['name'], row['less_than']) for row in cursor.fetchall()]
+
+
+def partition_transactions(conn, months_ahead: int = MONTHS_AHEAD, now: datetime = None):
+    """
+    Partition Transactions by month, from its oldest row's month to
+    months_ahead months from now (rebuilds the table)
+    """
+    now = now or datetime.now()
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT MIN(created_at) AS oldest FROM Transactions")
+        oldest = cursor.fetchone()['oldest'] or now
+        month = month_start(oldest)
+        last = add_months(month_start(now), months_ahead)
+        months = []
+        while month <= last:
+            months.append(month)
+            month = add_months(month, 1)
+        cursor.execute("ALTER TABLE Transactions PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) ("
+                       + _partition_definitions(months) + ")")
+
+
+def add_partitions(conn, months_ahead: int = MONTHS_AHEAD, now: datetime = None) -> list:
+    """Split pmax so months up to months_ahead from now have their own partition; returns the names added"""
+    now = now or datetime.now()
+    with conn.cursor() as cursor:
+        bounded = [less_than for _, less_than in partition_bounds(cursor) if less_than is not None]
+        if not bounded:
+            return []
+        month = bounded[-1]
+        last = add_months(month_start(now), months_ahead)
+        months = []
+        while month <= last:
+            months.append(month)
+            month = add_months(month, 1)
+        if months:
+            cursor.execute("ALTER TABLE Transactions REORGANIZE PARTITION pmax INTO ("
+                           + _partition_definitions(months) + ")")
+    return [partition_name(month) for month in months]
+
+
+def archive_boundary(cursor) -> datetime:
+    """
+    Start of the live data: rows created before it are read from the archive
+
+    NO_BOUNDARY if nothing is archived, including before migration 002.
+    """
+    try:
+        cursor.execute("SELECT MAX(range_end) AS boundary FROM ArchiveLog")
+    except pymysql.MySQLError as e:
+        # a failed statement leaves the caller's transaction and snapshot intact
+        if e.args and e.args[0] == ER_NO_SUCH_TABLE:
+            return NO_BOUNDARY
+        raise
+    boundary = cursor.fetchone()['boundary']
+    return boundary or NO_BOUNDARY
+
+
+def _copy_partition(conn, name: str, batch_size: int) -> int:
+    """INSERT IGNORE the partition's rows into the archive in primary-key chunks"""
+    copied = 0
+    last_id = 0
+    while True:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT MAX(transaction_id) AS last_id FROM (SELECT transaction_id"
+                               f" FROM Transactions PARTITION ({name}) WHERE transaction_id > %s"
+                               f" ORDER BY transaction_id LIMIT %s) AS chunk", (last_id, batch_size))
+                chunk_end = cursor.fetchone()['last_id']
+                if chunk_end is None:
+                    conn.commit()
+                    return copied
+                copied += cursor.execute(
+                    f"INSERT IGNORE INTO {ARCHIVE_TABLE} ({TRANSACTION_COLUMNS})"
+                    f" SELECT {TRANSACTION_COLUMNS} FROM Transactions PARTITION ({name})"
+                    f" WHERE transaction_id > %s AND transaction_id <= %s",
+                    (last_id, chunk_end)
+                )
+            conn.commit()
+            last_id = chunk_end
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def _record_partition(conn, name: str, range_end: datetime) -> bool:
+    """
+    Add the partition's rows to ArchivedBalances and log it, in one
+    transaction; False if it was logged already
+    """
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT partition_name FROM ArchiveLog WHERE partition_name = %s FOR UPDATE", (name, ))
+            if cursor.fetchone() is not None:
+                conn.rollback()
+                return False
+            cursor.execute(
+                "INSERT INTO ArchivedBalances (account_id, amount, transactions, last_transaction_id)"
+                f" SELECT account_id, SUM({SIGNED_AMOUNT}), COUNT(*), MAX(transaction_id)"
+                f" FROM Transactions PARTITION ({name}) GROUP BY account_id"
+                " ON DUPLICATE KEY UPDATE amount = amount + VALUES(amount),"
+                " transactions = transactions + VALUES(transactions),"
+                " last_transaction_id = GREATEST(last_transaction_id, VALUES(last_transaction_id))"
+            )
+            cursor.execute(f"SELECT COUNT(*) AS count FROM Transactions PARTITION ({name})")
+            rows = cursor.fetchone()['count']
+            cursor.execute("INSERT INTO ArchiveLog (partition_name, range_end, rows_archived) VALUES (%s, %s, %s)",
+                           (name, range_end, rows))
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def archive_partitions(conn, keep_months: int = KEEP_MONTHS, batch_size: int = BATCH_SIZE,
+                       now: datetime = None) -> dict:
+    """
+    Move every month older than keep_months into the archive, oldest first
+
+    Returns:
+        dict with the partitions archived, rows copied, elapsed seconds and rows per second
+    """
+    cutoff = add_months(month_start(now or datetime.now()), -keep_months)
+    start = time.perf_counter()
+    archived = []
+    rows = 0
+    with conn.cursor() as cursor:
+        bounds = partition_bounds(cursor)
+    conn.commit()
+    for name, less_than in bounds:
+        if less_than is None or less_than > cutoff:
+            break
+        rows += _copy_partition(conn, name, batch_size)
+        _record_partition(conn, name, less_than)
+        with conn.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE Transactions DROP PARTITION {name}")
+        archived.append(name)
+
+    elapsed = time.perf_counter() - start
+    return {
+        'partitions': archived,
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def maintain(conn, keep_months: int = KEEP_MONTHS, months_ahead: int = MONTHS_AHEAD,
+             batch_size: int = BATCH_SIZE) -> dict:
+    """Add the coming months' partitions, then archive the closed ones"""
+    added = add_partitions(conn, months_ahead)
+    result = archive_partitions(conn, keep_months, batch_size)
+    result['added'] = added
+    return result
+
+
+class ArchiveJob(threading.Thread):
+    """Background thread that runs maintain() every interval seconds"""
+
+    def __init__(self, connect, keep_months: int = KEEP_MONTHS, months_ahead: int = MONTHS_AHEAD,
+                 interval: float = ARCHIVE_INTERVAL):
+        """
+        Args:
+            connect: callable returning a new pymysql connection
+        """
+        super().__init__(name="archive-job", daemon=True)
+        self.connect = connect
+        self.keep_months = keep_months
+        self.months_ahead = months_ahead
+        self.interval = interval
+        self.archived = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            conn = self.connect()
+            try:
+                result = maintain(conn, self.keep_months, self.months_ahead)
+                self.archived += result['rows']
+            except pymysql.MySQLError as e:
+                # the next run picks up where this one stopped
+                print(f"Archive job: run failed, retrying later: {e}")
+            finally:
+                conn.close()
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        """Let a running pass finish and wait for the thread to exit"""
+        self._stop_event.set()
+        self.join()
+
+
+def print_status(conn):
+    """Live partitions with their (estimated) row counts, and the archive totals"""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT PARTITION_NAME AS name, TABLE_ROWS AS estimated_rows FROM information_schema.PARTITIONS"
+            " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Transactions' AND PARTITION_NAME IS NOT NULL"
+            " ORDER BY PARTITION_ORDINAL_POSITION"
+        )
+        partitions = cursor.fetchall()
+        boundary = archive_boundary(cursor)
+        cursor.execute("SELECT COUNT(*) AS months, COALESCE(SUM(rows_archived), 0) AS rows_archived FROM ArchiveLog")
+        archived = cursor.fetchone()
+    conn.commit()
+
+    print(f"Archive boundary: {boundary if boundary != NO_BOUNDARY else '(nothing archived)'}")
+    print(f"Archived:         {archived['months']} month(s), {archived['rows_archived']:,} rows")
+    for partition in partitions:
+        print(f"  {partition['name']:<10}{partition['estimated_rows']:>14,} rows (estimate)")
+
+
+if __name__ == "__main__":
+    import test_acid
+
+    parser = argparse.ArgumentParser(description="Monthly Transactions partitions and the archive")
+    commands = parser.add_subparsers(dest='command', required=True)
+    maintain_parser = commands.add_parser('maintain', help="add coming partitions, archive closed months")
+    maintain_parser.add_argument('--keep-months', type=int, default=KEEP_MONTHS)
+    maintain_parser.add_argument('--ahead', type=int, default=MONTHS_AHEAD, help="empty months kept ready")
+    maintain_parser.add_argument('--batch', type=int, default=BATCH_SIZE, help="rows per copy transaction")
+    commands.add_parser('status', help="show partitions and archive totals")
+    options = parser.parse_args()
+
+    conn = test_acid.get_connection()
+    try:
+        if options.command == 'maintain':
+            result = maintain(conn, options.keep_months, options.ahead, options.batch)
+            print(f"Added partitions:    {', '.join(result['added']) or '-'}")
+            print(f"Archived partitions: {', '.join(result['partitions']) or '-'}")
+            print(f"Rows moved:          {result['rows']:,} in {result['seconds']:.2f}s "
+                  f"= {result['rows_per_second']:,.0f} rows/second")
+        else:
+            print_status(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,231 @@
+"""
+Asyncio Stress Engine
+=====================
+Simulates thousands of concurrent customers without thousands of threads.
+
+Each customer is a coroutine on one asyncio event loop: it picks an
+operation, hands it to the database, then "thinks" for a random time
+before the next one. Only `connections` threads ever talk to MySQL: the
+operations run on a ThreadPoolExecutor whose threads each own one pooled
+connection (pymysql is blocking, so these threads are the dedicated I/O
+threads). A customer whose operation is waiting for a free connection costs
+a coroutine, not a thread, so the client side stays cheap while the server
+sees exactly `connections` concurrent sessions.
+
+The operations are the same banking_ops calls (with deadlock retry) that
+test_acid.py runs, and the run ends with test_acid.verify_consistency().
+
+Example:
+    python async_stress.py --clients 5000 --connections 64 --think 0.05
+"""
+
+import argparse
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import banking_ops
+import test_acid
+from metrics import OpTimer, StressRecorder, print_report, write_results
+from reserves import ReserveAggregator, ReserveCounter
+from retry import RetryStats, run_with_retry
+from workload import AccountChooser, load_test_accounts, make_amount
+
+NUM_CLIENTS = 1000
+NUM_CONNECTIONS = 32
+OPERATIONS_PER_CLIENT = 5
+
+# Mean think time between a client's operations (seconds, exponential)
+THINK_TIME = 0.01
+
+
+class ConnectionThreads:
+    """
+    ThreadPoolExecutor whose threads each check out one pooled connection
+    the first time they run an operation and keep it until close()
+    """
+
+    def __init__(self, pool, size: int, journal: bool = False):
+        self.pool = pool
+        self.journal = journal
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="db-io")
+        self._local = threading.local()
+        self._held = []
+        self._lock = threading.Lock()
+
+    def _session(self):
+        """(connection, ReserveCounter) owned by the calling executor thread"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            conn = self.pool.acquire()
+            with self._lock:
+                self._held.append(conn)
+            with conn.cursor() as cursor:
+                reserves = ReserveCounter.load(cursor, journal=self.journal)
+            session = self._local.session = (conn, reserves)
+        return session
+
+    def run(self, operation: str, args: tuple, mode: str, retry_stats: RetryStats):
+        """Executor side: one banking operation on this thread's connection"""
+        conn, reserves = self._session()
+        timer = OpTimer()
+        if operation == 'transfer':
+            run_with_retry(banking_ops.transfer, conn, *args, mode=mode, timer=timer,
+                           operation=operation, stats=retry_stats)
+        else:
+            func = banking_ops.deposit if operation == 'deposit' else banking_ops.withdraw
+            run_with_retry(func, conn, reserves, *args, mode=mode, timer=timer,
+                           operation=operation, stats=retry_stats)
+        return timer
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for conn in self._held:
+            self.pool.release(conn)
+        self._held = []
+
+
+async def client(client_id: int, test_type: str, threads: ConnectionThreads, chooser: AccountChooser,
+                 operations: int, think_time: float, stats: dict):
+    """One logical customer: `operations` operations separated by think time"""
+    loop = asyncio.get_running_loop()
+    transfer_amount = make_amount(test_acid.TRANSFER_AMOUNTS)
+    cash_amount = make_amount(test_acid.DEPOSIT_WITHDRAW_AMOUNTS)
+
+    # spread the first requests out instead of starting every client at once
+    await asyncio.sleep(random.uniform(0, think_time))
+    for _ in range(operations):
+        if test_type == 'transfer':
+            operation = 'transfer'
+            args = chooser.pick_pair() + (transfer_amount(), )
+        else:
+            operation = random.choice(['deposit', 'withdraw'])
+            args = (chooser.pick(), cash_amount())
+
+        started = time.perf_counter()
+        try:
+            timer = await loop.run_in_executor(threads.executor, threads.run, operation, args,
+                                               test_acid.EXECUTION_MODE, stats['retry_stats'])
+            stats['success'] += 1
+        except banking_ops.BankingError:
+            # rejected by a business rule (e.g. insufficient funds), already rolled back
+            stats['rejected'] += 1
+        except Exception:
+            stats['failure'] += 1
+        else:
+            # includes the time spent waiting for a free connection thread
+            stats['recorder'].record(operation, time.perf_counter() - started, timer.lock_wait,
+                                     lock_hold=timer.lock_hold)
+        if think_time > 0:
+            await asyncio.sleep(random.expovariate(1.0 / think_time))
+
+
+async def _run_clients(test_type: str, num_clients: int, threads: ConnectionThreads, accounts: list,
+                       operations: int, think_time: float, stats: dict):
+    await asyncio.gather(*(
+        client(i, test_type, threads, AccountChooser(accounts, test_acid.ACCOUNT_DISTRIBUTION, i),
+               operations, think_time, stats)
+        for i in range(num_clients)
+    ))
+
+
+def run_async_stress_test(test_type: str, num_clients: int = NUM_CLIENTS,
+                          num_connections: int = NUM_CONNECTIONS,
+                          operations: int = OPERATIONS_PER_CLIENT, think_time: float = THINK_TIME) -> dict:
+    """
+    Run num_clients coroutine customers over num_connections connections
+
+    Args:
+        test_type: 'transfer' or 'deposit_withdraw'
+
+    Returns:
+        dict with the same keys as test_acid.run_stress_test's summary
+    """
+    print(f"\n{'='*60}")
+    print(f"Running async {test_type.upper()} stress test")
+    print(f"Clients: {num_clients}, Connections: {num_connections}, "
+          f"Operations per client: {operations}, Think time: {think_time * 1000:.0f} ms")
+    print(f"Account distribution: {test_acid.ACCOUNT_DISTRIBUTION}")
+    print(f"Execution mode: {test_acid.EXECUTION_MODE}, "
+          f"Reserve journal mode: {'on' if test_acid.RESERVE_JOURNAL else 'off'}")
+    print(f"{'='*60}\n")
+
+    pool = test_acid.get_pool()
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            accounts = load_test_accounts(cursor)
+
+    aggregator = None
+    if test_acid.RESERVE_JOURNAL:
+        aggregator = ReserveAggregator(test_acid.get_connection)
+        aggregator.start()
+
+    # the event loop is single-threaded, so plain counters are safe here
+    stats = {'success': 0, 'failure': 0, 'rejected': 0,
+             'retry_stats': RetryStats(), 'recorder': StressRecorder()}
+    threads = ConnectionThreads(pool, num_connections, test_acid.RESERVE_JOURNAL)
+    start_time = time.time()
+    try:
+        asyncio.run(_run_clients(test_type, num_clients, threads, accounts, operations, think_time, stats))
+    finally:
+        threads.close()
+    end_time = time.time()
+    elapsed_time = end_time - start_time
+
+    if aggregator is not None:
+        aggregator.stop()
+        print(f"Reserve aggregator folded {aggregator.folded} deltas")
+
+    retries = stats['retry_stats'].summary()
+    latency = stats['recorder'].report(start_time, end_time)
+    throughput = stats['success'] / elapsed_time if elapsed_time > 0 else 0.0
+    print(f"Completed in {elapsed_time:.2f} seconds")
+    print(f"Successful transactions: {stats['success']}")
+    print(f"Rejected by business rules (e.g. insufficient funds): {stats['rejected']}")
+    print(f"Failed transactions: {stats['failure']} (gave up on deadlock/lock wait: {retries['failures']})")
+    print(f"Retries (deadlock / lock wait timeout): {retries['retries']}")
+    print(f"Throughput: {throughput:.1f} committed transactions/second")
+    print_report(latency)
+    print("(latency includes waiting for a free connection thread)")
+
+    summary = {
+        'run_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(start_time)),
+        'test_type': f'async-{test_type}',
+        'threads': num_connections,
+        'clients': num_clients,
+        'execution_mode': test_acid.EXECUTION_MODE,
+        'distribution': test_acid.ACCOUNT_DISTRIBUTION,
+        'elapsed': elapsed_time,
+        'success': stats['success'],
+        'failure': stats['failure'],
+        'rejected': stats['rejected'],
+        'retries': retries,
+        'throughput': throughput,
+        'pool': pool.stats(),
+        'latency': latency
+    }
+    if test_acid.RESULTS_FILE:
+        write_results(test_acid.RESULTS_FILE, summary)
+        print(f"Results written to {test_acid.RESULTS_FILE}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Asyncio stress test: many logical clients, few connections")
+    parser.add_argument('--test', choices=['transfer', 'deposit_withdraw'], default='transfer')
+    parser.add_argument('--clients', type=int, default=NUM_CLIENTS)
+    parser.add_argument('--connections', type=int, default=NUM_CONNECTIONS)
+    parser.add_argument('--operations', type=int, default=OPERATIONS_PER_CLIENT,
+                        help="operations per client")
+    parser.add_argument('--think', type=float, default=THINK_TIME,
+                        help="mean think time between a client's operations, in seconds")
+    options = parser.parse_args()
+    if options.connections > test_acid.POOL_MAX_SIZE:
+        parser.error(f"--connections must not exceed test_acid.POOL_MAX_SIZE ({test_acid.POOL_MAX_SIZE})")
+
+    test_acid.setup_test_accounts()
+    run_async_stress_test(options.test, options.clients, options.connections,
+                          options.operations, options.think)
+    test_acid.verify_consistency()
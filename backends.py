@@ -0,0 +1,453 @@
+"""
+Storage Backends
+================
+One interface over the database engines the banking operations can run on,
+so benchmarks can compare engines and run without a MySQL server.
+
+- StorageBackend: an engine; hands out sessions, seeds test accounts and
+  reports the totals the consistency check compares
+- BackendSession: one connection's worth of banking operations
+  (open_account, deposit, withdraw, transfer, balance, reserves_total,
+  statement_page), each write in its own transaction
+
+Backends:
+- MySQLBackend: the existing code path (banking_ops over a ConnectionPool,
+  striped / journaled reserves, any banking_ops execution mode)
+- SQLiteBackend: embedded SQLite in WAL mode; every write is one
+  BEGIN IMMEDIATE transaction, which takes the database's single write lock
+  up front instead of upgrading a read lock later (so writers queue on the
+  busy timeout instead of failing with SQLITE_BUSY deadlocks)
+- MemoryBackend: the in-process ledger.MemoryLedger, an upper bound with
+  no storage engine at all
+
+Business rule violations raise banking_ops.BankingError on every backend.
+"""
+
+import os
+import sqlite3
+from contextlib import contextmanager
+
+import banking_ops
+from db_pool import ConnectionPool
+from ledger import MemoryLedger
+from metrics import locking, released
+from reserves import BRANCH_ID, ReserveCounter
+from seed import seed_accounts
+from workload import load_test_accounts
+
+SQLITE_SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'init_db_sqlite.sql')
+SQLITE_PATH = 'banking.sqlite3'
+
+# Seconds a SQLite writer waits for the write lock before giving up
+SQLITE_BUSY_TIMEOUT = 30.0
+
+
+def to_cents(amount) -> int:
+    return int(round(float(amount) * 100))
+
+
+class BackendSession:
+    """Banking operations on one connection of a backend"""
+
+    def open_account(self, customer_name: str, tax_id: str, initial_deposit: float) -> int:
+        raise NotImplementedError
+
+    def deposit(self, account_id: int, amount: float, timer=None):
+        raise NotImplementedError
+
+    def withdraw(self, account_id: int, amount: float, timer=None):
+        raise NotImplementedError
+
+    def transfer(self, from_account: int, to_account: int, amount: float, timer=None):
+        raise NotImplementedError
+
+    def balance(self, account_id: int):
+        """Current balance as a float, or None if the account does not exist"""
+        raise NotImplementedError
+
+    def reserves_total(self) -> float:
+        raise NotImplementedError
+
+    def statement_page(self, page_size: int, after=None) -> list:
+        """Same rows and keyset semantics as banking_ops.list_transactions_page"""
+        raise NotImplementedError
+
+
+class StorageBackend:
+    """A database engine the banking operations can run on"""
+
+    name = None
+
+    @contextmanager
+    def session(self):
+        """with backend.session() as session: ... (one connection, one thread)"""
+        raise NotImplementedError
+        yield
+
+    def setup_test_accounts(self, num_accounts: int, initial_balance: float, reserve_slots: int = 1):
+        """Replace all data with num_accounts 'Test' accounts and a matching reserve"""
+        raise NotImplementedError
+
+    def test_accounts(self) -> list:
+        """Account ids of the test accounts"""
+        raise NotImplementedError
+
+    def totals(self) -> tuple:
+        """(sum of test account balances, bank reserve) for the consistency check"""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """Engine-specific counters for the run summary"""
+        return {}
+
+    def close(self):
+        pass
+
+
+class MySQLSession(BackendSession):
+    """banking_ops on one pooled MySQL connection"""
+
+    def __init__(self, connection, reserves: ReserveCounter, mode: str = banking_ops.CLIENT):
+        self.connection = connection
+        self.reserves = reserves
+        self.mode = mode
+
+    def open_account(self, customer_name, tax_id, initial_deposit):
+        return banking_ops.open_account(self.connection, self.reserves, customer_name, tax_id, initial_deposit)
+
+    def deposit(self, account_id, amount, timer=None):
+        banking_ops.deposit(self.connection, self.reserves, account_id, amount, mode=self.mode, timer=timer)
+
+    def withdraw(self, account_id, amount, timer=None):
+        banking_ops.withdraw(self.connection, self.reserves, account_id, amount, mode=self.mode, timer=timer)
+
+    def transfer(self, from_account, to_account, amount, timer=None):
+        banking_ops.transfer(self.connection, from_account, to_account, amount, mode=self.mode, timer=timer)
+
+    def balance(self, account_id):
+        balance = banking_ops.get_balance(self.connection, account_id)
+        self.connection.commit()    # end the read snapshot
+        return None if balance is None else float(balance)
+
+    def reserves_total(self):
+        with self.connection.cursor() as cursor:
+            total = self.reserves.total(cursor)
+        self.connection.commit()
+        return total
+
+    def statement_page(self, page_size, after=None):
+        rows = banking_ops.list_transactions_page(self.connection, page_size, after)
+        self.connection.commit()
+        return rows
+
+
+class MySQLBackend(StorageBackend):
+    """The MySQL server configured in DB_CONFIG, through a ConnectionPool"""
+
+    name = 'mysql'
+
+    def __init__(self, config: dict, max_connections: int = 10, mode: str = banking_ops.CLIENT,
+                 journal: bool = False):
+        self.config = config
+        self.mode = mode
+        self.journal = journal
+        self.pool = ConnectionPool(config, min_size=0, max_size=max_connections)
+
+    @contextmanager
+    def session(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                reserves = ReserveCounter.load(cursor, journal=self.journal)
+            yield MySQLSession(conn, reserves, self.mode)
+
+    def setup_test_accounts(self, num_accounts, initial_balance, reserve_slots=1):
+        with self.pool.connection() as conn:
+            seed_accounts(conn, num_accounts, initial_balance, reserve_slots)
+
+    def test_accounts(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                return load_test_accounts(cursor)
+
+    def totals(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT SUM(a.balance) AS total FROM Accounts a"
+                               " JOIN Customers c ON c.customer_id = a.customer_id WHERE c.name LIKE 'Test%'")
+                accounts = float(cursor.fetchone()['total'] or 0)
+                reserves = ReserveCounter.load(cursor).total(cursor) or 0.0
+            conn.commit()
+        return accounts, reserves
+
+    def stats(self):
+        return self.pool.stats()
+
+    def close(self):
+        self.pool.close()
+
+
+class SQLiteSession(BackendSession):
+    """Banking operations on one SQLite connection (autocommit, explicit BEGIN IMMEDIATE)"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    @contextmanager
+    def _write(self, timer=None):
+        """BEGIN IMMEDIATE ... COMMIT, rolled back on any exception"""
+        with locking(timer):
+            self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.connection
+            self.connection.execute("COMMIT")
+            released(timer)
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            released(timer)
+            raise
+
+    @staticmethod
+    def _balance_cents(conn, account_id: int) -> int:
+        row = conn.execute("SELECT balance_cents FROM Accounts WHERE account_id = ?", (account_id, )).fetchone()
+        if row is None:
+            raise banking_ops.BankingError("No account found.")
+        return row['balance_cents']
+
+    @staticmethod
+    def _book(conn, account_id: int, transaction_type: str, cents: int, balance_change: int):
+        conn.execute("UPDATE Accounts SET balance_cents = balance_cents + ?,"
+                     " updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE account_id = ?",
+                     (balance_change, account_id))
+        conn.execute("INSERT INTO Transactions (account_id, transaction_type, amount_cents) VALUES (?, ?, ?)",
+                     (account_id, transaction_type, cents))
+
+    @staticmethod
+    def _add_reserve(conn, cents: int):
+        conn.execute("UPDATE BankReserves SET total_reserve_cents = total_reserve_cents + ?"
+                     " WHERE branch_id = ? AND slot_id = 0", (cents, BRANCH_ID))
+
+    @staticmethod
+    def _positive_cents(amount) -> int:
+        cents = to_cents(amount)
+        if cents <= 0:
+            raise banking_ops.BankingError("Amount must be positive number")
+        return cents
+
+    def open_account(self, customer_name, tax_id, initial_deposit):
+        cents = to_cents(initial_deposit)
+        with self._write() as conn:
+            row = conn.execute("SELECT customer_id FROM Customers WHERE tax_id = ?", (tax_id, )).fetchone()
+            if row is None:
+                customer_id = conn.execute("INSERT INTO Customers (name, tax_id) VALUES (?, ?)",
+                                           (customer_name, tax_id)).lastrowid
+            else:
+                customer_id = row['customer_id']
+            account_id = conn.execute("INSERT INTO Accounts (customer_id, balance_cents) VALUES (?, 0)",
+                                      (customer_id, )).lastrowid
+            if cents > 0:
+                self._book(conn, account_id, 'OPEN_ACCOUNT', cents, cents)
+                self._add_reserve(conn, cents)
+        return account_id
+
+    def deposit(self, account_id, amount, timer=None):
+        cents = self._positive_cents(amount)
+        with self._write(timer) as conn:
+            self._balance_cents(conn, account_id)
+            self._book(conn, account_id, 'DEPOSIT', cents, cents)
+            self._add_reserve(conn, cents)
+
+    def withdraw(self, account_id, amount, timer=None):
+        cents = self._positive_cents(amount)
+        with self._write(timer) as conn:
+            if self._balance_cents(conn, account_id) < cents:
+                raise banking_ops.BankingError("Insufficient funds.")
+            self._book(conn, account_id, 'WITHDRAW', cents, -cents)
+            self._add_reserve(conn, -cents)
+
+    def transfer(self, from_account, to_account, amount, timer=None):
+        cents = self._positive_cents(amount)
+        if from_account == to_account:
+            raise banking_ops.BankingError("Can't transfer to the same Account ID")
+        with self._write(timer) as conn:
+            balance = self._balance_cents(conn, from_account)
+            self._balance_cents(conn, to_account)
+            if balance < cents:
+                raise banking_ops.BankingError("Insufficient funds.")
+            self._book(conn, from_account, 'TRANSFER_OUT', cents, -cents)
+            self._book(conn, to_account, 'TRANSFER_IN', cents, cents)
+
+    def balance(self, account_id):
+        row = self.connection.execute("SELECT balance_cents FROM Accounts WHERE account_id = ?",
+                                      (account_id, )).fetchone()
+        return None if row is None else row['balance_cents'] / 100.0
+
+    def reserves_total(self):
+        row = self.connection.execute("SELECT SUM(total_reserve_cents) AS total FROM BankReserves"
+                                      " WHERE branch_id = ?", (BRANCH_ID, )).fetchone()
+        return None if row['total'] is None else row['total'] / 100.0
+
+    def statement_page(self, page_size, after=None):
+        sql = ("SELECT c.name AS CustomerName, t.account_id AS AccountID, t.transaction_type AS Type,"
+               " t.amount_cents / 100.0 AS Amount, t.created_at AS Date, t.transaction_id AS TransactionID"
+               " FROM Transactions t"
+               " JOIN Accounts a ON t.account_id = a.account_id"
+               " JOIN Customers c ON a.customer_id = c.customer_id")
+        params = []
+        if after is not None:
+            sql += " WHERE t.created_at < ? OR (t.created_at = ? AND t.transaction_id < ?)"
+            params = [after[0], after[0], after[1]]
+        sql += " ORDER BY t.created_at DESC, t.transaction_id DESC LIMIT ?"
+        params.append(page_size)
+        return [dict(row) for row in self.connection.execute(sql, params).fetchall()]
+
+
+class SQLiteBackend(StorageBackend):
+    """Embedded SQLite database file in WAL mode; no server needed"""
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = SQLITE_PATH, busy_timeout: float = SQLITE_BUSY_TIMEOUT):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        conn = self._connect()
+        try:
+            # WAL: readers never block the writer and vice versa; persists in the file
+            conn.execute("PRAGMA journal_mode = WAL")
+            with open(SQLITE_SCHEMA_FILE) as f:
+                conn.executescript(f.read())
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # isolation_level=None: no implicit transactions, the session issues BEGIN itself
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        # WAL + NORMAL: commits survive a crash of the process, not of the OS
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    @contextmanager
+    def session(self):
+        conn = self._connect()
+        try:
+            yield SQLiteSession(conn)
+        finally:
+            conn.close()
+
+    def setup_test_accounts(self, num_accounts, initial_balance, reserve_slots=1):
+        # reserve_slots is ignored: SQLite has one writer at a time, striping buys nothing
+        cents = to_cents(initial_balance)
+        conn = self._connect()
+        try:
+            # same layout as seed.seed_accounts: ids 1..n, one OPEN_ACCOUNT row each
+            conn.execute("BEGIN IMMEDIATE")
+            for table in ('Transactions', 'Accounts', 'Customers'):
+                conn.execute(f"DELETE FROM {table}")
+            conn.execute("DELETE FROM sqlite_sequence")
+            ids = range(num_accounts)
+            conn.executemany("INSERT INTO Customers (customer_id, name, tax_id) VALUES (?, ?, ?)",
+                             ((i + 1, f"TestUser{i}", f"TEST{i:04d}") for i in ids))
+            conn.executemany("INSERT INTO Accounts (account_id, customer_id, balance_cents) VALUES (?, ?, ?)",
+                             ((i + 1, i + 1, cents) for i in ids))
+            if cents > 0:
+                conn.executemany("INSERT INTO Transactions (transaction_id, account_id, transaction_type,"
+                                 " amount_cents) VALUES (?, ?, 'OPEN_ACCOUNT', ?)",
+                                 ((i + 1, i + 1, cents) for i in ids))
+            conn.execute("DELETE FROM BankReserves WHERE branch_id = ?", (BRANCH_ID, ))
+            conn.execute("INSERT INTO BankReserves (branch_id, slot_id, total_reserve_cents) VALUES (?, 0, ?)",
+                         (BRANCH_ID, num_accounts * cents))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def test_accounts(self):
+        conn = self._connect()
+        try:
+            return load_test_accounts(conn.cursor())
+        finally:
+            conn.close()
+
+    def totals(self):
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT (SELECT SUM(a.balance_cents) FROM Accounts a JOIN Customers c"
+                " ON c.customer_id = a.customer_id WHERE c.name LIKE 'Test%') AS accounts,"
+                " (SELECT SUM(total_reserve_cents) FROM BankReserves WHERE branch_id = ?) AS reserves",
+                (BRANCH_ID, )
+            ).fetchone()
+        finally:
+            conn.close()
+        return (row['accounts'] or 0) / 100.0, (row['reserves'] or 0) / 100.0
+
+
+class MemorySession(BackendSession):
+    """Operations straight on the shared MemoryLedger (it does its own locking)"""
+
+    def __init__(self, ledger: MemoryLedger):
+        self.ledger = ledger
+
+    def open_account(self, customer_name, tax_id, initial_deposit):
+        return self.ledger.open_account(customer_name, tax_id, initial_deposit)
+
+    def deposit(self, account_id, amount, timer=None):
+        self.ledger.deposit(account_id, amount, timer=timer)
+
+    def withdraw(self, account_id, amount, timer=None):
+        self.ledger.withdraw(account_id, amount, timer=timer)
+
+    def transfer(self, from_account, to_account, amount, timer=None):
+        self.ledger.transfer(from_account, to_account, amount, timer=timer)
+
+    def balance(self, account_id):
+        return self.ledger.balance(account_id)
+
+    def reserves_total(self):
+        return self.ledger.reserves_total()
+
+    def statement_page(self, page_size, after=None):
+        return self.ledger.statement_page(page_size, after)
+
+
+class MemoryBackend(StorageBackend):
+    """In-process MemoryLedger; its data lives as long as the backend object"""
+
+    name = 'memory'
+
+    def __init__(self, ledger: MemoryLedger = None):
+        self.ledger = ledger or MemoryLedger()
+
+    @contextmanager
+    def session(self):
+        yield MemorySession(self.ledger)
+
+    def setup_test_accounts(self, num_accounts, initial_balance, reserve_slots=1):
+        # the ledger's reserve is sharded by its lock stripes, reserve_slots is ignored
+        self.ledger.reset()
+        self.ledger.create_accounts([(f"TestUser{i}", f"TEST{i:04d}") for i in range(num_accounts)],
+                                    to_cents(initial_balance))
+
+    def test_accounts(self):
+        return [account_id for account_id in range(1, self.ledger.account_count + 1)
+                if self.ledger.customer_name(account_id).startswith('Test')]
+
+    def totals(self):
+        accounts, reserves = self.ledger.snapshot_totals(self.test_accounts())
+        return accounts / 100.0, reserves / 100.0
+
+
+BACKENDS = ('mysql', 'sqlite', 'memory')
+
+
+def create_backend(name: str, config: dict = None, max_connections: int = 10,
+                   mode: str = banking_ops.CLIENT, journal: bool = False, path: str = SQLITE_PATH):
+    """Backend by name ('mysql' needs config, 'sqlite' a database file path, 'memory' nothing)"""
+    if name == 'mysql':
+        return MySQLBackend(config, max_connections=max_connections, mode=mode, journal=journal)
+    if name == 'sqlite':
+        return SQLiteBackend(path)
+    if name == 'memory':
+        return MemoryBackend()
+    raise ValueError(f"Unknown backend '{name}' (expected one of {', '.join(BACKENDS)})")
@@ -0,0 +1,223 @@
+"""
+Balance History
+===============
+Past balances without replaying an account's whole history.
+
+- take_snapshot: copies every account's balance into BalanceSnapshots,
+  together with the id of the account's last transaction the copied
+  balance includes; run it periodically (e.g. nightly from cron)
+- balance_as_of: nearest snapshot at or before the requested time, plus
+  only the transactions after it
+- account_statement: one account's transactions in a date range with a
+  running balance (a window function over the idx_transactions_account_created
+  range), opening from balance_as_of instead of from the first transaction
+
+Once months have been archived (archive.py), live rows start at the archive
+boundary: balance_as_of opens from ArchivedBalances when no snapshot is
+newer than the boundary, and reads TransactionsArchive only for a time
+before it. account_statement reads the archive only with include_archive.
+
+A snapshot is read at one consistent snapshot (non-locking), so it can run
+during normal traffic. Replay after a snapshot is keyed on transaction_id,
+not time: every write locks the account row before inserting its
+Transactions rows, so per account, ids grow in commit order and "id > the
+snapshot's last id" is exactly the set of transactions the snapshot missed.
+
+Examples:
+    python balance_history.py snapshot
+    python balance_history.py as-of 42 "2026-09-30 23:59:59"
+    python balance_history.py statement 42 2026-09-01 2026-10-01
+    python balance_history.py statement 42 2024-01-01 2024-02-01 --archive
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from archive import ARCHIVE_TABLE, ARCHIVE_UNION, NO_BOUNDARY, SIGNED_AMOUNT, archive_boundary
+
+# Accounts copied per INSERT during a snapshot
+SNAPSHOT_CHUNK_SIZE = 1000
+
+
+def take_snapshot(conn, chunk_size: int = SNAPSHOT_CHUNK_SIZE) -> dict:
+    """
+    Record every account's current balance in BalanceSnapshots
+
+    Returns:
+        dict with the snapshot time and the number of accounts recorded
+    """
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+            cursor.execute("SELECT NOW(6) AS snapshot_at")
+            snapshot_at = cursor.fetchone()['snapshot_at']
+            last_live_id = "(SELECT MAX(t.transaction_id) FROM Transactions t WHERE t.account_id = a.account_id)"
+            if archive_boundary(cursor) == NO_BOUNDARY:
+                last_id_sql = last_live_id
+            else:
+                # an account whose rows are all archived: its newest archived id
+                last_id_sql = (f"COALESCE({last_live_id}, (SELECT ab.last_transaction_id FROM ArchivedBalances ab"
+                               " WHERE ab.account_id = a.account_id))")
+
+            accounts = 0
+            last_id = 0
+            while True:
+                # balances and last transaction ids from the same snapshot
+                cursor.execute(
+                    f"SELECT a.account_id, a.balance, {last_id_sql} AS last_transaction_id"
+                    " FROM Accounts a WHERE a.account_id > %s ORDER BY a.account_id LIMIT %s",
+                    (last_id, chunk_size)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                cursor.executemany(
+                    "INSERT INTO BalanceSnapshots (account_id, snapshot_at, balance, last_transaction_id)"
+                    " VALUES (%s, %s, %s, %s)",
+                    [(r['account_id'], snapshot_at, r['balance'], r['last_transaction_id'] or 0) for r in rows]
+                )
+                accounts += len(rows)
+                last_id = rows[-1]['account_id']
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {'snapshot_at': snapshot_at, 'accounts': accounts}
+
+
+def balance_as_of(conn, account_id: int, as_of) -> Decimal:
+    """
+    Balance of the account including every transaction created at or before
+    as_of, or None if the account does not exist
+
+    Starts from the latest snapshot taken at or before as_of and replays only
+    the account's transactions recorded after it. If that snapshot predates
+    the archive boundary, the account's archived carry-forward replaces it.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT account_id FROM Accounts WHERE account_id = %s", (account_id, ))
+        if cursor.fetchone() is None:
+            return None
+
+        boundary = archive_boundary(cursor)
+        cursor.execute(
+            "SELECT balance, last_transaction_id, snapshot_at FROM BalanceSnapshots"
+            " WHERE account_id = %s AND snapshot_at <= %s ORDER BY snapshot_at DESC LIMIT 1",
+            (account_id, as_of)
+        )
+        snapshot = cursor.fetchone()
+
+        if as_of < boundary:
+            # everything up to as_of is archived: replay from the archive only
+            opening = snapshot['balance'] if snapshot else Decimal('0.00')
+            cursor.execute(
+                f"SELECT COALESCE(SUM({SIGNED_AMOUNT}), 0) AS replayed FROM {ARCHIVE_TABLE}"
+                " WHERE account_id = %s AND transaction_id > %s AND created_at <= %s",
+                (account_id, snapshot['last_transaction_id'] if snapshot else 0, as_of)
+            )
+        elif snapshot and snapshot['snapshot_at'] >= boundary:
+            # range scan of the account_id index (InnoDB appends transaction_id to it)
+            opening = snapshot['balance']
+            cursor.execute(
+                f"SELECT COALESCE(SUM({SIGNED_AMOUNT}), 0) AS replayed FROM Transactions"
+                " WHERE account_id = %s AND transaction_id > %s AND created_at <= %s",
+                (account_id, snapshot['last_transaction_id'], as_of)
+            )
+        else:
+            # archived carry-forward, then the live rows (pruned to the live months)
+            carried = None
+            if boundary != NO_BOUNDARY:
+                cursor.execute("SELECT amount FROM ArchivedBalances WHERE account_id = %s", (account_id, ))
+                carried = cursor.fetchone()
+            opening = carried['amount'] if carried else Decimal('0.00')
+            cursor.execute(
+                f"SELECT COALESCE(SUM({SIGNED_AMOUNT}), 0) AS replayed FROM Transactions"
+                " WHERE account_id = %s AND created_at >= %s AND created_at <= %s",
+                (account_id, boundary, as_of)
+            )
+        return opening + cursor.fetchone()['replayed']
+
+
+def account_statement(conn, account_id: int, start, end, include_archive: bool = False) -> list:
+    """
+    Transactions of one account with start <= created_at < end, oldest
+    first, each with the balance right after it (RunningBalance)
+
+    Only live months are read (the created_at range prunes the partitions)
+    unless include_archive is set; without it the statement starts at the
+    archive boundary at the earliest.
+    """
+    with conn.cursor() as cursor:
+        boundary = archive_boundary(cursor)
+    source, source_args = "Transactions", []
+    if include_archive and start < boundary:
+        source, source_args = ARCHIVE_UNION + " AS t", [boundary]
+    else:
+        start = max(start, boundary)
+
+    opening = balance_as_of(conn, account_id, start - timedelta(microseconds=1))
+    if opening is None:
+        return []
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT transaction_id AS TransactionID, transaction_type AS Type, amount AS Amount,"
+            " created_at AS Date,"
+            f" %s + SUM({SIGNED_AMOUNT}) OVER (ORDER BY created_at, transaction_id) AS RunningBalance"
+            f" FROM {source}"
+            " WHERE account_id = %s AND created_at >= %s AND created_at < %s"
+            " ORDER BY created_at, transaction_id",
+            [opening] + source_args + [account_id, start, end]
+        )
+        return cursor.fetchall()
+
+
+def prune_snapshots(conn, keep_after) -> int:
+    """Delete snapshots taken before keep_after; returns the rows deleted"""
+    try:
+        with conn.cursor() as cursor:
+            deleted = cursor.execute("DELETE FROM BalanceSnapshots WHERE snapshot_at < %s", (keep_after, ))
+        conn.commit()
+        return deleted
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _parse_time(text: str) -> datetime:
+    return datetime.fromisoformat(text)
+
+
+if __name__ == "__main__":
+    import test_acid
+
+    parser = argparse.ArgumentParser(description="Balance snapshots and balance-as-of queries")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('snapshot', help="record every account's balance now")
+    as_of_parser = commands.add_parser('as-of', help="balance of an account at a past time")
+    as_of_parser.add_argument('account_id', type=int)
+    as_of_parser.add_argument('time', type=_parse_time)
+    statement_parser = commands.add_parser('statement', help="transactions with running balance")
+    statement_parser.add_argument('account_id', type=int)
+    statement_parser.add_argument('start', type=_parse_time)
+    statement_parser.add_argument('end', type=_parse_time)
+    statement_parser.add_argument('--archive', action='store_true', help="include archived months")
+    options = parser.parse_args()
+
+    conn = test_acid.get_connection()
+    try:
+        if options.command == 'snapshot':
+            result = take_snapshot(conn)
+            print(f"Snapshot of {result['accounts']} accounts at {result['snapshot_at']}")
+        elif options.command == 'as-of':
+            balance = balance_as_of(conn, options.account_id, options.time)
+            print("No account found." if balance is None
+                  else f"Account {options.account_id} balance at {options.time}: ${balance:,.2f}")
+        else:
+            for row in account_statement(conn, options.account_id, options.start, options.end,
+                                         options.archive):
+                print(f"{row['Date']}  #{row['TransactionID']:<8} {row['Type']:<13}"
+                      f"{row['Amount']:>12,.2f}{row['RunningBalance']:>14,.2f}")
+    finally:
+        conn.close()
@@ -1,7 +1,17 @@
+import queue
 import tkinter as tk
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import messagebox, ttk
 import pymysql
 
+import banking_ops
+from banking_ops import BankingError
+from db_pool import ConnectionPool
+from read_cache import ACCOUNTS, BALANCE, RESERVES, ReadCache
+from reserves import ReserveAggregator, ReserveCounter
+from retry import RetryStats, run_with_retry
+
 # Database Configuration
 DB_CONFIG = {
     'host': 'localhost',
@@ -12,6 +22,122 @@ DB_CONFIG = {
     'cursorclass': pymysql.cursors.DictCursor
 }
 
+# Reserve journal mode: append reserve changes to ReserveDeltas and let a
+# background aggregator roll them into BankReserves (see reserves.py)
+RESERVE_JOURNAL = False
+
+# How deposit, withdraw and transfer run: banking_ops.CLIENT (multi-statement
+# transaction from Python), banking_ops.PROCEDURE (one CALL per operation),
+# banking_ops.CONDITIONAL (one guarded UPDATE instead of SELECT ... FOR UPDATE)
+# or banking_ops.OPTIMISTIC (version-checked write, needs migration 004)
+EXECUTION_MODE = banking_ops.CLIENT
+
+# Connection pool (see db_pool.py)
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 4
+POOL_TIMEOUT = 10.0
+
+# How often the Tk loop picks up finished background work (milliseconds)
+RESULT_POLL_MS = 50
+
+# Read cache for balance checks, reserves and the account list (see
+# read_cache.py): entry lifetime and how often to probe for other clients'
+# writes, in seconds. READ_CACHE_TTL = 0 turns the cache off.
+READ_CACHE_TTL = 5.0
+READ_CACHE_PROBE_INTERVAL = 1.0
+READ_CACHE_SIZE = 1024
+
+# Transactions tab: rows fetched per page, and how far down (0-1) the user
+# has to scroll before the next page is requested
+STATEMENT_PAGE_SIZE = 200
+STATEMENT_PREFETCH_AT = 0.9
+# Keep scrolling into archived months (TransactionsArchive, see archive.py)
+STATEMENT_INCLUDE_ARCHIVE = False
+
+
+class DbExecutor:
+    """
+    Runs database work on background threads so the Tk event loop never
+    blocks on a lock wait or a slow query.
+
+    Workers put finished results on a queue; the Tk thread drains it every
+    RESULT_POLL_MS via root.after and runs the callbacks, so widgets are only
+    ever touched from the Tk thread. Work submitted with a key supersedes
+    earlier work with the same key: a queued one is cancelled, a running
+    one has its result dropped.
+    """
+
+    def __init__(self, root, get_pool, on_status, workers: int = POOL_MAX_SIZE):
+        self.root = root
+        self.get_pool = get_pool
+        self.on_status = on_status
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-worker")
+        self._results = queue.Queue()
+        self._in_flight = {}        # ticket -> label, Tk thread only
+        self._futures = {}          # ticket -> Future, Tk thread only
+        self._latest = {}           # key -> newest ticket
+        self._next_ticket = 0
+        self._closed = False
+        self.root.after(RESULT_POLL_MS, self._poll)
+
+    def submit(self, label, work, on_success, on_error, key=None) -> int:
+        """Queue work(connection); called from the Tk thread"""
+        self._next_ticket += 1
+        ticket = self._next_ticket
+        if key is not None:
+            older = self._latest.get(key)
+            if older is not None:
+                self._cancel(older)
+            self._latest[key] = ticket
+
+        self._in_flight[ticket] = label
+        self._futures[ticket] = self._executor.submit(self._run, ticket, work, on_success, on_error)
+        self.on_status(list(self._in_flight.values()))
+        return ticket
+
+    def _cancel(self, ticket):
+        future = self._futures.pop(ticket, None)
+        if future is not None:
+            future.cancel()
+        self._in_flight.pop(ticket, None)
+
+    def _run(self, ticket, work, on_success, on_error):
+        # worker thread: no Tk calls here
+        try:
+            with self.get_pool().connection() as connection:
+                result = work(connection)
+        except Exception as e:
+            self._results.put((ticket, on_error, e))
+        else:
+            self._results.put((ticket, on_success, result))
+
+    def _poll(self):
+        if self._closed:
+            return
+        try:
+            while True:
+                ticket, callback, value = self._results.get_nowait()
+                if self._in_flight.pop(ticket, None) is None:
+                    # superseded by a newer request with the same key
+                    continue
+                self._futures.pop(ticket, None)
+                try:
+                    callback(value)
+                except Exception:
+                    traceback.print_exc()
+        except queue.Empty:
+            pass
+        self.on_status(list(self._in_flight.values()))
+        self.root.after(RESULT_POLL_MS, self._poll)
+
+    def shutdown(self):
+        """Drop queued work and stop polling; running work finishes on its own"""
+        self._closed = True
+        for ticket in list(self._futures):
+            self._cancel(ticket)
+        self._executor.shutdown(wait=False)
+
+
 class BankingApp:
     def __init__(self, root):
         self.root = root
@@ -19,9 +145,25 @@ class BankingApp:
         self.root.geometry("1200x800")
         self.root.configure(bg="#F5F5F5")
 
-        self.connection = None
+        self.pool = None
+        self.retry_stats = RetryStats()
+        self.read_cache = ReadCache(READ_CACHE_SIZE, READ_CACHE_TTL, READ_CACHE_PROBE_INTERVAL)
+        self.reserves = ReserveCounter()
+        self.reserve_aggregator = None
+
+        # All Accounts tab: account_id -> (tree item, shown values), and the
+        # newest updated_at already reflected in the tree
+        self.account_items = {}
+        self.accounts_since = None
+
+        # Transactions tab paging state: keyset of the last loaded row
+        self.statement_after = None
+        self.statement_has_more = False
+        self.statement_loading = False
         
         self.create_widgets()
+        self.executor = DbExecutor(self.root, lambda: self.pool, self.show_activity)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.connect_db()
 
     def create_widgets(self):
@@ -35,6 +177,12 @@ class BankingApp:
         status_label = tk.Label(self.root, textvariable=self.status_var, fg="black", font=("Helvetica", 16), bg="#F5F5F5")
         status_label.pack(pady=5)
 
+        # Background database work in flight
+        self.activity_var = tk.StringVar()
+        self.activity_var.set("Idle")
+        activity_label = tk.Label(self.root, textvariable=self.activity_var, fg="gray25", font=("Helvetica", 14), bg="#F5F5F5")
+        activity_label.pack(pady=2)
+
         # Create Notebook (Tabbed Interface)
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
@@ -227,16 +375,31 @@ class BankingApp:
         
         self.statement_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        scrollbar = ttk.Scrollbar(tab, orient=tk.VERTICAL, command=self.statement_tree.yview)
-        self.statement_tree.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.statement_scrollbar = ttk.Scrollbar(tab, orient=tk.VERTICAL, command=self.statement_tree.yview)
+        self.statement_tree.configure(yscroll=self.on_statement_scroll)
+        self.statement_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def on_statement_scroll(self, first, last):
+        """Move the scrollbar and fetch the next page when near the bottom"""
+        self.statement_scrollbar.set(first, last)
+        if float(last) >= STATEMENT_PREFETCH_AT:
+            self.load_statement_page()
 
     def connect_db(self):
         try:
-            if self.connection and self.connection.open:
-                self.connection.close()
+            if self.pool:
+                self.pool.close()
             
-            self.connection = pymysql.connect(**DB_CONFIG)
+            # every pooled session tells the reserve trigger which mode we use
+            config = dict(DB_CONFIG, init_command=f"SET @reserve_journal = {int(RESERVE_JOURNAL)}, @reserve_explicit = 1")
+            self.pool = ConnectionPool(config, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE,
+                                       timeout=POOL_TIMEOUT)
+            with self.pool.connection() as connection, connection.cursor() as cursor:
+                self.reserves = ReserveCounter.load(cursor, journal=RESERVE_JOURNAL)
+            self.read_cache.clear()
+            if RESERVE_JOURNAL and self.reserve_aggregator is None:
+                self.reserve_aggregator = ReserveAggregator(lambda: pymysql.connect(**DB_CONFIG))
+                self.reserve_aggregator.start()
             self.status_var.set("Status: Connected to Database")
             print("Connected to database.")
         except pymysql.MySQLError as e:
@@ -244,8 +407,73 @@ class BankingApp:
             messagebox.showerror("Connection Error", f"Could not connect to database:\n{e}")
 
     def __del__(self):
-        if self.connection and self.connection.open:
-            self.connection.close()
+        if self.pool:
+            self.pool.close()
+
+    # --- Background database work ---
+
+    def run_db(self, label, work, on_success, failure_message, key=None, on_failure=None):
+        """
+        Run work(connection) off the Tk thread, then on_success(result) on it
+
+        Deadlocks and lock wait timeouts are retried with backoff (counted in
+        self.retry_stats). A BankingError is shown as-is; any other exception
+        is shown as failure_message and its traceback printed, then
+        on_failure() runs.
+        Refreshes pass a key so a newer refresh supersedes an older one still
+        queued or running.
+        """
+        def on_error(error):
+            if on_failure is not None:
+                on_failure()
+            if isinstance(error, BankingError):
+                messagebox.showerror("Error", str(error))
+            else:
+                messagebox.showerror("Error", f"{failure_message}\n{error}")
+                traceback.print_exception(type(error), error, error.__traceback__)
+
+        def work_with_retry(connection):
+            return run_with_retry(work, connection, operation=label, stats=self.retry_stats)
+
+        return self.executor.submit(label, work_with_retry, on_success, on_error, key=key)
+
+    def invalidating(self, work, account_ids):
+        """work(connection), then drop the cached reads of the accounts it wrote"""
+        def run(connection):
+            result = work(connection)
+            self.read_cache.invalidate_accounts(account_ids)
+            return result
+        return run
+
+    def show_activity(self, labels):
+        text = ("Working: " + ", ".join(labels) + " ...") if labels else "Idle"
+        cache = self.read_cache.stats()
+        if cache['hits'] + cache['misses'] > 0:
+            text += f"  |  cache: {cache['hits']} hits, {cache['misses']} misses, {cache['hit_ratio']:.0%}"
+        if self.activity_var.get() != text:
+            self.activity_var.set(text)
+
+    def on_close(self):
+        self.executor.shutdown()
+        if self.reserve_aggregator is not None:
+            self.reserve_aggregator.stop()
+        if self.pool:
+            self.pool.close()
+        self.root.destroy()
+
+    @staticmethod
+    def parse_amount(text):
+        try:
+            return float(text)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def parse_account_id(text):
+        try:
+            return int(text)
+        except ValueError:
+            return None
 
     # --- TODO: Implement these methods ---
 
@@ -280,50 +508,24 @@ class BankingApp:
         if customer_name == "" or tax_id == "" or initial_deposit == "":
             messagebox.showerror("Input error", "Inputs cannot be empty")
             return
-        elif (float(initial_deposit) < 0):
+        initial_deposit = self.parse_amount(initial_deposit)
+        if initial_deposit is None or initial_deposit < 0:
             messagebox.showerror("Input error", "Initial Deposit must be non-negative number")
             return
-        
-        # start transaction
-        try:
-            initial_deposit = float(initial_deposit)
-            with self.connection.cursor() as cursor:
-                cursor.execute("START TRANSACTION")
-
-                # check if custom exist via tax_id
-                cursor.execute("SELECT customer_id FROM Customers WHERE tax_id = %s", (tax_id, ))
-                duplicate = cursor.fetchone()
-                if (duplicate == None):
-                    # insert new customer if not
-                    cursor.execute("INSERT INTO Customers (name, tax_id) VALUES (%s, %s)", (customer_name, tax_id))
-                    customer_id = cursor.lastrowid
-                else:
-                    customer_id = duplicate['customer_id']
-            
-                # insert new account
-                cursor.execute("INSERT INTO Accounts (customer_id, balance) VALUES (%s, 0)", (customer_id, ))
-
-                if (initial_deposit > 0):
-                    # lock rows
-                    account_id = cursor.lastrowid
-                    cursor.execute("SELECT balance FROM Accounts WHERE account_id = %s FOR UPDATE", (account_id, ))
-                    cursor.execute("SELECT total_reserve FROM BankReserves WHERE branch_id = 1 FOR UPDATE")
-                    
-                    # update tables
-                    cursor.execute("UPDATE Accounts SET balance = balance + %s WHERE account_id = %s", (initial_deposit, account_id))
-                    cursor.execute("UPDATE BankReserves SET total_reserve = total_reserve + %s WHERE branch_id = 1", (initial_deposit, ))
-                    cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
-                                   (account_id, "OPEN_ACCOUNT", initial_deposit)
-                    )
-
-            # commit changes
-            self.connection.commit()
-            messagebox.showinfo("Success", "Open new account successfully.")
-
-        except Exception:
-            self.connection.rollback()
-            messagebox.showerror("Error", "Failed to open account.")
-            raise
+
+        def open_new(connection):
+            account_id = banking_ops.open_account(connection, self.reserves, customer_name, tax_id, initial_deposit)
+            # a cached "No account found." for this id is stale now
+            self.read_cache.invalidate_accounts([account_id])
+            return account_id
+
+        # run the transaction in the background (see banking_ops.open_account)
+        self.run_db(
+            "Open account",
+            open_new,
+            lambda account_id: messagebox.showinfo("Success", f"Open new account successfully.\nAccount ID: {account_id}"),
+            "Failed to open account."
+        )
 
     def deposit(self):
         """
@@ -350,51 +552,26 @@ class BankingApp:
         """
         # TODO 1 ----
         # get inputs from entries
-        account_id = self.deposit_account_entry.get().strip()
-        amount = self.deposit_amount_entry.get().strip()
+        account_id = self.parse_account_id(self.deposit_account_entry.get().strip())
+        amount = self.parse_amount(self.deposit_amount_entry.get().strip())
 
         # validate inputs
-        if (account_id == "" or amount == ""):
-            messagebox.showerror("Input error", "Inputs cannot be empty")
+        if (account_id is None or amount is None):
+            messagebox.showerror("Input error", "Account ID and amount must be numbers")
             return
-        elif (float(amount) <= 0):
+        elif (amount <= 0):
             messagebox.showerror("Input error", "Amount must be positive number")
             return
 
-        # start transaction
-        try:
-            account_id = int(account_id)
-            amount = float(amount)
-            with self.connection.cursor() as cursor:
-                cursor.execute("START TRANSACTION")
-
-                # check if the account exist
-                cursor.execute("SELECT account_id FROM Accounts WHERE account_id = %s", (account_id, ))
-                exist = cursor.fetchone()
-                if (exist == None):
-                    messagebox.showerror("Input error", "No account found.")
-                    return
-                
-                # lock rows
-                account_id = exist['account_id']
-                cursor.execute("SELECT balance FROM Accounts WHERE account_id = %s FOR UPDATE", (account_id, ))
-                cursor.execute("SELECT total_reserve FROM BankReserves WHERE branch_id = 1 FOR UPDATE")
-                
-                # update Accounts balance, BankReserves total_reserve and insert into transaction
-                cursor.execute("UPDATE Accounts SET balance = balance + %s WHERE account_id = %s", (amount, account_id))
-                cursor.execute("UPDATE BankReserves SET total_reserve = total_reserve + %s WHERE branch_id = 1", (amount, ))
-                cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
-                               (account_id, 'DEPOSIT', amount)
-                )
-
-            # commit changes
-            self.connection.commit()
-            messagebox.showinfo("Success", "Deposit successfully.")
-
-        except Exception:
-            self.connection.rollback()
-            messagebox.showerror("Error", "Failed to deposit.")
-            raise
+        # run the transaction in the background (see banking_ops.deposit)
+        self.run_db(
+            "Deposit",
+            self.invalidating(
+                lambda connection: banking_ops.deposit(connection, self.reserves, account_id, amount, mode=EXECUTION_MODE),
+                [account_id]),
+            lambda _: messagebox.showinfo("Success", "Deposit successfully."),
+            "Failed to deposit."
+        )
 
     def withdraw(self):
         """
@@ -423,58 +600,26 @@ class BankingApp:
         """
         # TODO 1
         # get inputs from entries
-        account_id = self.withdraw_account_entry.get().strip()
-        amount = self.withdraw_amount_entry.get().strip()
+        account_id = self.parse_account_id(self.withdraw_account_entry.get().strip())
+        amount = self.parse_amount(self.withdraw_amount_entry.get().strip())
 
         # validate inputs
-        if (account_id == "" or amount == ""):
-            messagebox.showerror("Input error", "Inputs cannot be empty")
+        if (account_id is None or amount is None):
+            messagebox.showerror("Input error", "Account ID and amount must be numbers")
             return
-        elif (float(amount) <= 0):
+        elif (amount <= 0):
             messagebox.showerror("Input error", "Amount must be positive number")
             return
-        
-        # start transaction
-        try:
-            account_id = int(account_id)
-            amount = float(amount)
-            with self.connection.cursor() as cursor:
-                cursor.execute("START TRANSACTION")
-
-                # check if the account exist
-                cursor.execute("SELECT account_id FROM Accounts WHERE account_id = %s", (account_id, ))
-                exist = cursor.fetchone()
-                if (exist == None):
-                    messagebox.showerror("Input error", "No account found.")
-                    return
-                account_id = exist['account_id']
-                
-                # lock rows
-                cursor.execute("SELECT balance FROM Accounts WHERE account_id = %s FOR UPDATE", (account_id, ))
-                cursor.execute("SELECT total_reserve FROM BankReserves WHERE branch_id = 1 FOR UPDATE")
-
-                # check sufficient funds
-                balance = float(cursor.fetchone()['balance'])
-                if (balance - amount < 0):
-                    messagebox.showerror("Error", "Insufficient funds.")
-                    self.connection.rollback()
-                    return
-                
-                # update Accounts balance, BankReserves total_reserve and insert into transaction
-                cursor.execute("UPDATE Accounts SET balance = balance - %s WHERE account_id = %s", (amount, account_id))
-                cursor.execute("UPDATE BankReserves SET total_reserve = total_reserve - %s WHERE branch_id = 1", (amount, ))
-                cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
-                               (account_id, 'WITHDRAW', amount)
-                )
-
-            # commit changes
-            self.connection.commit()
-            messagebox.showinfo("Success", "Withdraw successfully.")
-
-        except Exception:
-            self.connection.rollback()
-            messagebox.showerror("Error", "Failed to withdraw.")
-            raise
+
+        # run the transaction in the background (see banking_ops.withdraw)
+        self.run_db(
+            "Withdraw",
+            self.invalidating(
+                lambda connection: banking_ops.withdraw(connection, self.reserves, account_id, amount, mode=EXECUTION_MODE),
+                [account_id]),
+            lambda _: messagebox.showinfo("Success", "Withdraw successfully."),
+            "Failed to withdraw."
+        )
 
     def transfer(self):
         """
@@ -503,73 +648,30 @@ class BankingApp:
         """
         # TODO 1
         # get inputs from entries
-        from_account = self.transfer_from_entry.get().strip()
-        to_account = self.transfer_to_entry.get().strip()
-        amount = self.transfer_amount_entry.get().strip()
+        from_account = self.parse_account_id(self.transfer_from_entry.get().strip())
+        to_account = self.parse_account_id(self.transfer_to_entry.get().strip())
+        amount = self.parse_amount(self.transfer_amount_entry.get().strip())
 
         # validate inputs
-        if (from_account == "" or to_account == "" or amount == ""):
-            messagebox.showerror("Input error", "Inputs cannot be empty")
+        if (from_account is None or to_account is None or amount is None):
+            messagebox.showerror("Input error", "Account IDs and amount must be numbers")
             return
         elif (from_account == to_account):
             messagebox.showerror("Input error", "Can't transfer to the same Account ID")
             return
-        elif (float(amount) <= 0):
+        elif (amount <= 0):
             messagebox.showerror("Input error", "Amount must be positive number")
             return
-        
-        # start transaction
-        try:
-            amount = float(amount)
-            with self.connection.cursor() as cursor:
-                cursor.execute("START TRANSACTION")
-
-                # check if the account exist
-                cursor.execute("SELECT account_id FROM Accounts WHERE account_id IN (%s, %s)", (from_account, to_account))
-                exist = cursor.fetchall()
-                if (len(exist) != 2):
-                    messagebox.showerror("Input error", "No account found.")
-                    self.connection.rollback()
-                    return
-                
-                # lock rows prevent deadlocks
-                first = min(from_account, to_account)
-                second = max(from_account, to_account)
-                cursor.execute("SELECT account_id, balance FROM Accounts WHERE account_id = %s FOR UPDATE", (first, ))
-                row1 = cursor.fetchone()
-                cursor.execute("SELECT account_id, balance FROM Accounts WHERE account_id = %s FOR UPDATE", (second, ))
-                row2 = cursor.fetchone()
-
-                # determine which account is first
-                if from_account == first:
-                    balance = float(row1['balance'])
-                else:
-                    balance = float(row2['balance'])
-
-                # check sufficient funds
-                if (balance - amount < 0):
-                    messagebox.showerror("Error", "Insufficient funds.")
-                    self.connection.rollback()
-                    return
-
-                # update from_account balance, to_account balance and insert Transaction
-                cursor.execute("UPDATE Accounts SET balance = balance - %s WHERE account_id = %s", (amount, from_account))
-                cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
-                               (from_account, 'TRANSFER_OUT', amount)
-                )
-                cursor.execute("UPDATE Accounts SET balance = balance + %s WHERE account_id = %s", (amount, to_account))
-                cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
-                               (to_account, 'TRANSFER_IN', amount)
-                )
-
-            # commit changes
-            self.connection.commit()
-            messagebox.showinfo("Success", "Transfer successfully.")
-
-        except Exception:
-            self.connection.rollback()
-            messagebox.showerror("Error", "Failed to transfer.")
-            raise
+
+        # run the transaction in the background (see banking_ops.transfer)
+        self.run_db(
+            "Transfer",
+            self.invalidating(
+                lambda connection: banking_ops.transfer(connection, from_account, to_account, amount, mode=EXECUTION_MODE),
+                [from_account, to_account]),
+            lambda _: messagebox.showinfo("Success", "Transfer successfully."),
+            "Failed to transfer."
+        )
 
     def check_balance(self):
         """
@@ -579,98 +681,151 @@ class BankingApp:
         3. Display result in self.balance_result label
         """
         # get input from entry
-        account_id = self.balance_account_entry.get().strip()
-        if account_id == "":
-            messagebox.showerror("Input error", "Account ID cannot be empty.")
-            return;
-    
-        try:
-            account_id = int(account_id)
-            with self.connection.cursor() as cursor:
-                cursor.execute("SELECT balance FROM Accounts WHERE account_id = %s", account_id)
-                result = cursor.fetchone()
-                if result == None:
-                    self.balance_result.config(text = "No account found.")
-                else:
-                    self.balance_result.config(text = result["balance"])
-        except Exception:
-            self.balance_result.config(text = "Error")
-            messagebox.showerror("Error", "Failed to check balance.")
-            raise
+        account_id = self.parse_account_id(self.balance_account_entry.get().strip())
+        if account_id is None:
+            messagebox.showerror("Input error", "Account ID must be a number.")
+            return
+
+        def show(balance):
+            if balance is None:
+                self.balance_result.config(text = "No account found.")
+            else:
+                self.balance_result.config(text = balance)
+
+        self.balance_result.config(text = "Loading...")
+        self.run_db(
+            "Check balance",
+            lambda connection: self.read_cache.get(connection, BALANCE, account_id,
+                                                   lambda c: banking_ops.get_balance(c, account_id)),
+            show,
+            "Failed to check balance.",
+            key="balance",
+            on_failure=lambda: self.balance_result.config(text = "Error")
+        )
 
     def refresh_accounts(self):
         """
         TODO: Implement accounts list refresh
-        1. Clear existing tree items
-        2. JOIN Accounts and Customers tables
-        3. Fetch all rows
-        4. Insert into accounts_tree
+        1. JOIN Accounts and Customers tables
+        2. Fetch only rows whose updated_at is past the last refresh
+        3. Update or insert just those rows in accounts_tree
+        4. Start over with a full load if accounts were deleted
         """
-        # clear existing tree items
+        since = self.accounts_since
+
+        def show(result):
+            rows, account_count = result
+            for row in rows:
+                values = (row['account_id'], row['name'], row['tax_id'], row['balance'])
+                known = self.account_items.get(row['account_id'])
+                if known is None:
+                    item = self.accounts_tree.insert("", "end", values=values)
+                    self.account_items[row['account_id']] = (item, values)
+                elif known[1] != values:
+                    self.accounts_tree.item(known[0], values=values)
+                    self.account_items[row['account_id']] = (known[0], values)
+                if self.accounts_since is None or row['updated_at'] > self.accounts_since:
+                    self.accounts_since = row['updated_at']
+
+            if account_count != len(self.account_items):
+                # an account disappeared (e.g. test data reset): reload everything
+                self.reset_accounts_tree()
+                self.refresh_accounts()
+
+        # join Accounts and Customers tables in the background
+        self.run_db(
+            "Refresh accounts",
+            lambda connection: self.read_cache.get(connection, ACCOUNTS, since,
+                                                   lambda c: banking_ops.list_accounts_changed(c, since)),
+            show,
+            "Failed to display account information.",
+            key="accounts"
+        )
+
+    def reset_accounts_tree(self):
+        """Clear existing tree items and the index, so the next refresh loads everything"""
         for row in self.accounts_tree.get_children():
-            self.accounts_tree.delete(row)        
-        
-        try:
-            with self.connection.cursor() as cursor:
-                # join Accounts and Customers tables    
-                cursor.execute("SELECT * FROM Accounts a JOIN Customers c ON a.customer_id = c.customer_id")
-
-                # fetch all rows
-                rows = cursor.fetchall()
-
-                # insert into account_tree
-                for row in rows:
-                    self.accounts_tree.insert("", "end", values=(row['account_id'], row['name'], row['tax_id'], row['balance']))
-        except Exception:
-            messagebox.showerror("Error", "Failed to display account information.")
-            raise
+            self.accounts_tree.delete(row)
+        self.account_items = {}
+        self.accounts_since = None
 
     def refresh_statement(self):
         """
         TODO: Implement transactions refresh
         1. Clear existing tree items
-        2. SELECT from AllCustomerTransactions view
-        3. Insert rows into statement_tree
+        2. SELECT the first page of AllCustomerTransactions
+        3. Insert rows into statement_tree; later pages load on scroll
         """
-        # clear existing tree items
+        # clear existing tree items and start again from the newest row
         for row in self.statement_tree.get_children():
-            self.statement_tree.delete(row)        
-        
-        try:
-            with self.connection.cursor() as cursor:
-                # select from AllCustomerTransactions view  
-                cursor.execute("SELECT * FROM AllCustomerTransactions")
-
-                # fetch all rows
-                rows = cursor.fetchall()
-
-                # insert into statement_tree
-                for row in rows:
-                    self.statement_tree.insert("", "end", values=(row['CustomerName'], row['AccountID'], row['Type'], row['Amount'], row['Date']))
-        except Exception:
-            messagebox.showerror("Error", "Failed to display transaction information.")
-            raise
+            self.statement_tree.delete(row)
+        self.statement_after = None
+        self.statement_has_more = True
+        self.statement_loading = False
+        self.load_statement_page()
+
+    def load_statement_page(self):
+        """Fetch the page after the last loaded row in the background"""
+        if self.statement_loading or not self.statement_has_more:
+            return
+        after = self.statement_after
+
+        def show(rows):
+            # advance the keyset before inserting, the tree may ask for more right away
+            if rows:
+                self.statement_after = (rows[-1]['Date'], rows[-1]['TransactionID'])
+            self.statement_has_more = len(rows) == STATEMENT_PAGE_SIZE
+            self.statement_loading = False
+
+            # insert into statement_tree
+            for row in rows:
+                self.statement_tree.insert("", "end", values=(row['CustomerName'], row['AccountID'], row['Type'], row['Amount'], row['Date']))
+
+        def failed():
+            self.statement_loading = False
+            self.statement_has_more = False
+
+        # select one page of the transaction log in the background
+        self.statement_loading = True
+        self.run_db(
+            "Load transactions",
+            lambda connection: banking_ops.list_transactions_page(connection, STATEMENT_PAGE_SIZE, after,
+                                                                 STATEMENT_INCLUDE_ARCHIVE),
+            show,
+            "Failed to display transaction information.",
+            key="statement",
+            on_failure=failed
+        )
 
     def refresh_reserves(self):
         """
         TODO: Implement reserves refresh
-        1. SELECT total_reserve FROM BankReserves
+        1. SELECT SUM(total_reserve) over the branch's BankReserves slots
         2. Display in reserves_result label with formatting
         """
-        # Query bank reserves
-        try:
-            with self.connection.cursor() as cursor:
-                cursor.execute("SELECT total_reserve FROM BankReserves LIMIT 1")
-                result = cursor.fetchone()
-                
-                if result:
-                    # Display with thousands separator and 2 decimal places
-                    self.reserves_result.config(text=f"${result['total_reserve']:,.2f}", fg="#006400")
-                else:
-                    self.reserves_result.config(text="No data", fg="red")
-        except pymysql.MySQLError as e:
-            self.reserves_result.config(text="Error", fg="red")
-            messagebox.showerror("Database Error", f"Could not fetch reserves:\n{e}")
+        def read_total(connection):
+            with connection.cursor() as cursor:
+                return self.reserves.total(cursor)
+
+        def cached_total(connection):
+            return self.read_cache.get(connection, RESERVES, None, read_total)
+
+        def show(result):
+            if result is not None:
+                # Display with thousands separator and 2 decimal places
+                self.reserves_result.config(text=f"${result:,.2f}", fg="#006400")
+            else:
+                self.reserves_result.config(text="No data", fg="red")
+
+        # Query bank reserves in the background
+        self.run_db(
+            "Refresh reserves",
+            cached_total,
+            show,
+            "Could not fetch reserves.",
+            key="reserves",
+            on_failure=lambda: self.reserves_result.config(text="Error", fg="red")
+        )
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,612 @@
+"""
+Banking Operations
+==================
+The SQL side of every banking operation, free of any Tk code so it can run
+on a background thread (the GUI) or inside a stress test worker.
+
+Each write operation runs its own START TRANSACTION ... COMMIT on the given
+connection and rolls back on any error. A business rule violation (unknown
+account, insufficient funds, ...) is raised as BankingError with a message
+meant for the user; anything else is a genuine database error.
+
+deposit, withdraw and transfer take an execution mode:
+- CLIENT: the multi-statement transaction is driven from Python
+- PROCEDURE: a single CALL to the matching stored procedure in init_db.sql,
+  one round trip per operation
+- CONDITIONAL: no existence check and no SELECT ... FOR UPDATE; the account
+  is changed by one guarded UPDATE (`... AND balance >= amount` for a debit)
+  and the affected-row count tells whether it went through. Only when it
+  didn't is the account read again, to tell a missing account from
+  insufficient funds. Locks are taken by the UPDATE itself, so they are held
+  for the UPDATE, the reserve / Transactions writes and the commit only
+- OPTIMISTIC: the account is read without a lock, the funds are checked in
+  Python, and the write is guarded by the row version read
+  (`... WHERE account_id = ? AND version = ?`, Accounts.version from
+  migration 004). If another transaction wrote the account in between, no
+  row changes and VersionConflict is raised; retry.run_with_retry runs the
+  operation again with a fresh read
+
+They also accept an optional metrics.OpTimer, which collects the time spent
+in the row-locking statements and how long the locks were held until commit
+(client and conditional modes; a procedure's locks live inside its single
+CALL).
+"""
+
+from decimal import Decimal
+
+import pymysql
+
+from archive import ARCHIVE_UNION, NO_BOUNDARY, archive_boundary
+from metrics import locking, released
+
+# Execution modes
+CLIENT = 'client'
+PROCEDURE = 'procedure'
+CONDITIONAL = 'conditional'
+OPTIMISTIC = 'optimistic'
+EXECUTION_MODES = (CLIENT, PROCEDURE, CONDITIONAL, OPTIMISTIC)
+
+# MySQL error raised by SIGNAL SQLSTATE '45000' in the stored procedures
+ER_SIGNAL_EXCEPTION = 1644
+
+# Per-transfer outcomes of transfer_batch
+APPLIED = 'applied'
+INSUFFICIENT_FUNDS = 'insufficient_funds'
+NO_ACCOUNT = 'no_account'
+INVALID = 'invalid'
+
+
+class BankingError(Exception):
+    """Operation rejected by a business rule; the message is shown to the user"""
+
+
+class VersionConflict(Exception):
+    """An optimistic write found the account changed since it was read; retryable"""
+
+    retry_reason = 'version conflict'
+
+
+def call_procedure(connection, procedure: str, args):
+    """
+    CALL a banking stored procedure in one round trip
+
+    The procedure runs its own transaction; a business rule SIGNAL comes
+    back as BankingError with the procedure's message.
+    """
+    placeholders = ", ".join(["%s"] * len(args))
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"CALL {procedure}({placeholders})", args)
+    except pymysql.MySQLError as e:
+        connection.rollback()
+        if e.args and e.args[0] == ER_SIGNAL_EXCEPTION:
+            raise BankingError(e.args[1]) from e
+        raise
+
+
+def open_account(connection, reserves, customer_name: str, tax_id: str, initial_deposit: float) -> int:
+    """Create (or reuse) the customer, open an account and book the initial deposit"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("START TRANSACTION")
+
+            # check if custom exist via tax_id
+            cursor.execute("SELECT customer_id FROM Customers WHERE tax_id = %s", (tax_id, ))
+            duplicate = cursor.fetchone()
+            if (duplicate == None):
+                # insert new customer if not
+                cursor.execute("INSERT INTO Customers (name, tax_id) VALUES (%s, %s)", (customer_name, tax_id))
+                customer_id = cursor.lastrowid
+            else:
+                customer_id = duplicate['customer_id']
+
+            # insert new account
+            cursor.execute("INSERT INTO Accounts (customer_id, balance) VALUES (%s, 0)", (customer_id, ))
+            account_id = cursor.lastrowid
+
+            if (initial_deposit > 0):
+                # lock rows
+                cursor.execute("SELECT balance FROM Accounts WHERE account_id = %s FOR UPDATE", (account_id, ))
+                reserves.lock(cursor, account_id)
+
+                # update tables
+                cursor.execute("UPDATE Accounts SET balance = balance + %s WHERE account_id = %s", (initial_deposit, account_id))
+                reserves.add(cursor, account_id, initial_deposit)
+                cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
+                               (account_id, "OPEN_ACCOUNT", initial_deposit)
+                )
+
+        # commit changes
+        connection.commit()
+        return account_id
+    except Exception:
+        connection.rollback()
+        raise
+
+
+def deposit(connection, reserves, account_id: int, amount: float, mode: str = CLIENT, timer=None):
+    """Add amount to the account and the branch reserve"""
+    if mode == PROCEDURE:
+        return call_procedure(connection, "deposit_money", (account_id, amount))
+    if mode == CONDITIONAL:
+        return _deposit_conditional(connection, reserves, account_id, amount, timer)
+    if mode == OPTIMISTIC:
+        return _cash_optimistic(connection, reserves, account_id, amount, 'DEPOSIT', timer)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("START TRANSACTION")
+
+            # check if the account exist
+            cursor.execute("SELECT account_id FROM Accounts WHERE account_id = %s", (account_id, ))
+            exist = cursor.fetchone()
+            if (exist == None):
+                raise BankingError("No account found.")
+
+            # lock rows
+            account_id = exist['account_id']
+            with locking(timer):
+                cursor.execute("SELECT balance FROM Accounts WHERE account_id = %s FOR UPDATE", (account_id, ))
+                reserves.lock(cursor, account_id)
+
+            # update Accounts balance, BankReserves total_reserve and insert into transaction
+            cursor.execute("UPDATE Accounts SET balance = balance + %s WHERE account_id = %s", (amount, account_id))
+            reserves.add(cursor, account_id, amount)
+            cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
+                           (account_id, 'DEPOSIT', amount)
+            )
+
+        # commit changes
+        connection.commit()
+        released(timer)
+    except Exception:
+        connection.rollback()
+        released(timer)
+        raise
+
+
+def withdraw(connection, reserves, account_id: int, amount: float, mode: str = CLIENT, timer=None):
+    """Take amount from the account and the branch reserve if funds allow"""
+    if mode == PROCEDURE:
+        return call_procedure(connection, "withdraw_money", (account_id, amount))
+    if mode == CONDITIONAL:
+        return _withdraw_conditional(connection, reserves, account_id, amount, timer)
+    if mode == OPTIMISTIC:
+        return _cash_optimistic(connection, reserves, account_id, amount, 'WITHDRAW', timer)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("START TRANSACTION")
+
+            # check if the account exist
+            cursor.execute("SELECT account_id FROM Accounts WHERE account_id = %s", (account_id, ))
+            exist = cursor.fetchone()
+            if (exist == None):
+                raise BankingError("No account found.")
+            account_id = exist['account_id']
+
+            # lock rows
+            with locking(timer):
+                cursor.execute("SELECT balance FROM Accounts WHERE account_id = %s FOR UPDATE", (account_id, ))
+                balance = float(cursor.fetchone()['balance'])
+                reserves.lock(cursor, account_id)
+
+            # check sufficient funds
+            if (balance - amount < 0):
+                raise BankingError("Insufficient funds.")
+
+            # update Accounts balance, BankReserves total_reserve and insert into transaction
+            cursor.execute("UPDATE Accounts SET balance = balance - %s WHERE account_id = %s", (amount, account_id))
+            reserves.add(cursor, account_id, -amount)
+            cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
+                           (account_id, 'WITHDRAW', amount)
+            )
+
+        # commit changes
+        connection.commit()
+        released(timer)
+    except Exception:
+        connection.rollback()
+        released(timer)
+        raise
+
+
+def transfer(connection, from_account: int, to_account: int, amount: float, mode: str = CLIENT, timer=None):
+    """Move amount between two accounts, locking them in account_id order"""
+    if mode == PROCEDURE:
+        return call_procedure(connection, "transfer_money", (from_account, to_account, amount))
+    if mode == CONDITIONAL:
+        return _transfer_conditional(connection, from_account, to_account, amount, timer)
+    if mode == OPTIMISTIC:
+        return _transfer_optimistic(connection, from_account, to_account, amount, timer)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("START TRANSACTION")
+
+            # check if the account exist
+            cursor.execute("SELECT account_id FROM Accounts WHERE account_id IN (%s, %s)", (from_account, to_account))
+            exist = cursor.fetchall()
+            if (len(exist) != 2):
+                raise BankingError("No account found.")
+
+            # lock rows prevent deadlocks
+            first = min(from_account, to_account)
+            second = max(from_account, to_account)
+            with locking(timer):
+                cursor.execute("SELECT account_id, balance FROM Accounts WHERE account_id = %s FOR UPDATE", (first, ))
+                row1 = cursor.fetchone()
+                cursor.execute("SELECT account_id, balance FROM Accounts WHERE account_id = %s FOR UPDATE", (second, ))
+                row2 = cursor.fetchone()
+
+            # determine which account is first
+            if from_account == first:
+                balance = float(row1['balance'])
+            else:
+                balance = float(row2['balance'])
+
+            # check sufficient funds
+            if (balance - amount < 0):
+                raise BankingError("Insufficient funds.")
+
+            # update from_account balance, to_account balance and insert Transaction
+            cursor.execute("UPDATE Accounts SET balance = balance - %s WHERE account_id = %s", (amount, from_account))
+            cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
+                           (from_account, 'TRANSFER_OUT', amount)
+            )
+            cursor.execute("UPDATE Accounts SET balance = balance + %s WHERE account_id = %s", (amount, to_account))
+            cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
+                           (to_account, 'TRANSFER_IN', amount)
+            )
+
+        # commit changes
+        connection.commit()
+        released(timer)
+    except Exception:
+        connection.rollback()
+        released(timer)
+        raise
+
+
+def _check_amount(amount):
+    """Reject amounts that are not positive once rounded to cents (the guarded UPDATEs would change nothing)"""
+    if (round(amount, 2) <= 0):
+        raise BankingError("Amount must be positive number")
+
+
+def _debit_rejection(cursor, account_id: int) -> BankingError:
+    """
+    Why a guarded debit changed no row, for the message only: the account
+    doesn't exist, otherwise insufficient funds
+
+    The read is not locked, so a concurrent deposit may already show enough
+    funds again; the debit still failed, so the caller rolls back regardless.
+    """
+    cursor.execute("SELECT account_id FROM Accounts WHERE account_id = %s", (account_id, ))
+    if (cursor.fetchone() == None):
+        return BankingError("No account found.")
+    return BankingError("Insufficient funds.")
+
+
+def _deposit_conditional(connection, reserves, account_id: int, amount: float, timer=None):
+    """deposit in CONDITIONAL mode: one UPDATE finds, locks and credits the account"""
+    _check_amount(amount)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("START TRANSACTION")
+
+            with locking(timer):
+                cursor.execute("UPDATE Accounts SET balance = balance + %s WHERE account_id = %s", (amount, account_id))
+            if (cursor.rowcount != 1):
+                raise BankingError("No account found.")
+
+            # the reserve slot is locked by its own UPDATE (no separate FOR UPDATE)
+            reserves.add(cursor, account_id, amount)
+            cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
+                           (account_id, 'DEPOSIT', amount)
+            )
+
+        connection.commit()
+        released(timer)
+    except Exception:
+        connection.rollback()
+        released(timer)
+        raise
+
+
+def _withdraw_conditional(connection, reserves, account_id: int, amount: float, timer=None):
+    """withdraw in CONDITIONAL mode: the funds check is part of the debit UPDATE"""
+    _check_amount(amount)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("START TRANSACTION")
+
+            # debit only if the funds are there
+            with locking(timer):
+                cursor.execute("UPDATE Accounts SET balance = balance - %s WHERE account_id = %s AND balance >= %s",
+                               (amount, account_id, amount))
+            if (cursor.rowcount != 1):
+                raise _debit_rejection(cursor, account_id)
+
+            reserves.add(cursor, account_id, -amount)
+            cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
+                           (account_id, 'WITHDRAW', amount)
+            )
+
+        connection.commit()
+        released(timer)
+    except Exception:
+        connection.rollback()
+        released(timer)
+        raise
+
+
+def _transfer_conditional(connection, from_account: int, to_account: int, amount: float, timer=None):
+    """
+    transfer in CONDITIONAL mode: debit and credit in one guarded UPDATE
+
+    The UPDATE visits both rows in primary key order, so concurrent transfers
+    lock in account_id order just like the client mode's sorted FOR UPDATEs.
+    Two changed rows means the transfer went through; anything less (missing
+    account, insufficient funds) is rolled back.
+    """
+    if (from_account == to_account):
+        raise BankingError("Can't transfer to the same Account ID")
+    _check_amount(amount)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("START TRANSACTION")
+
+            with locking(timer):
+                cursor.execute(
+                    "UPDATE Accounts SET balance = balance + CASE WHEN account_id = %s THEN 0 - %s ELSE %s END"
+                    " WHERE account_id IN (%s, %s) AND (account_id <> %s OR balance >= %s)",
+                    (from_account, amount, amount, from_account, to_account, from_account, amount)
+                )
+            if (cursor.rowcount != 2):
+                # the credit leg may have been applied: never commit from here
+                cursor.execute("SELECT account_id FROM Accounts WHERE account_id IN (%s, %s)", (from_account, to_account))
+                if (len(cursor.fetchall()) != 2):
+                    raise BankingError("No account found.")
+                raise BankingError("Insufficient funds.")
+
+            cursor.executemany("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
+                               [(from_account, 'TRANSFER_OUT', amount), (to_account, 'TRANSFER_IN', amount)]
+            )
+
+        connection.commit()
+        released(timer)
+    except Exception:
+        connection.rollback()
+        released(timer)
+        raise
+
+
+def _write_versioned(cursor, account_id: int, delta, version: int):
+    """Add delta to the balance if the row still has version; VersionConflict otherwise"""
+    cursor.execute("UPDATE Accounts SET balance = balance + %s, version = version + 1"
+                   " WHERE account_id = %s AND version = %s", (delta, account_id, version))
+    if (cursor.rowcount == 0):
+        raise VersionConflict(f"Account {account_id} changed since it was read.")
+
+
+def _cash_optimistic(connection, reserves, account_id: int, amount: float, transaction_type: str, timer=None):
+    """DEPOSIT or WITHDRAW amount in OPTIMISTIC mode"""
+    _check_amount(amount)
+    delta = amount if transaction_type == 'DEPOSIT' else -amount
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("START TRANSACTION")
+
+            # plain read: no lock until the write
+            cursor.execute("SELECT balance, version FROM Accounts WHERE account_id = %s", (account_id, ))
+            row = cursor.fetchone()
+            if (row == None):
+                raise BankingError("No account found.")
+            if (float(row['balance']) + delta < 0):
+                raise BankingError("Insufficient funds.")
+
+            with locking(timer):
+                _write_versioned(cursor, account_id, delta, row['version'])
+            reserves.add(cursor, account_id, delta)
+            cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
+                           (account_id, transaction_type, amount)
+            )
+
+        connection.commit()
+        released(timer)
+    except Exception:
+        connection.rollback()
+        released(timer)
+        raise
+
+
+def _transfer_optimistic(connection, from_account: int, to_account: int, amount: float, timer=None):
+    """transfer in OPTIMISTIC mode: both rows read unlocked, written back in account_id order"""
+    if (from_account == to_account):
+        raise BankingError("Can't transfer to the same Account ID")
+    _check_amount(amount)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("START TRANSACTION")
+
+            cursor.execute("SELECT account_id, balance, version FROM Accounts WHERE account_id IN (%s, %s)",
+                           (from_account, to_account))
+            rows = {row['account_id']: row for row in cursor.fetchall()}
+            if (len(rows) != 2):
+                raise BankingError("No account found.")
+            if (float(rows[from_account]['balance']) - amount < 0):
+                raise BankingError("Insufficient funds.")
+
+            deltas = {from_account: -amount, to_account: amount}
+            with locking(timer):
+                for account_id in sorted(deltas):
+                    _write_versioned(cursor, account_id, deltas[account_id], rows[account_id]['version'])
+
+            cursor.executemany("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
+                               [(from_account, 'TRANSFER_OUT', amount), (to_account, 'TRANSFER_IN', amount)]
+            )
+
+        connection.commit()
+        released(timer)
+    except Exception:
+        connection.rollback()
+        released(timer)
+        raise
+
+
+def transfer_batch(connection, transfers, timer=None) -> list:
+    """
+    Apply many transfers in one transaction
+
+    transfers is a list of (from_account, to_account, amount). All affected
+    accounts are locked with one SELECT ... FOR UPDATE in account_id order
+    (so concurrent batches cannot deadlock on each other), the transfers are
+    checked in list order against the running balances, and the accepted ones
+    are written with one set-based UPDATE and one multi-row INSERT.
+
+    Returns one outcome per transfer: APPLIED, INSUFFICIENT_FUNDS,
+    NO_ACCOUNT or INVALID (amount not positive once rounded to cents, or
+    self-transfer). Rejected transfers change nothing; the rest of the batch
+    still commits.
+    """
+    account_ids = sorted({account for transfer in transfers for account in transfer[:2]})
+    if not account_ids:
+        return []
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("START TRANSACTION")
+
+            # lock every affected row once, in sorted order
+            placeholders = ", ".join(["%s"] * len(account_ids))
+            with locking(timer):
+                cursor.execute(
+                    f"SELECT account_id, balance FROM Accounts WHERE account_id IN ({placeholders})"
+                    " ORDER BY account_id FOR UPDATE",
+                    account_ids
+                )
+            balances = {row['account_id']: row['balance'] for row in cursor.fetchall()}
+
+            # check each transfer against the balances left by the ones before it
+            results = []
+            deltas = {}
+            legs = []
+            for from_account, to_account, amount in transfers:
+                # rounded to cents like each Transactions leg, so the netted deltas add up to the legs
+                amount = Decimal(str(amount)).quantize(Decimal('0.01'))
+                if amount <= 0 or from_account == to_account:
+                    results.append(INVALID)
+                elif from_account not in balances or to_account not in balances:
+                    results.append(NO_ACCOUNT)
+                elif balances[from_account] < amount:
+                    results.append(INSUFFICIENT_FUNDS)
+                else:
+                    balances[from_account] -= amount
+                    balances[to_account] += amount
+                    deltas[from_account] = deltas.get(from_account, 0) - amount
+                    deltas[to_account] = deltas.get(to_account, 0) + amount
+                    legs.append((from_account, 'TRANSFER_OUT', amount))
+                    legs.append((to_account, 'TRANSFER_IN', amount))
+                    results.append(APPLIED)
+
+            # one UPDATE for all net balance changes
+            changed = sorted(account for account, delta in deltas.items() if delta != 0)
+            if changed:
+                cases = " ".join(["WHEN %s THEN %s"] * len(changed))
+                params = [value for account in changed for value in (account, deltas[account])]
+                cursor.execute(
+                    f"UPDATE Accounts SET balance = balance + CASE account_id {cases} END"
+                    f" WHERE account_id IN ({', '.join(['%s'] * len(changed))})",
+                    params + changed
+                )
+
+            # one multi-row INSERT for all legs (pymysql batches executemany INSERTs)
+            if legs:
+                cursor.executemany(
+                    "INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
+                    legs
+                )
+
+        # commit changes
+        connection.commit()
+        released(timer)
+        return results
+    except Exception:
+        connection.rollback()
+        released(timer)
+        raise
+
+
+def get_balance(connection, account_id: int):
+    """Current balance of the account, or None if it does not exist"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT balance FROM Accounts WHERE account_id = %s", (account_id, ))
+        result = cursor.fetchone()
+    return None if result is None else result['balance']
+
+
+def list_accounts_changed(connection, since=None, overlap_seconds: float = 5.0):
+    """
+    Accounts changed since the `since` updated_at watermark, plus the total count
+
+    Returns (rows, account_count). The window reaches overlap_seconds before
+    the watermark so rows committed late by a slower transaction are not
+    missed; the caller de-duplicates. With since=None every account is returned.
+    The count lets the caller notice deleted accounts.
+    """
+    sql = ("SELECT a.account_id, c.name, c.tax_id, a.balance, a.updated_at"
+           " FROM Accounts a JOIN Customers c ON a.customer_id = c.customer_id")
+    params = []
+    if since is not None:
+        sql += " WHERE a.updated_at >= %s - INTERVAL %s MICROSECOND"
+        params = [since, int(overlap_seconds * 1000000)]
+    sql += " ORDER BY a.account_id"
+
+    try:
+        with connection.cursor() as cursor:
+            # rows and count from the same snapshot
+            cursor.execute("START TRANSACTION READ ONLY")
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            cursor.execute("SELECT COUNT(*) AS count FROM Accounts")
+            account_count = cursor.fetchone()['count']
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return rows, account_count
+
+
+def list_transactions_page(connection, page_size: int, after=None, include_archive: bool = False) -> list:
+    """
+    One page of AllCustomerTransactions, newest first
+
+    Keyset pagination on (created_at, transaction_id): `after` is the
+    (Date, TransactionID) of the last row of the previous page, or None for
+    the first page. Each page is a short range scan of
+    idx_transactions_created_id, however long the log is.
+
+    Pages end at the archive boundary unless include_archive is set, in
+    which case they continue into TransactionsArchive.
+    """
+    with connection.cursor() as cursor:
+        boundary = archive_boundary(cursor)
+    if include_archive and boundary != NO_BOUNDARY:
+        source, conditions = ARCHIVE_UNION + " AS t", []
+    else:
+        # live months only: the boundary prunes the archived-but-not-dropped partitions
+        source, conditions = "Transactions t", ["t.created_at >= %s"]
+    params = [boundary]
+    sql = ("SELECT c.name AS CustomerName, t.account_id AS AccountID, t.transaction_type AS Type,"
+           " t.amount AS Amount, t.created_at AS Date, t.transaction_id AS TransactionID"
+           f" FROM {source}"
+           " JOIN Accounts a ON t.account_id = a.account_id"
+           " JOIN Customers c ON a.customer_id = c.customer_id")
+    if after is not None:
+        conditions.append("(t.created_at < %s OR (t.created_at = %s AND t.transaction_id < %s))")
+        params += [after[0], after[0], after[1]]
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY t.created_at DESC, t.transaction_id DESC LIMIT %s"
+    params.append(page_size)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
@@ -0,0 +1,204 @@
+"""
+Database Connection Pool
+========================
+A small, thread-safe, bounded pool of pymysql connections shared by the GUI
+and the stress test.
+
+- min_size connections are opened up front, at most max_size ever exist
+- acquire() waits up to `timeout` seconds when every connection is checked out
+- a connection idle for more than `ping_interval` seconds is pinged before it
+  is handed out; a dead one is replaced transparently
+- a connection idle for longer than `recycle` seconds is closed and replaced
+  without a ping (defaults to just under the server's wait_timeout, after
+  which MySQL would have dropped it anyway)
+- a connection returned in the middle of a transaction is rolled back
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became available within the checkout timeout"""
+
+
+class ConnectionPool:
+    """Bounded pool of pymysql connections"""
+
+    def __init__(self, config: dict, min_size: int = 1, max_size: int = 10,
+                 timeout: float = 30.0, ping_interval: float = 5.0, recycle: float = None):
+        """
+        Args:
+            config: keyword arguments for pymysql.connect
+            min_size: connections opened up front and kept open
+            max_size: hard cap on open connections
+            timeout: seconds acquire() waits for a free connection
+            ping_interval: idle seconds after which a connection is pinged on checkout
+            recycle: idle seconds after which a connection is replaced
+                     (None = 90% of the server's wait_timeout)
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self.config = config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.recycle = recycle
+
+        self._idle = deque()            # (connection, last_used)
+        self._size = 0                  # open connections, idle + checked out
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # counters
+        self.checkouts = 0
+        self.wait_time = 0.0            # total seconds spent waiting in acquire()
+        self.max_wait = 0.0
+        self.exhausted = 0              # checkouts that found the pool at max_size
+        self.timeouts = 0
+        self.created = 0
+        self.recycled = 0
+        self.dead = 0                   # connections that failed the liveness ping
+
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        conn = pymysql.connect(**self.config)
+        with self._cond:
+            self.created += 1
+        if self.recycle is None:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT @@SESSION.wait_timeout AS wait_timeout")
+                row = cursor.fetchone()
+            wait_timeout = row['wait_timeout'] if isinstance(row, dict) else row[0]
+            self.recycle = float(wait_timeout) * 0.9
+        return conn
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """Check out a live connection, waiting up to `timeout` seconds"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        counted_exhausted = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # reserve the slot, connect outside the lock
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+                if not counted_exhausted:
+                    self.exhausted += 1
+                    counted_exhausted = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"No database connection available after {self.timeout:.1f}s "
+                                      f"(pool max_size={self.max_size})")
+                self._cond.wait(remaining)
+
+        try:
+            conn = self._validate(conn, last_used)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self.checkouts += 1
+            self.wait_time += waited
+            self.max_wait = max(self.max_wait, waited)
+        return conn
+
+    def _validate(self, conn, last_used):
+        """Return conn if usable, otherwise a fresh connection"""
+        if conn is None:
+            return self._connect()
+        idle = time.monotonic() - last_used
+        if self.recycle is not None and idle >= self.recycle:
+            with self._cond:
+                self.recycled += 1
+            self._close_quietly(conn)
+            return self._connect()
+        if idle >= self.ping_interval:
+            try:
+                conn.ping(reconnect=False)
+            except pymysql.MySQLError:
+                with self._cond:
+                    self.dead += 1
+                self._close_quietly(conn)
+                return self._connect()
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool"""
+        broken = not conn.open
+        if not broken and conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            # never hand the next caller someone else's open transaction
+            try:
+                conn.rollback()
+            except pymysql.MySQLError:
+                broken = True
+        with self._cond:
+            if broken or self._closed:
+                self._size -= 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as conn: ..."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close idle connections; checked-out ones are closed on release"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                self._close_quietly(conn)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """Snapshot of the pool counters"""
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'checkouts': self.checkouts,
+                'avg_wait_ms': (self.wait_time / self.checkouts * 1000) if self.checkouts else 0.0,
+                'max_wait_ms': self.max_wait * 1000,
+                'exhausted': self.exhausted,
+                'timeouts': self.timeouts,
+                'created': self.created,
+                'recycled': self.recycled,
+                'dead': self.dead
+            }
@@ -0,0 +1,291 @@
+"""
+Transaction Log Export
+======================
+Streams the transaction log out of MySQL as CSV or newline-delimited JSON
+with flat memory use, however many rows there are.
+
+- rows come through an unbuffered server-side cursor (pymysql SSCursor),
+  fetched CHUNK_SIZE at a time and written straight out; nothing is
+  accumulated, and rows stay tuples (no dict per row as with DictCursor)
+- two sources: 'transactions' (the raw Transactions columns) or 'customer'
+  (the AllCustomerTransactions view, with the customer name)
+- optional filters: created_at range (prunes the monthly partitions) and a
+  list of accounts
+- rows are exported in transaction_id order, so an export can resume after
+  the last id written: pass --resume-from, or --checkpoint FILE, which is
+  rewritten after every chunk and read back on the next run
+- archived months (archive.py) are exported first with include_archive, as
+  a separate stream: ids don't follow time (seed.seed_history gives its
+  past-dated rows the highest ids), so a position is the stream plus the id,
+  written 'archive:<id>' or 'live:<id>'
+
+An unbuffered cursor keeps its statement open on the server until the last
+row is read, so the connection can't be used for anything else meanwhile,
+and a slow consumer must finish each write within net_write_timeout (raised
+for the session to EXPORT_WRITE_TIMEOUT).
+
+Examples:
+    python export.py --output log.csv
+    python export.py --source customer --format ndjson --start 2026-09-01 --end 2026-10-01 --output sept.ndjson
+    python export.py --account 42 --checkpoint export.ckpt --output account42.csv
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import pymysql
+
+from archive import ARCHIVE_TABLE, NO_BOUNDARY, archive_boundary
+
+CHUNK_SIZE = 10000
+
+# Seconds the server waits for the client to take the next packet
+EXPORT_WRITE_TIMEOUT = 3600
+
+# Seconds between progress lines on stderr
+PROGRESS_INTERVAL = 5.0
+
+# the two id-ordered streams, in export order
+ARCHIVE_PHASE = 'archive'
+LIVE_PHASE = 'live'
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+FORMATS = (CSV, NDJSON)
+
+# source -> (FROM, columns, id / time / account column names)
+SOURCES = {
+    'transactions': ("Transactions",
+                     ('transaction_id', 'account_id', 'transaction_type', 'amount', 'created_at'),
+                     'transaction_id', 'created_at', 'account_id'),
+    'customer': ("AllCustomerTransactions",
+                 ('TransactionID', 'CustomerName', 'AccountID', 'Type', 'Amount', 'Date'),
+                 'TransactionID', 'Date', 'AccountID')
+}
+
+# the archive has no customer names of its own: join them like the view does
+ARCHIVE_SOURCES = {
+    'transactions': (ARCHIVE_TABLE, SOURCES['transactions'][1], 'transaction_id', 'created_at', 'account_id'),
+    'customer': (f"(SELECT t.transaction_id AS TransactionID, c.name AS CustomerName, t.account_id AS AccountID,"
+                 f" t.transaction_type AS Type, t.amount AS Amount, t.created_at AS Date FROM {ARCHIVE_TABLE} t"
+                 " JOIN Accounts a ON t.account_id = a.account_id"
+                 " JOIN Customers c ON a.customer_id = c.customer_id) AS archived",
+                 SOURCES['customer'][1], 'TransactionID', 'Date', 'AccountID')
+}
+
+
+def _select(source: tuple, after_id: int, start, end, account_ids, live_from=None) -> tuple:
+    """SELECT ... ORDER BY id for one source and the filters; returns (sql, params)"""
+    table, columns, id_column, time_column, account_column = source
+    conditions = [f"{id_column} > %s"]
+    params = [after_id]
+    if live_from is not None:
+        # live rows only (archived-but-not-yet-dropped months are exported from the archive)
+        conditions.append(f"{time_column} >= %s")
+        params.append(live_from)
+    if start is not None:
+        conditions.append(f"{time_column} >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append(f"{time_column} < %s")
+        params.append(end)
+    if account_ids:
+        conditions.append(f"{account_column} IN (" + ", ".join(["%s"] * len(account_ids)) + ")")
+        params += list(account_ids)
+    sql = (f"SELECT {', '.join(columns)} FROM {table} WHERE " + " AND ".join(conditions)
+           + f" ORDER BY {id_column}")
+    return sql, params
+
+
+def stream_transactions(conn, source: str = 'transactions', start=None, end=None, account_ids=None,
+                        after_id: int = 0, include_archive: bool = False, chunk_size: int = CHUNK_SIZE,
+                        phase: str = None):
+    """
+    Yield (phase, rows) pairs, rows being a list of at most chunk_size tuples
+    in transaction_id order, read through an unbuffered cursor
+
+    The first value of every tuple is the transaction id (the checkpoint).
+    With include_archive, the ARCHIVE_PHASE rows come first, then the
+    LIVE_PHASE ones. after_id applies to the stream named by phase (None: the
+    first one); earlier streams are skipped and later ones start from 0.
+    """
+    if source not in SOURCES:
+        raise ValueError(f"Unknown export source '{source}' (expected one of {', '.join(SOURCES)})")
+
+    with conn.cursor() as cursor:
+        cursor.execute("SET SESSION net_write_timeout = %s", (EXPORT_WRITE_TIMEOUT, ))
+        boundary = archive_boundary(cursor)
+    conn.commit()
+
+    phases = [LIVE_PHASE]
+    if include_archive and boundary != NO_BOUNDARY:
+        phases.insert(0, ARCHIVE_PHASE)
+    if phase is None:
+        phase = phases[0]
+    if phase not in phases:
+        raise ValueError(f"Can't resume the '{phase}' rows: the export covers {' and '.join(phases)} only")
+    phases = phases[phases.index(phase):]
+
+    queries = []
+    for stream in phases:
+        stream_after = after_id if stream == phase else 0
+        if stream == ARCHIVE_PHASE:
+            queries.append((stream, _select(ARCHIVE_SOURCES[source], stream_after, start, end, account_ids)))
+        else:
+            queries.append((stream, _select(SOURCES[source], stream_after, start, end, account_ids,
+                                            live_from=boundary)))
+
+    for stream, (sql, params) in queries:
+        cursor = conn.cursor(pymysql.cursors.SSCursor)
+        try:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield stream, rows
+        finally:
+            # reads (and discards) whatever is left, so the connection is usable again
+            cursor.close()
+    conn.commit()
+
+
+def columns_of(source: str) -> tuple:
+    return SOURCES[source][1]
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return str(value)
+
+
+def parse_position(text: str) -> tuple:
+    """'archive:<id>' or 'live:<id>' -> (phase, id); a bare id has no phase (None)"""
+    phase, _, transaction_id = text.strip().rpartition(':')
+    if phase and phase not in (ARCHIVE_PHASE, LIVE_PHASE):
+        raise ValueError(f"Unknown export phase '{phase}' (expected {ARCHIVE_PHASE} or {LIVE_PHASE})")
+    return (phase or None), int(transaction_id or 0)
+
+
+def _read_checkpoint(path: str) -> tuple:
+    try:
+        with open(path) as f:
+            return parse_position(f.read())
+    except FileNotFoundError:
+        return None, 0
+
+
+def _write_checkpoint(path: str, phase: str, transaction_id: int):
+    # write-then-rename, so a crash never leaves a half-written checkpoint
+    with open(path + '.tmp', 'w') as f:
+        f.write(f"{phase}:{transaction_id}")
+    os.replace(path + '.tmp', path)
+
+
+def export_log(conn, out, fmt: str = CSV, source: str = 'transactions', start=None, end=None,
+               account_ids=None, after_id: int = 0, include_archive: bool = False,
+               checkpoint: str = None, write_header: bool = True, chunk_size: int = CHUNK_SIZE,
+               progress=None, phase: str = None) -> dict:
+    """
+    Write the selected rows to the text stream out as CSV or NDJSON
+
+    Args:
+        phase: the stream after_id belongs to (see stream_transactions)
+        checkpoint: file updated with the last exported position ('<phase>:<id>') after every chunk
+        progress: callable(rows, rows_per_second, last_id), called every PROGRESS_INTERVAL seconds
+
+    Returns:
+        dict with rows written, the last phase and transaction id, elapsed seconds and rows per second
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}' (expected one of {', '.join(FORMATS)})")
+    columns = columns_of(source)
+    writer = csv.writer(out, lineterminator='\n') if fmt == CSV else None
+    if writer is not None and write_header:
+        writer.writerow(columns)
+
+    start_time = time.perf_counter()
+    last_report = start_time
+    rows_written = 0
+    last_phase = phase
+    last_id = after_id
+    for last_phase, rows in stream_transactions(conn, source, start, end, account_ids, after_id, include_archive,
+                                                chunk_size, phase):
+        if writer is not None:
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                out.write(json.dumps(dict(zip(columns, row)), default=_json_value))
+                out.write('\n')
+        rows_written += len(rows)
+        last_id = rows[-1][0]
+        if checkpoint:
+            out.flush()
+            _write_checkpoint(checkpoint, last_phase, last_id)
+        now = time.perf_counter()
+        if progress is not None and now - last_report >= PROGRESS_INTERVAL:
+            progress(rows_written, rows_written / (now - start_time), last_id)
+            last_report = now
+    out.flush()
+
+    elapsed = time.perf_counter() - start_time
+    return {
+        'rows': rows_written,
+        'phase': last_phase,
+        'last_transaction_id': last_id,
+        'seconds': elapsed,
+        'rows_per_second': rows_written / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def _parse_time(text: str) -> datetime:
+    return datetime.fromisoformat(text)
+
+
+if __name__ == "__main__":
+    import test_acid
+
+    parser = argparse.ArgumentParser(description="Stream the transaction log to CSV or NDJSON")
+    parser.add_argument('--source', choices=tuple(SOURCES), default='transactions')
+    parser.add_argument('--format', choices=FORMATS, default=CSV)
+    parser.add_argument('--output', default='-', help="file to write ('-' for stdout)")
+    parser.add_argument('--start', type=_parse_time, help="created_at >= START")
+    parser.add_argument('--end', type=_parse_time, help="created_at < END")
+    parser.add_argument('--account', type=int, action='append', help="only this account (repeatable)")
+    parser.add_argument('--archive', action='store_true', help="include archived months")
+    parser.add_argument('--resume-from', default=None,
+                        help="export after this position: an id, or archive:ID / live:ID with --archive")
+    parser.add_argument('--checkpoint', help="file holding the last exported position; resumes from it if present")
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help="rows per fetch")
+    options = parser.parse_args()
+
+    if options.resume_from is not None:
+        phase, after_id = parse_position(options.resume_from)
+    else:
+        phase, after_id = _read_checkpoint(options.checkpoint) if options.checkpoint else (None, 0)
+    if options.archive and after_id > 0 and phase is None:
+        # a bare id can't tell which of the two streams it belongs to
+        parser.error("with --archive, resume from archive:ID or live:ID")
+    resuming = after_id > 0 and options.output != '-' and os.path.exists(options.output)
+
+    def report(rows, rate, last_id):
+        print(f"{rows:,} rows, {rate:,.0f} rows/second, last id {last_id}", file=sys.stderr)
+
+    conn = test_acid.get_connection()
+    out = sys.stdout if options.output == '-' else open(options.output, 'a' if resuming else 'w', newline='')
+    try:
+        result = export_log(conn, out, options.format, options.source, options.start, options.end,
+                            options.account, after_id, options.archive, options.checkpoint,
+                            write_header=not resuming, chunk_size=options.chunk, progress=report, phase=phase)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        conn.close()
+    print(f"Exported {result['rows']:,} rows in {result['seconds']:.2f}s = {result['rows_per_second']:,.0f} "
+          f"rows/second (last transaction id {result['last_transaction_id']})", file=sys.stderr)
@@ -1,5 +1,6 @@
 -- Banking System Database Schema
--- Run this file to initialize the database tables and views
+-- Run this file to initialize the database tables and views, then bring the
+-- schema up to date with `python migrate.py` (scripts in migrations/)
 
 -- 1. Customers table
 CREATE TABLE IF NOT EXISTS Customers (
@@ -13,6 +14,9 @@ CREATE TABLE IF NOT EXISTS Accounts (
     account_id INT AUTO_INCREMENT PRIMARY KEY,
     customer_id INT NOT NULL,
     balance DECIMAL(15, 2) DEFAULT 0.00,
+    -- bumped by every change, lets the All Accounts tab fetch only changed rows
+    updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    INDEX idx_accounts_updated_at (updated_at),
     FOREIGN KEY (customer_id) REFERENCES Customers(customer_id)
     -- TODO TODO2: Add CHECK constraint - balance >= 0 (prevents overdraft)
 );
@@ -30,17 +34,55 @@ CREATE TABLE IF NOT EXISTS Transactions (
 );
 
 
+-- Keyset pagination of the Transactions tab: newest first by (created_at, transaction_id)
+CREATE INDEX idx_transactions_created_id ON Transactions (created_at, transaction_id);
+
+-- One account's history in time order: statements with a running balance
+CREATE INDEX idx_transactions_account_created ON Transactions (account_id, created_at);
+
+-- 3b. BalanceSnapshots table
+-- Periodic copies of every balance (balance_history.take_snapshot).
+-- last_transaction_id is the account's newest transaction included in the
+-- balance; balance-as-of replays only the account's transactions after it.
+CREATE TABLE IF NOT EXISTS BalanceSnapshots (
+    account_id INT NOT NULL,
+    snapshot_at TIMESTAMP(6) NOT NULL,
+    balance DECIMAL(15, 2) NOT NULL,
+    last_transaction_id INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (account_id, snapshot_at),
+    INDEX idx_balancesnapshots_snapshot_at (snapshot_at)
+);
+
+
 -- 4. BankReserves table
+-- A branch reserve is striped across several slot rows; the branch total is
+-- SUM(total_reserve) over its slots. Each account's cash movements only touch
+-- slot (account_id MOD number_of_slots), see reserves.py.
 CREATE TABLE IF NOT EXISTS BankReserves (
-    branch_id INT AUTO_INCREMENT PRIMARY KEY,
-    total_reserve DECIMAL(15, 2) DEFAULT 0.00
+    branch_id INT NOT NULL,
+    slot_id INT NOT NULL DEFAULT 0,
+    total_reserve DECIMAL(15, 2) DEFAULT 0.00,
+    PRIMARY KEY (branch_id, slot_id)
 );
 
--- Initialize BankReserves with a default branch
-INSERT INTO BankReserves (total_reserve) 
-SELECT 0.00 
+-- Initialize BankReserves with a default branch (one slot)
+INSERT INTO BankReserves (branch_id, slot_id, total_reserve)
+SELECT 1, 0, 0.00
 WHERE NOT EXISTS (SELECT 1 FROM BankReserves);
 
+-- 4b. ReserveDeltas table (reserve journal mode)
+-- Insert-only log of reserve changes; a background aggregator folds the rows
+-- into their BankReserves slot and deletes them. The exact reserve is
+-- SUM(BankReserves.total_reserve) + SUM(ReserveDeltas.amount).
+CREATE TABLE IF NOT EXISTS ReserveDeltas (
+    delta_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    branch_id INT NOT NULL,
+    slot_id INT NOT NULL,
+    amount DECIMAL(15, 2) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_reservedeltas_branch (branch_id, delta_id)
+);
+
 -- 5. AllCustomerTransactions View
 DROP VIEW IF EXISTS AllCustomerTransactions;
 
@@ -50,11 +92,30 @@ SELECT
     t.account_id AS AccountID,
     t.transaction_type AS Type,
     t.amount AS Amount,
-    t.created_at AS Date
+    t.created_at AS Date,
+    t.transaction_id AS TransactionID
 FROM Transactions t
 JOIN Accounts a ON t.account_id = a.account_id
 JOIN Customers c ON a.customer_id = c.customer_id
-ORDER BY t.created_at DESC;
+ORDER BY t.created_at DESC, t.transaction_id DESC;
+
+
+-- 6. AccountStatement View
+-- Every transaction with the account's balance right after it. Filter on
+-- AccountID only (pushed below the window); for a date range use
+-- balance_history.account_statement, which opens from a balance snapshot.
+DROP VIEW IF EXISTS AccountStatement;
+
+CREATE VIEW AccountStatement AS
+SELECT
+    t.account_id AS AccountID,
+    t.transaction_id AS TransactionID,
+    t.transaction_type AS Type,
+    t.amount AS Amount,
+    t.created_at AS Date,
+    SUM(CASE WHEN t.transaction_type IN ('WITHDRAW', 'TRANSFER_OUT') THEN -t.amount ELSE t.amount END)
+        OVER (PARTITION BY t.account_id ORDER BY t.created_at, t.transaction_id) AS RunningBalance
+FROM Transactions t;
 
 
 -- TODO2 Part 1: Add CHECK Constraints
@@ -63,14 +124,31 @@ ALTER TABLE Transactions ADD CONSTRAINT check_transactions_amount_positive CHECK
 
 
 -- TODO2 Part 2: Create Trigger to Auto-Update BankReserves
+-- Sessions that book the reserve themselves (reserves.py) or only move money
+-- between accounts (transfers leave the total unchanged) set
+-- @reserve_explicit = 1 and the trigger skips them. A transfer booked here
+-- would lock two slots in statement order, and two transfers taking the same
+-- pair of slots in opposite order would deadlock.
 DELIMITER $$
 CREATE TRIGGER update_bankreserves_total_reserve
 AFTER UPDATE ON Accounts
 FOR EACH ROW
 BEGIN
     DECLARE diff DECIMAL(15, 2);
+    DECLARE slots INT;
     SET diff = NEW.balance - OLD.balance;
-    UPDATE BankReserves SET total_reserve = total_reserve + diff;
+    IF diff <> 0 AND COALESCE(@reserve_explicit, 0) = 0 THEN
+        -- only touch the slot this account hashes to
+        SELECT COUNT(*) INTO slots FROM BankReserves WHERE branch_id = 1;
+        IF @reserve_journal = 1 THEN
+            -- journal mode (session opted in): append, never lock BankReserves
+            INSERT INTO ReserveDeltas (branch_id, slot_id, amount)
+            VALUES (1, NEW.account_id MOD GREATEST(slots, 1), diff);
+        ELSE
+            UPDATE BankReserves SET total_reserve = total_reserve + diff
+            WHERE branch_id = 1 AND slot_id = NEW.account_id MOD GREATEST(slots, 1);
+        END IF;
+    END IF;
 END$$
 DELIMITER ;
 
@@ -88,7 +166,114 @@ END$$
 DELIMITER ;
 
 
--- TODO2 Part 4: Create Stored Procedure for Transfer
+-- TODO2 Part 4: Create Stored Procedures for Deposit, Withdraw and Transfer
+-- Each procedure is a whole banking operation in one CALL (one round trip).
+-- On any error the handler rolls back and RESIGNALs, so the caller sees the
+-- error; business rule violations use SQLSTATE '45000' with a user message.
+-- Accounts are always locked in account_id order, so two opposite-direction
+-- transfers can't deadlock, and the account row is locked before its reserve slot.
+
+-- Reserve bookkeeping shared by the procedures: same slot / journal rules as
+-- reserves.py and the update_bankreserves_total_reserve trigger
+DROP PROCEDURE IF EXISTS apply_reserve_change;
+DELIMITER $$
+CREATE PROCEDURE apply_reserve_change(
+    IN change_account_id INT,
+    IN change_amount DECIMAL(15, 2)
+)
+BEGIN
+    DECLARE slots INT;
+    SELECT COUNT(*) INTO slots FROM BankReserves WHERE branch_id = 1;
+    IF @reserve_journal = 1 THEN
+        INSERT INTO ReserveDeltas (branch_id, slot_id, amount)
+        VALUES (1, change_account_id MOD GREATEST(slots, 1), change_amount);
+    ELSE
+        UPDATE BankReserves SET total_reserve = total_reserve + change_amount
+        WHERE branch_id = 1 AND slot_id = change_account_id MOD GREATEST(slots, 1);
+    END IF;
+END$$
+DELIMITER ;
+
+
+DROP PROCEDURE IF EXISTS deposit_money;
+DELIMITER $$
+CREATE PROCEDURE deposit_money(
+    IN deposit_account_id INT,
+    IN deposit_amount DECIMAL(15, 2)
+)
+BEGIN
+    DECLARE current_balance DECIMAL(15, 2) DEFAULT NULL;
+
+    -- rollback and re-raise if any SQL error occurs
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF deposit_amount <= 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Amount must be positive number';
+    END IF;
+
+    START TRANSACTION;
+
+    -- lock row (also tells us whether the account exists)
+    SELECT balance INTO current_balance FROM Accounts WHERE account_id = deposit_account_id FOR UPDATE;
+    IF current_balance IS NULL THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'No account found.';
+    END IF;
+
+    -- update Accounts balance, BankReserves and insert Transaction
+    UPDATE Accounts SET balance = balance + deposit_amount WHERE account_id = deposit_account_id;
+    CALL apply_reserve_change(deposit_account_id, deposit_amount);
+    INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (deposit_account_id, 'DEPOSIT', deposit_amount);
+
+    COMMIT;
+END$$
+DELIMITER ;
+
+
+DROP PROCEDURE IF EXISTS withdraw_money;
+DELIMITER $$
+CREATE PROCEDURE withdraw_money(
+    IN withdraw_account_id INT,
+    IN withdraw_amount DECIMAL(15, 2)
+)
+BEGIN
+    DECLARE current_balance DECIMAL(15, 2) DEFAULT NULL;
+
+    -- rollback and re-raise if any SQL error occurs
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF withdraw_amount <= 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Amount must be positive number';
+    END IF;
+
+    START TRANSACTION;
+
+    -- lock row and check sufficient funds
+    SELECT balance INTO current_balance FROM Accounts WHERE account_id = withdraw_account_id FOR UPDATE;
+    IF current_balance IS NULL THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'No account found.';
+    ELSEIF current_balance < withdraw_amount THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient funds.';
+    END IF;
+
+    -- update Accounts balance, BankReserves and insert Transaction
+    UPDATE Accounts SET balance = balance - withdraw_amount WHERE account_id = withdraw_account_id;
+    CALL apply_reserve_change(withdraw_account_id, -withdraw_amount);
+    INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (withdraw_account_id, 'WITHDRAW', withdraw_amount);
+
+    COMMIT;
+END$$
+DELIMITER ;
+
+
+DROP PROCEDURE IF EXISTS transfer_money;
 DELIMITER $$
 CREATE PROCEDURE transfer_money(
     IN from_account_id INT,
@@ -96,37 +281,45 @@ CREATE PROCEDURE transfer_money(
     IN transfer_amount DECIMAL(15, 2)
 )
 BEGIN
-    -- create valuable
-    DECLARE len INT;
+    DECLARE locked INT;
+    DECLARE from_balance DECIMAL(15, 2) DEFAULT NULL;
+    DECLARE caller_explicit INT;
 
-    -- rollback if any SQL error occurs
+    -- rollback and re-raise if any SQL error occurs
     DECLARE EXIT HANDLER FOR SQLEXCEPTION
     BEGIN
         ROLLBACK;
+        SET @reserve_explicit = caller_explicit;
+        RESIGNAL;
     END;
 
-    -- start transaction
-    START TRANSACTION;
+    -- the reserve total doesn't change: keep the trigger off the reserve slots
+    SET caller_explicit = @reserve_explicit;
+    SET @reserve_explicit = 1;
 
     -- validate inputs
-    SELECT COUNT(account_id) INTO len FROM Accounts WHERE account_id IN (from_account_id, to_account_id);
-    IF len != 2 THEN
-        ROLLBACK;
-        SIGNAL SQLSTATE '45000'
-            SET MESSAGE_TEXT = 'Account not found';
-    ELSEIF transfer_amount <= 0 THEN
-        ROLLBACK;
-        SIGNAL SQLSTATE '45000'
-            SET MESSAGE_TEXT = 'Amount must be positive';
+    IF transfer_amount <= 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Amount must be positive number';
     ELSEIF from_account_id = to_account_id THEN
-        ROLLBACK;
-        SIGNAL SQLSTATE '45000'
-            SET MESSAGE_TEXT = 'Cannot transfer to the same Account ID';
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Can''t transfer to the same Account ID';
     END IF;
 
-    -- lock rows
-    SELECT balance FROM Accounts WHERE account_id = from_account_id FOR UPDATE;
-    SELECT balance FROM Accounts WHERE account_id = to_account_id FOR UPDATE;
+    START TRANSACTION;
+
+    -- lock both rows in account_id order (prevents deadlocks)
+    SELECT COUNT(*) INTO locked FROM Accounts
+    WHERE account_id = LEAST(from_account_id, to_account_id) FOR UPDATE;
+    SELECT COUNT(*) + locked INTO locked FROM Accounts
+    WHERE account_id = GREATEST(from_account_id, to_account_id) FOR UPDATE;
+    IF locked != 2 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'No account found.';
+    END IF;
+
+    -- check sufficient funds (row already locked above)
+    SELECT balance INTO from_balance FROM Accounts WHERE account_id = from_account_id;
+    IF from_balance < transfer_amount THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient funds.';
+    END IF;
 
     -- update from_account balance, to_account balance and insert Transaction
     UPDATE Accounts SET balance = balance - transfer_amount WHERE account_id = from_account_id;
@@ -136,6 +329,7 @@ BEGIN
 
     -- commit changes
     COMMIT;
+    SET @reserve_explicit = caller_explicit;
 END$$
 DELIMITER ;
 
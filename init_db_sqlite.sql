@@ -0,0 +1,63 @@
+-- Banking System Database Schema (SQLite backend)
+-- Same tables as init_db.sql for the embedded SQLite engine used by
+-- backends.SQLiteBackend. Money is stored as integer cents (SQLite has no
+-- DECIMAL type). SQLite serialises writers, so the reserve is one slot per
+-- branch and triggers / stored procedures are not needed: the backend
+-- updates BankReserves inside each BEGIN IMMEDIATE transaction.
+
+-- 1. Customers table
+CREATE TABLE IF NOT EXISTS Customers (
+    customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    tax_id TEXT UNIQUE NOT NULL
+);
+
+-- 2. Accounts table
+CREATE TABLE IF NOT EXISTS Accounts (
+    account_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INTEGER NOT NULL REFERENCES Customers(customer_id),
+    balance_cents INTEGER NOT NULL DEFAULT 0 CHECK (balance_cents >= 0),
+    updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_accounts_updated_at ON Accounts (updated_at);
+
+-- 3. Transactions table
+-- transaction_type: 'DEPOSIT', 'WITHDRAW', 'TRANSFER_IN', 'TRANSFER_OUT', 'OPEN_ACCOUNT'
+CREATE TABLE IF NOT EXISTS Transactions (
+    transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INTEGER NOT NULL REFERENCES Accounts(account_id),
+    transaction_type TEXT NOT NULL,
+    amount_cents INTEGER NOT NULL CHECK (amount_cents >= 0),
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_created_id ON Transactions (created_at, transaction_id);
+
+-- 4. BankReserves table
+CREATE TABLE IF NOT EXISTS BankReserves (
+    branch_id INTEGER NOT NULL,
+    slot_id INTEGER NOT NULL DEFAULT 0,
+    total_reserve_cents INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (branch_id, slot_id)
+);
+
+INSERT INTO BankReserves (branch_id, slot_id, total_reserve_cents)
+SELECT 1, 0, 0
+WHERE NOT EXISTS (SELECT 1 FROM BankReserves);
+
+-- 5. AllCustomerTransactions View
+DROP VIEW IF EXISTS AllCustomerTransactions;
+
+CREATE VIEW AllCustomerTransactions AS
+SELECT
+    c.name AS CustomerName,
+    t.account_id AS AccountID,
+    t.transaction_type AS Type,
+    t.amount_cents / 100.0 AS Amount,
+    t.created_at AS Date,
+    t.transaction_id AS TransactionID
+FROM Transactions t
+JOIN Accounts a ON t.account_id = a.account_id
+JOIN Customers c ON a.customer_id = c.customer_id
+ORDER BY t.created_at DESC, t.transaction_id DESC;
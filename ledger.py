@@ -0,0 +1,240 @@
+"""
+In-Memory Ledger
+================
+A reference banking engine that keeps everything in process memory, as an
+upper bound to benchmark the database paths against.
+
+- balances are integer cents in an array('q') indexed by account_id - 1
+  (8 bytes per account, so millions of accounts are cheap)
+- accounts are protected by striped locks: account_id MOD stripes picks the
+  lock; a transfer takes its two stripes in stripe order, so two opposite
+  transfers can't deadlock (the same rule as locking rows in account_id order)
+- the bank reserve is sharded the same way, one counter per stripe, updated
+  under the stripe lock the operation already holds; the total is the sum
+- every booking is appended to a column-oriented, append-only transaction log
+
+Business rule violations raise banking_ops.BankingError with the same
+messages as the SQL paths.
+"""
+
+import heapq
+import threading
+import time
+from array import array
+from datetime import datetime
+
+from banking_ops import BankingError
+from metrics import locking, released
+
+STRIPES = 64
+
+# transaction_type codes of the log
+TRANSACTION_TYPES = ('DEPOSIT', 'WITHDRAW', 'TRANSFER_IN', 'TRANSFER_OUT', 'OPEN_ACCOUNT')
+DEPOSIT, WITHDRAW, TRANSFER_IN, TRANSFER_OUT, OPEN_ACCOUNT = range(len(TRANSACTION_TYPES))
+
+
+class MemoryLedger:
+    """Accounts, reserve and transaction log of one bank, held in memory"""
+
+    def __init__(self, stripes: int = STRIPES):
+        if stripes < 1:
+            raise ValueError("Stripe count must be at least 1")
+        self.stripes = stripes
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._reserve = array('q', bytes(8 * stripes))   # cents per shard
+        self._open_lock = threading.Lock()                # new customers / accounts
+        self._log_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop every customer, account, log entry and the reserve"""
+        with self._open_lock, self._log_lock:
+            self._balances = array('q')         # cents, index account_id - 1
+            self._owners = array('q')           # customer_id, index account_id - 1
+            self._customer_names = []           # index customer_id - 1
+            self._customer_by_tax_id = {}
+            for shard in range(self.stripes):
+                self._reserve[shard] = 0
+            # transaction log columns, index transaction_id - 1
+            self._log_accounts = array('q')
+            self._log_types = array('b')
+            self._log_amounts = array('q')
+            self._log_times = array('d')
+
+    def _stripe(self, account_id: int) -> int:
+        return account_id % self.stripes
+
+    def _check_account(self, account_id: int):
+        if not 1 <= account_id <= len(self._balances):
+            raise BankingError("No account found.")
+
+    @staticmethod
+    def _positive_cents(amount) -> int:
+        cents = int(round(float(amount) * 100))
+        if cents <= 0:
+            raise BankingError("Amount must be positive number")
+        return cents
+
+    def _log(self, account_id: int, transaction_type: int, cents: int):
+        with self._log_lock:
+            self._log_accounts.append(account_id)
+            self._log_types.append(transaction_type)
+            self._log_amounts.append(cents)
+            self._log_times.append(time.time())
+
+    # --- customers and accounts ---
+
+    def create_accounts(self, customers: list, initial_cents: int) -> list:
+        """
+        Bulk-create one account per (name, tax_id) with initial_cents each,
+        booked as OPEN_ACCOUNT; returns the new account ids
+        """
+        ids = []
+        with self._open_lock:
+            for name, tax_id in customers:
+                customer_id = self._customer_id(name, tax_id)
+                self._owners.append(customer_id)
+                self._balances.append(0)
+                ids.append(len(self._balances))
+        if initial_cents > 0:
+            for account_id in ids:
+                with self._locks[self._stripe(account_id)]:
+                    self._balances[account_id - 1] += initial_cents
+                    self._reserve[self._stripe(account_id)] += initial_cents
+                    self._log(account_id, OPEN_ACCOUNT, initial_cents)
+        return ids
+
+    def _customer_id(self, name: str, tax_id: str) -> int:
+        """Existing customer with this tax_id, or a new one (caller holds _open_lock)"""
+        customer_id = self._customer_by_tax_id.get(tax_id)
+        if customer_id is None:
+            self._customer_names.append(name)
+            customer_id = len(self._customer_names)
+            self._customer_by_tax_id[tax_id] = customer_id
+        return customer_id
+
+    def open_account(self, customer_name: str, tax_id: str, initial_deposit: float) -> int:
+        """Create (or reuse) the customer, open an account and book the initial deposit"""
+        cents = int(round(float(initial_deposit) * 100))
+        if cents < 0:
+            raise BankingError("Amount must be positive number")
+        return self.create_accounts([(customer_name, tax_id)], cents)[0]
+
+    def customer_name(self, account_id: int) -> str:
+        self._check_account(account_id)
+        return self._customer_names[self._owners[account_id - 1] - 1]
+
+    @property
+    def account_count(self) -> int:
+        return len(self._balances)
+
+    # --- money movements ---
+
+    def deposit(self, account_id: int, amount: float, timer=None):
+        """Add amount to the account and its reserve shard"""
+        cents = self._positive_cents(amount)
+        self._check_account(account_id)
+        stripe = self._stripe(account_id)
+        with locking(timer):
+            self._locks[stripe].acquire()
+        try:
+            self._balances[account_id - 1] += cents
+            self._reserve[stripe] += cents
+            self._log(account_id, DEPOSIT, cents)
+        finally:
+            self._locks[stripe].release()
+            released(timer)
+
+    def withdraw(self, account_id: int, amount: float, timer=None):
+        """Take amount from the account and its reserve shard if funds allow"""
+        cents = self._positive_cents(amount)
+        self._check_account(account_id)
+        stripe = self._stripe(account_id)
+        with locking(timer):
+            self._locks[stripe].acquire()
+        try:
+            if self._balances[account_id - 1] < cents:
+                raise BankingError("Insufficient funds.")
+            self._balances[account_id - 1] -= cents
+            self._reserve[stripe] -= cents
+            self._log(account_id, WITHDRAW, cents)
+        finally:
+            self._locks[stripe].release()
+            released(timer)
+
+    def transfer(self, from_account: int, to_account: int, amount: float, timer=None):
+        """Move amount between two accounts, taking their stripe locks in stripe order"""
+        cents = self._positive_cents(amount)
+        if from_account == to_account:
+            raise BankingError("Can't transfer to the same Account ID")
+        self._check_account(from_account)
+        self._check_account(to_account)
+        stripes = sorted({self._stripe(from_account), self._stripe(to_account)})
+        with locking(timer):
+            for stripe in stripes:
+                self._locks[stripe].acquire()
+        try:
+            if self._balances[from_account - 1] < cents:
+                raise BankingError("Insufficient funds.")
+            self._balances[from_account - 1] -= cents
+            self._balances[to_account - 1] += cents
+            # money stays in the bank: each shard follows its own account
+            self._reserve[self._stripe(from_account)] -= cents
+            self._reserve[self._stripe(to_account)] += cents
+            self._log(from_account, TRANSFER_OUT, cents)
+            self._log(to_account, TRANSFER_IN, cents)
+        finally:
+            for stripe in reversed(stripes):
+                self._locks[stripe].release()
+            released(timer)
+
+    # --- reads ---
+
+    def balance(self, account_id: int):
+        """Current balance as a float, or None if the account does not exist"""
+        if not 1 <= account_id <= len(self._balances):
+            return None
+        return self._balances[account_id - 1] / 100.0
+
+    def snapshot_totals(self, account_ids=None) -> tuple:
+        """
+        (sum of balances, reserve) in cents at one consistent point in time:
+        holds every stripe lock while summing, so nothing moves meanwhile
+        """
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            if account_ids is None:
+                balances = sum(self._balances)
+            else:
+                balances = sum(self._balances[account_id - 1] for account_id in account_ids)
+            return balances, sum(self._reserve)
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    def reserves_total(self) -> float:
+        return self.snapshot_totals(account_ids=())[1] / 100.0
+
+    def statement_page(self, page_size: int, after=None) -> list:
+        """Newest-first log entries, same rows and keyset as banking_ops.list_transactions_page"""
+        with self._log_lock:
+            count = len(self._log_amounts)
+        keys = ((self._log_times[i], i + 1) for i in range(count))
+        if after is not None:
+            # rows carry datetimes, the log keeps epoch seconds
+            after = (after[0].timestamp(), after[1])
+            keys = (key for key in keys if key < after)
+        rows = []
+        for created_at, transaction_id in heapq.nlargest(page_size, keys):
+            i = transaction_id - 1
+            account_id = self._log_accounts[i]
+            rows.append({
+                'CustomerName': self.customer_name(account_id),
+                'AccountID': account_id,
+                'Type': TRANSACTION_TYPES[self._log_types[i]],
+                'Amount': self._log_amounts[i] / 100.0,
+                'Date': datetime.fromtimestamp(created_at),
+                'TransactionID': transaction_id
+            })
+        return rows
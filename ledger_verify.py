@@ -0,0 +1,180 @@
+"""
+Ledger Replay Verifier
+======================
+Recomputes every account's balance from its Transactions rows
+(OPEN_ACCOUNT + DEPOSIT + TRANSFER_IN - WITHDRAW - TRANSFER_OUT) and
+compares it with Accounts.balance, then checks that all balances add up to
+the bank reserve.
+
+- streams accounts in primary-key chunks (WHERE account_id > last ORDER BY
+  account_id LIMIT n) and aggregates only that id range of Transactions,
+  so memory stays bounded however large the tables are
+- runs inside one START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY:
+  plain non-locking reads of a single point in time, so it can check while
+  load is running without blocking (or being confused by) writers
+- reports every mismatching account (up to a limit) and the scan rate
+- archived months (archive.py) are not re-read: each account starts from
+  its ArchivedBalances carry-forward and only live rows, created at or after
+  the archive boundary, are replayed on top
+
+The snapshot is held for the whole scan, which keeps InnoDB from purging
+undo history meanwhile; on very large tables use a bigger chunk and run it
+off-peak.
+
+Example:
+    python ledger_verify.py --chunk 5000
+"""
+
+import argparse
+import time
+
+from archive import NO_BOUNDARY, archive_boundary
+from reserves import BRANCH_ID, ReserveCounter
+
+CHUNK_SIZE = 1000
+
+# Mismatching accounts kept in the result (all of them are counted)
+MAX_REPORTED = 100
+
+CREDIT_TYPES = ('OPEN_ACCOUNT', 'DEPOSIT', 'TRANSFER_IN')
+DEBIT_TYPES = ('WITHDRAW', 'TRANSFER_OUT')
+
+# Replayed balance of every account in an account_id range, from the live
+# rows created at or after the archive boundary
+REPLAY_SQL = (
+    "SELECT account_id,"
+    " SUM(CASE WHEN transaction_type IN (" + ", ".join(f"'{t}'" for t in CREDIT_TYPES) + ") THEN amount"
+    " WHEN transaction_type IN (" + ", ".join(f"'{t}'" for t in DEBIT_TYPES) + ") THEN -amount ELSE 0 END)"
+    " AS replayed,"
+    " COUNT(*) AS rows_read"
+    " FROM Transactions WHERE account_id BETWEEN %s AND %s AND created_at >= %s GROUP BY account_id"
+)
+
+
+def verify_ledger(conn, chunk_size: int = CHUNK_SIZE, branch_id: int = BRANCH_ID,
+                  max_reported: int = MAX_REPORTED, pause: float = 0.0) -> dict:
+    """
+    Replay the ledger at one consistent snapshot
+
+    Args:
+        conn: pymysql connection (DictCursor); its transaction is used for the snapshot
+        chunk_size: accounts per chunk
+        pause: seconds to sleep between chunks, to go easy on a live server
+
+    Returns:
+        dict with counts, totals, the mismatching accounts and the scan rate
+    """
+    start = time.perf_counter()
+    accounts_checked = 0
+    transactions_read = 0
+    balance_total = 0
+    mismatches = []
+    mismatch_count = 0
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+            boundary = archive_boundary(cursor)
+
+            last_id = 0
+            while True:
+                cursor.execute(
+                    "SELECT account_id, balance FROM Accounts WHERE account_id > %s ORDER BY account_id LIMIT %s",
+                    (last_id, chunk_size)
+                )
+                accounts = cursor.fetchall()
+                if not accounts:
+                    break
+                first_id = accounts[0]['account_id']
+                last_id = accounts[-1]['account_id']
+
+                replayed = {}
+                if boundary != NO_BOUNDARY:
+                    cursor.execute("SELECT account_id, amount, transactions FROM ArchivedBalances"
+                                   " WHERE account_id BETWEEN %s AND %s", (first_id, last_id))
+                    for row in cursor.fetchall():
+                        replayed[row['account_id']] = row['amount']
+                        transactions_read += row['transactions']
+                cursor.execute(REPLAY_SQL, (first_id, last_id, boundary))
+                for row in cursor.fetchall():
+                    replayed[row['account_id']] = replayed.get(row['account_id'], 0) + (row['replayed'] or 0)
+                    transactions_read += row['rows_read']
+
+                for account in accounts:
+                    expected = replayed.get(account['account_id'], 0)
+                    balance_total += account['balance']
+                    if account['balance'] != expected:
+                        mismatch_count += 1
+                        if len(mismatches) < max_reported:
+                            mismatches.append({
+                                'account_id': account['account_id'],
+                                'balance': float(account['balance']),
+                                'replayed': float(expected),
+                                'difference': float(account['balance'] - expected)
+                            })
+                accounts_checked += len(accounts)
+                if pause > 0:
+                    time.sleep(pause)
+
+            reserve_total = ReserveCounter.load(cursor, branch_id).total(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    elapsed = time.perf_counter() - start
+    balance_total = float(balance_total)
+    return {
+        'accounts_checked': accounts_checked,
+        'transactions_read': transactions_read,
+        'mismatch_count': mismatch_count,
+        'mismatches': mismatches,
+        'balance_total': balance_total,
+        'reserve_total': reserve_total,
+        'reserve_matches': reserve_total is not None and abs(balance_total - reserve_total) < 0.01,
+        'seconds': elapsed,
+        'accounts_per_second': accounts_checked / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def print_verification(result: dict):
+    """Print a verify_ledger() result"""
+    print("\n" + "="*60)
+    print("LEDGER REPLAY CHECK")
+    print("="*60)
+    print(f"Accounts checked:        {result['accounts_checked']:,}")
+    print(f"Transactions replayed:   {result['transactions_read']:,}")
+    print(f"Scan rate:               {result['accounts_per_second']:,.0f} accounts/second "
+          f"({result['seconds']:.2f}s)")
+    print(f"Sum of account balances: ${result['balance_total']:,.2f}")
+    reserve = result['reserve_total']
+    print(f"Bank reserves:           ${reserve:,.2f}" if reserve is not None else "Bank reserves:           (none)")
+    if result['mismatch_count'] == 0:
+        print("\n✅ Every balance matches its transaction history")
+    else:
+        print(f"\n❌ {result['mismatch_count']} account(s) disagree with their transaction history:")
+        print(f"{'account':>10}{'balance':>16}{'replayed':>16}{'difference':>14}")
+        for m in result['mismatches']:
+            print(f"{m['account_id']:>10}{m['balance']:>16,.2f}{m['replayed']:>16,.2f}{m['difference']:>14,.2f}")
+        if result['mismatch_count'] > len(result['mismatches']):
+            print(f"... and {result['mismatch_count'] - len(result['mismatches'])} more")
+    if result['reserve_matches']:
+        print("✅ Balances add up to the bank reserve")
+    else:
+        print("❌ Balances do not add up to the bank reserve")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    import test_acid
+
+    parser = argparse.ArgumentParser(description="Replay Transactions and compare with every account balance")
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help="accounts per chunk")
+    parser.add_argument('--pause', type=float, default=0.0, help="seconds to sleep between chunks")
+    options = parser.parse_args()
+
+    conn = test_acid.get_connection()
+    try:
+        print_verification(verify_ledger(conn, options.chunk, pause=options.pause))
+    finally:
+        conn.close()
@@ -0,0 +1,365 @@
+"""
+Load Generator
+==============
+Non-interactive, duration-based driver for capacity planning. Where
+test_acid.py runs a fixed number of transactions per thread, this runs a
+workload mix for a fixed time in three phases:
+
+    ramp-up  ->  warm-up  ->  measurement
+
+Only operations scheduled inside the measurement window are reported.
+
+Closed loop (no --rate): every thread starts its next operation as soon as
+the previous one finishes; ramp-up staggers the thread start times.
+
+Open loop (--rate N): operations arrive on a fixed timetable of N per
+second (ramping linearly from 0 to N during ramp-up) whether or not the
+database keeps up. Each operation's latency is measured from its scheduled
+start time, so when every thread is busy the time an arrival spends waiting
+for one is counted as latency instead of silently lowering the load.
+
+Examples:
+    python loadgen.py --setup --duration 60 --warmup 10 --threads 32
+    python loadgen.py --mix transfer=80,deposit=10,withdraw=10 --rate 400 --ramp-up 15 --results runs.csv
+    python loadgen.py --backend sqlite --setup --duration 10
+    python loadgen.py --mix transfer=30,balance=70 --distribution zipf:1.2 --amounts lognormal:3:1
+"""
+
+import argparse
+import math
+import random
+import threading
+import time
+
+import banking_ops
+import test_acid
+from backends import BACKENDS, SQLITE_PATH, StorageBackend, create_backend
+from metrics import LatencyHistogram, OpTimer, StressRecorder, print_report, write_results
+from reserves import ReserveAggregator
+from retry import RetryStats, run_with_retry
+from workload import AccountChooser, make_amount
+
+# 'balance' is a read-only check_balance-style lookup
+OPERATIONS = ('transfer', 'deposit', 'withdraw', 'balance')
+
+DEFAULT_MIX = 'transfer=50,deposit=25,withdraw=25'
+DEFAULT_DURATION = 30.0
+DEFAULT_WARMUP = 5.0
+DEFAULT_THREADS = 16
+
+# Amount distributions (see workload.py) used unless --amounts is given
+DEFAULT_AMOUNTS = {
+    'transfer': 'uniform:1:50',
+    'deposit': 'uniform:10:100',
+    'withdraw': 'uniform:10:100'
+}
+
+# Open loop: once the schedule ends, arrivals still queued are given up
+# (and reported as dropped) after this many seconds
+DEFAULT_DRAIN = 10.0
+
+
+def parse_mix(text: str) -> dict:
+    """'transfer=50,deposit=25,withdraw=25' -> {'transfer': 50.0, ...}"""
+    mix = {}
+    for part in text.split(','):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}' in mix (expected one of {', '.join(OPERATIONS)})")
+        try:
+            mix[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise ValueError(f"Invalid weight '{weight}' for {name}")
+        if mix[name] < 0:
+            raise ValueError(f"Weight for {name} must not be negative")
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Workload mix needs at least one operation with a positive weight")
+    return mix
+
+
+class ArrivalSchedule:
+    """
+    Open-loop timetable: hands out the scheduled start time (seconds after
+    the run started) of each arrival, in order, to whichever thread asks
+    """
+
+    def __init__(self, rate: float, ramp_up: float, end: float):
+        if rate <= 0:
+            raise ValueError("Arrival rate must be positive")
+        self.rate = rate
+        self.ramp_up = ramp_up
+        self.end = end
+        self.issued = 0
+        self._lock = threading.Lock()
+
+    def offset(self, k: int) -> float:
+        """Start time of arrival k with the rate ramping linearly to `rate`"""
+        # arrivals by time t: rate*t^2/(2*ramp_up) during ramp-up, then rate per second
+        ramp_arrivals = self.rate * self.ramp_up / 2
+        if k < ramp_arrivals:
+            return math.sqrt(2 * self.ramp_up * k / self.rate)
+        return self.ramp_up / 2 + k / self.rate
+
+    def next(self):
+        """Start time of the next arrival, or None once the schedule is over"""
+        with self._lock:
+            k = self.issued
+            self.issued += 1
+        scheduled = self.offset(k)
+        return scheduled if scheduled < self.end else None
+
+
+def run_operation(session, operation: str, chooser: AccountChooser, amounts: dict, timer, retry_stats):
+    """Run one randomly parameterised operation (retrying deadlocks)"""
+    if operation == 'balance':
+        session.balance(chooser.pick())
+    elif operation == 'transfer':
+        from_account, to_account = chooser.pick_pair()
+        run_with_retry(session.transfer, from_account, to_account, amounts['transfer'](),
+                       timer=timer, operation=operation, stats=retry_stats)
+    else:
+        func = session.deposit if operation == 'deposit' else session.withdraw
+        run_with_retry(func, chooser.pick(), amounts[operation](),
+                       timer=timer, operation=operation, stats=retry_stats)
+
+
+def load_worker(worker_id: int, options, backend: StorageBackend, accounts: list, phases: dict,
+                schedule: ArrivalSchedule, results: list):
+    """
+    Worker thread: closed loop when schedule is None, otherwise takes
+    arrivals from the shared schedule until it runs out
+    """
+    operations = list(options.mix)
+    weights = [options.mix[op] for op in operations]
+    counts = {'success': 0, 'rejected': 0, 'failure': 0, 'dropped': 0}
+    retry_stats = RetryStats()
+    recorder = StressRecorder()
+    start_lag = LatencyHistogram()      # open loop: how late arrivals started
+    origin = phases['origin']
+    chooser = AccountChooser(accounts, options.distribution, worker_id)
+    amounts = {op: make_amount(options.amounts or spec) for op, spec in DEFAULT_AMOUNTS.items()}
+
+    with backend.session() as session:
+        if schedule is None and options.ramp_up > 0:
+            time.sleep(options.ramp_up * worker_id / options.threads)
+
+        while True:
+            now = time.perf_counter() - origin
+            if schedule is None:
+                if now >= phases['end']:
+                    break
+                scheduled = now
+            else:
+                scheduled = schedule.next()
+                if scheduled is None:
+                    break
+                if now < scheduled:
+                    time.sleep(scheduled - now)
+                elif now > phases['end'] + options.drain:
+                    counts['dropped'] += 1
+                    continue
+            measured = scheduled >= phases['measure']
+            if measured and schedule is not None:
+                start_lag.record(max(time.perf_counter() - origin - scheduled, 0.0))
+
+            operation = random.choices(operations, weights)[0]
+            timer = OpTimer()
+            try:
+                run_operation(session, operation, chooser, amounts, timer, retry_stats)
+                outcome = 'success'
+            except banking_ops.BankingError:
+                outcome = 'rejected'
+            except Exception:
+                outcome = 'failure'
+            if not measured:
+                continue
+            counts[outcome] += 1
+            if outcome != 'failure':
+                # latency from the scheduled start, so queueing is included
+                recorder.record(operation, time.perf_counter() - origin - scheduled, timer.lock_wait,
+                                lock_hold=timer.lock_hold)
+
+    results.append(dict(counts, worker_id=worker_id, retry_stats=retry_stats,
+                        recorder=recorder, start_lag=start_lag))
+
+
+def run_load(options, backend: StorageBackend) -> dict:
+    """Run the configured load and return a summary dict like run_stress_test's"""
+    accounts = backend.test_accounts()
+    if len(accounts) < 2:
+        raise SystemExit("Need at least 2 test accounts; run with --setup first")
+
+    ramp_up = options.ramp_up
+    measure = ramp_up + options.warmup
+    phases = {'measure': measure, 'end': measure + options.duration}
+    schedule = None
+    if options.rate:
+        schedule = ArrivalSchedule(options.rate, ramp_up, phases['end'])
+
+    loop = f"open loop at {options.rate:g}/s" if options.rate else "closed loop"
+    print(f"\n{'='*60}")
+    print(f"Load: {', '.join(f'{op}={w:g}' for op, w in options.mix.items())} "
+          f"over {len(accounts)} accounts, {options.threads} threads, {loop}")
+    print(f"Accounts: {options.distribution}, amounts: {options.amounts or 'per-operation defaults'}")
+    print(f"Phases: ramp-up {ramp_up:g}s, warm-up {options.warmup:g}s, measure {options.duration:g}s")
+    print(f"Backend: {backend.name}, Execution mode: {options.mode}, "
+          f"Reserve journal mode: {'on' if options.journal else 'off'}")
+    print(f"{'='*60}\n")
+
+    aggregator = None
+    if options.journal and backend.name == 'mysql':
+        aggregator = ReserveAggregator(test_acid.get_connection)
+        aggregator.start()
+
+    results = []
+    threads = []
+    phases['origin'] = time.perf_counter()
+    wall_origin = time.time()
+    for i in range(options.threads):
+        t = threading.Thread(target=load_worker,
+                             args=(i, options, backend, accounts, phases, schedule, results))
+        threads.append(t)
+        t.start()
+    for t in threads:
+        t.join()
+
+    if aggregator is not None:
+        aggregator.stop()
+        print(f"Reserve aggregator folded {aggregator.folded} deltas")
+    backend_stats = backend.stats()
+
+    totals = {key: sum(r[key] for r in results) for key in ('success', 'rejected', 'failure', 'dropped')}
+    retry_stats = RetryStats()
+    recorder = StressRecorder()
+    start_lag = LatencyHistogram()
+    for r in results:
+        retry_stats.merge(r['retry_stats'])
+        recorder.merge(r['recorder'])
+        start_lag.merge(r['start_lag'])
+    retries = retry_stats.summary()
+    latency = recorder.report(wall_origin + phases['measure'], wall_origin + phases['end'])
+    throughput = totals['success'] / options.duration
+
+    print(f"Committed: {totals['success']}, rejected: {totals['rejected']}, failed: {totals['failure']}, "
+          f"retries: {retries['retries']}")
+    print(f"Throughput: {throughput:.1f} committed transactions/second"
+          + (f" (target {options.rate:g} arrivals/second)" if options.rate else ""))
+    if schedule is not None:
+        print(f"Start lag behind schedule: p50 {start_lag.percentile(50):.2f} ms, "
+              f"p99 {start_lag.percentile(99):.2f} ms, max {start_lag.max / 1000.0:.2f} ms; "
+              f"dropped {totals['dropped']} arrivals")
+    if backend_stats:
+        print(f"Connection pool: avg wait {backend_stats['avg_wait_ms']:.2f} ms, "
+              f"max wait {backend_stats['max_wait_ms']:.2f} ms")
+    print_report(latency)
+
+    summary = {
+        'run_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(wall_origin)),
+        'test_type': 'loadgen-open' if options.rate else 'loadgen-closed',
+        'threads': options.threads,
+        'backend': backend.name,
+        'execution_mode': options.mode,
+        'mix': options.mix,
+        'distribution': options.distribution,
+        'amounts': options.amounts,
+        'target_rate': options.rate,
+        'ramp_up': ramp_up,
+        'warmup': options.warmup,
+        'elapsed': options.duration,
+        'success': totals['success'],
+        'failure': totals['failure'],
+        'rejected': totals['rejected'],
+        'dropped': totals['dropped'],
+        'retries': retries,
+        'throughput': throughput,
+        'start_lag': start_lag.summary(),
+        'pool': backend_stats,
+        'latency': latency
+    }
+    if options.results:
+        write_results(options.results, summary)
+        print(f"Results written to {options.results}")
+    return summary
+
+
+def check_consistency(backend: StorageBackend) -> bool:
+    """Money conservation: test account balances must add up to the bank reserve"""
+    total_accounts, total_reserves = backend.totals()
+    ok = abs(total_accounts - total_reserves) < 0.01
+    print(f"\nSum of account balances: ${total_accounts:,.2f}")
+    print(f"Bank reserves:           ${total_reserves:,.2f}")
+    print("✅ CONSISTENCY: PASS - Money is conserved!" if ok else "❌ CONSISTENCY: FAIL - Money was created or lost!")
+    return ok
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Duration-based load generator for the banking database")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"operation weights (default {DEFAULT_MIX})")
+    parser.add_argument('--distribution', default='uniform',
+                        help="account access distribution: uniform, zipf:S, hotset:F:P or sequential")
+    parser.add_argument('--amounts', default=None,
+                        help="amount distribution for every operation: uniform:LO:HI, fixed:A, "
+                             "exponential:MEAN or lognormal:MU:SIGMA (default: per operation)")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION,
+                        help="measured seconds (default %(default)s)")
+    parser.add_argument('--warmup', type=float, default=DEFAULT_WARMUP,
+                        help="seconds of unmeasured load after ramp-up (default %(default)s)")
+    parser.add_argument('--ramp-up', type=float, default=0.0,
+                        help="seconds to ramp threads / arrival rate up to full load (default %(default)s)")
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS,
+                        help="worker threads and connections (default %(default)s)")
+    parser.add_argument('--rate', type=float, default=None,
+                        help="open loop: target arrivals per second (default: closed loop)")
+    parser.add_argument('--drain', type=float, default=DEFAULT_DRAIN,
+                        help="open loop: seconds to keep working off a backlog after the schedule ends")
+    parser.add_argument('--backend', choices=BACKENDS, default='mysql',
+                        help="storage engine (default %(default)s)")
+    parser.add_argument('--sqlite-path', default=SQLITE_PATH,
+                        help="database file of the sqlite backend (default %(default)s)")
+    parser.add_argument('--mode', choices=banking_ops.EXECUTION_MODES,
+                        default=test_acid.EXECUTION_MODE, help="how operations run (default %(default)s)")
+    parser.add_argument('--journal', action='store_true', help="use the reserve delta journal")
+    parser.add_argument('--setup', action='store_true', help="recreate the test accounts first")
+    parser.add_argument('--accounts', type=int, default=test_acid.NUM_ACCOUNTS,
+                        help="test accounts created by --setup (default %(default)s)")
+    parser.add_argument('--slots', type=int, default=test_acid.RESERVE_SLOTS,
+                        help="reserve slots created by --setup (default %(default)s)")
+    parser.add_argument('--results', default=None, help="append the run summary to this .csv / write .json")
+    parser.add_argument('--no-verify', dest='verify', action='store_false',
+                        help="skip the consistency check at the end")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    options = parser.parse_args(argv)
+    if options.threads < 1 or options.duration <= 0 or options.warmup < 0 or options.ramp_up < 0:
+        parser.error("--threads and --duration must be positive, --warmup and --ramp-up not negative")
+    if options.rate is not None and options.rate <= 0:
+        parser.error("--rate must be positive")
+    try:
+        AccountChooser([1, 2], options.distribution)
+        if options.amounts:
+            make_amount(options.amounts)
+    except ValueError as e:
+        parser.error(str(e))
+
+    backend = create_backend(options.backend, test_acid.DB_CONFIG, max_connections=options.threads,
+                             mode=options.mode, journal=options.journal, path=options.sqlite_path)
+    try:
+        if options.setup:
+            backend.setup_test_accounts(options.accounts, test_acid.INITIAL_BALANCE, options.slots)
+            print(f"Created {options.accounts} test accounts on {backend.name}")
+        run_load(options, backend)
+        if options.verify:
+            check_consistency(backend)
+    finally:
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
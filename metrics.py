@@ -0,0 +1,234 @@
+"""
+Stress Test Metrics
+===================
+Low-overhead latency recording for the stress test.
+
+- LatencyHistogram: log-linear buckets (32 per power of two, so any value is
+  reported within ~3%), O(1) record, sparse dict storage, cheap to merge
+- OpTimer: splits one operation's wall time into lock acquisition (the
+  SELECT ... FOR UPDATE statements) and everything else, and measures how
+  long the row locks were held (first lock acquired to commit / rollback)
+- StressRecorder: one histogram pair per operation type plus completions per
+  wall-clock second; each worker keeps its own and they are merged at the end
+- write_results: dump a run summary as JSON or CSV for comparing runs
+"""
+
+import csv
+import json
+import math
+import time
+from contextlib import contextmanager
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """Histogram of durations in microseconds with ~3% relative precision"""
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @staticmethod
+    def _index(us: int) -> int:
+        if us < 2 * SUB_BUCKETS:
+            return us
+        shift = us.bit_length() - (SUB_BUCKET_BITS + 1)
+        return SUB_BUCKETS * shift + (us >> shift)
+
+    @staticmethod
+    def _upper_bound(index: int) -> int:
+        """Largest microsecond value that falls into bucket index"""
+        if index < 2 * SUB_BUCKETS:
+            return index
+        shift = index // SUB_BUCKETS - 1
+        top = index - SUB_BUCKETS * shift
+        return ((top + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        us = max(int(seconds * 1000000), 0)
+        index = self._index(us)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += us
+        if self.min is None or us < self.min:
+            self.min = us
+        if us > self.max:
+            self.max = us
+
+    def merge(self, other: "LatencyHistogram"):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p: float) -> float:
+        """p-th percentile in milliseconds (0 when empty)"""
+        if self.count == 0:
+            return 0.0
+        rank = max(math.ceil(p / 100.0 * self.count), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._upper_bound(index), self.max) / 1000.0
+        return self.max / 1000.0
+
+    def mean(self) -> float:
+        """Mean in milliseconds"""
+        return self.total / self.count / 1000.0 if self.count else 0.0
+
+    def summary(self) -> dict:
+        result = {'count': self.count, 'mean_ms': self.mean()}
+        for p in PERCENTILES:
+            result[f'p{p}_ms'] = self.percentile(p)
+        result['max_ms'] = self.max / 1000.0
+        return result
+
+
+class OpTimer:
+    """Collects the time one operation spent acquiring and holding row locks"""
+
+    def __init__(self):
+        self.lock_wait = 0.0
+        self.lock_hold = 0.0
+        self._held_since = None
+
+    @contextmanager
+    def locking(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.lock_wait += end - start
+            if self._held_since is None:
+                self._held_since = end
+
+    def released(self):
+        """The transaction ended (commit or rollback): its locks are gone"""
+        if self._held_since is not None:
+            self.lock_hold += time.perf_counter() - self._held_since
+            self._held_since = None
+
+
+@contextmanager
+def locking(timer):
+    """`with locking(timer):` around a locking statement; timer may be None"""
+    if timer is None:
+        yield
+    else:
+        with timer.locking():
+            yield
+
+
+def released(timer):
+    """Call right after commit / rollback; timer may be None"""
+    if timer is not None:
+        timer.released()
+
+
+class StressRecorder:
+    """Per-operation latency histograms and a per-second completion timeline"""
+
+    def __init__(self):
+        self.latency = {}       # operation -> LatencyHistogram of total time
+        self.lock_wait = {}     # operation -> LatencyHistogram of lock acquisition time
+        self.lock_hold = {}     # operation -> LatencyHistogram of time the locks were held
+        self.timeline = {}      # int(time.time()) -> completed operations
+
+    def _add_operation(self, operation: str):
+        self.latency[operation] = LatencyHistogram()
+        self.lock_wait[operation] = LatencyHistogram()
+        self.lock_hold[operation] = LatencyHistogram()
+
+    def record(self, operation: str, latency: float, lock_wait: float = 0.0, end_time: float = None,
+               lock_hold: float = 0.0):
+        if operation not in self.latency:
+            self._add_operation(operation)
+        self.latency[operation].record(latency)
+        self.lock_wait[operation].record(lock_wait)
+        self.lock_hold[operation].record(lock_hold)
+        second = int(end_time if end_time is not None else time.time())
+        self.timeline[second] = self.timeline.get(second, 0) + 1
+
+    def merge(self, other: "StressRecorder"):
+        for operation, histogram in other.latency.items():
+            if operation not in self.latency:
+                self._add_operation(operation)
+            self.latency[operation].merge(histogram)
+            self.lock_wait[operation].merge(other.lock_wait[operation])
+            self.lock_hold[operation].merge(other.lock_hold[operation])
+        for second, count in other.timeline.items():
+            self.timeline[second] = self.timeline.get(second, 0) + count
+
+    def report(self, start_time: float, end_time: float) -> dict:
+        """
+        Summary dict: per-operation latency percentiles with the lock wait /
+        execution split, and operations completed in each second of the run
+        """
+        operations = {}
+        for operation, histogram in sorted(self.latency.items()):
+            summary = histogram.summary()
+            lock_mean = self.lock_wait[operation].mean()
+            summary['lock_wait_mean_ms'] = lock_mean
+            summary['lock_wait_p99_ms'] = self.lock_wait[operation].percentile(99)
+            summary['execution_mean_ms'] = max(summary['mean_ms'] - lock_mean, 0.0)
+            summary['lock_hold_mean_ms'] = self.lock_hold[operation].mean()
+            summary['lock_hold_p99_ms'] = self.lock_hold[operation].percentile(99)
+            operations[operation] = summary
+
+        first = int(start_time)
+        last = int(end_time)
+        timeline = [self.timeline.get(second, 0) for second in range(first, last + 1)]
+        return {'operations': operations, 'throughput_per_second': timeline}
+
+
+def print_report(report: dict):
+    """Print a StressRecorder.report() as a latency table and a throughput timeline"""
+    print(f"\n{'operation':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+          f"{'lock ms':>10}{'exec ms':>10}{'hold ms':>10}")
+    for operation, s in report['operations'].items():
+        print(f"{operation:<16}{s['count']:>8}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}"
+              f"{s['max_ms']:>10.2f}{s['lock_wait_mean_ms']:>10.2f}{s['execution_mean_ms']:>10.2f}"
+              f"{s['lock_hold_mean_ms']:>10.2f}")
+    print("(lock / exec = mean time in the locking statements vs. the rest of the operation;"
+          " hold = mean time from the first lock to commit)")
+    print("Throughput per second: " + " ".join(str(count) for count in report['throughput_per_second']))
+
+
+def write_results(path: str, summary: dict):
+    """
+    Write a run summary to path: JSON if it ends in .json, otherwise one CSV
+    row per operation (appended, so several runs can share a file)
+    """
+    if path.endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump(summary, f, indent=2, default=str)
+        return
+
+    fields = ['run_at', 'test_type', 'threads', 'operation', 'count', 'mean_ms', 'p50_ms', 'p95_ms',
+              'p99_ms', 'max_ms', 'lock_wait_mean_ms', 'lock_wait_p99_ms', 'execution_mean_ms',
+              'lock_hold_mean_ms', 'lock_hold_p99_ms', 'throughput']
+    try:
+        with open(path) as f:
+            write_header = f.read(1) == ''
+    except FileNotFoundError:
+        write_header = True
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        if write_header:
+            writer.writeheader()
+        for operation, stats in summary['latency']['operations'].items():
+            writer.writerow(dict(stats, run_at=summary['run_at'], test_type=summary['test_type'],
+                                 threads=summary['threads'], operation=operation,
+                                 throughput=summary['throughput']))
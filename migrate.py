@@ -0,0 +1,164 @@
+"""
+Schema Migrations
+=================
+Brings an existing database from the init_db.sql baseline to the current
+schema by applying the numbered scripts in migrations/ in order.
+
+- a script is migrations/NNN_description.sql; NNN is its version
+- a migration that has to look at the data first (e.g. to choose partition
+  bounds) is migrations/NNN_description.py with an upgrade(conn) function
+- applied versions are recorded in SchemaMigrations, so each script runs
+  once and `python migrate.py` is safe to repeat
+- scripts use the same syntax as init_db.sql, including DELIMITER blocks for
+  triggers and procedures, so they can also be pasted into phpMyAdmin
+
+MySQL commits implicitly around every DDL statement, so a migration is not
+atomic: if one fails halfway, fix the cause and finish it by hand (the
+version is only recorded after its last statement succeeded).
+
+Example:
+    python migrate.py            # apply every pending migration
+    python migrate.py --status
+"""
+
+import argparse
+import importlib.util
+import os
+import re
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+MIGRATION_FILE = re.compile(r'^(\d+)_(\w+)\.(sql|py)$')
+
+
+def split_statements(script: str) -> list:
+    """
+    Split a SQL script into statements, honouring DELIMITER lines
+
+    Whole-line `--` comments are dropped; everything else is passed through
+    to the server unchanged.
+    """
+    statements = []
+    delimiter = ';'
+    current = []
+    for line in script.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('--'):
+            continue
+        if stripped.upper().startswith('DELIMITER '):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        if stripped.endswith(delimiter):
+            current.append(line.rstrip()[:-len(delimiter)])
+            statement = "\n".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+        else:
+            current.append(line)
+    if "\n".join(current).strip():
+        statements.append("\n".join(current).strip())
+    return statements
+
+
+def available_migrations(directory: str = MIGRATIONS_DIR) -> list:
+    """(version, name, path) of every migration script, by version"""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    return sorted(migrations)
+
+
+def applied_versions(cursor) -> set:
+    """Versions recorded in SchemaMigrations (creates the table if needed)"""
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS SchemaMigrations ("
+        " version INT PRIMARY KEY,"
+        " name VARCHAR(200) NOT NULL,"
+        " applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    cursor.execute("SELECT version FROM SchemaMigrations")
+    return {row['version'] for row in cursor.fetchall()}
+
+
+def schema_version(conn) -> int:
+    """Highest applied migration version, 0 for the init_db.sql baseline"""
+    with conn.cursor() as cursor:
+        versions = applied_versions(cursor)
+    conn.commit()
+    return max(versions, default=0)
+
+
+def pending_migrations(conn, directory: str = MIGRATIONS_DIR) -> list:
+    """Migrations not applied yet, in the order they will run"""
+    with conn.cursor() as cursor:
+        applied = applied_versions(cursor)
+    conn.commit()
+    return [m for m in available_migrations(directory) if m[0] not in applied]
+
+
+def _run_python_migration(conn, path: str):
+    spec = importlib.util.spec_from_file_location(f"migration_{os.path.basename(path)[:-3]}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.upgrade(conn)
+
+
+def apply_migration(conn, version: int, name: str, path: str):
+    """Run one migration (every statement of a .sql script, or upgrade() of a .py one), then record its version"""
+    try:
+        if path.endswith('.py'):
+            _run_python_migration(conn, path)
+        else:
+            with open(path) as f:
+                statements = split_statements(f.read())
+            with conn.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+        with conn.cursor() as cursor:
+            cursor.execute("INSERT INTO SchemaMigrations (version, name) VALUES (%s, %s)", (version, name))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def migrate(conn, target: int = None, directory: str = MIGRATIONS_DIR, verbose: bool = True) -> list:
+    """
+    Apply the pending migrations up to target (all of them if None)
+
+    Returns:
+        versions applied, in order
+    """
+    applied = []
+    for version, name, path in pending_migrations(conn, directory):
+        if target is not None and version > target:
+            break
+        if verbose:
+            print(f"Applying migration {version:03d} {name} ...")
+        apply_migration(conn, version, name, path)
+        applied.append(version)
+    return applied
+
+
+if __name__ == "__main__":
+    import test_acid
+
+    parser = argparse.ArgumentParser(description="Apply the schema migrations in migrations/")
+    parser.add_argument('--target', type=int, default=None, help="stop after this version")
+    parser.add_argument('--status', action='store_true', help="show the schema version and pending migrations")
+    options = parser.parse_args()
+
+    conn = test_acid.get_connection()
+    try:
+        if options.status:
+            print(f"Schema version: {schema_version(conn)}")
+            for version, name, _ in pending_migrations(conn):
+                print(f"Pending:        {version:03d} {name}")
+        else:
+            applied = migrate(conn, options.target)
+            print(f"Applied {len(applied)} migration(s); schema version is now {schema_version(conn)}")
+    finally:
+        conn.close()
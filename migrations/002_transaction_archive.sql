@@ -0,0 +1,119 @@
+-- Migration 002: prepare Transactions for monthly partitions, add the archive
+-- Migration 003 then partitions the table; archive.py maintains it.
+
+
+-- 1. Transactions: drop the foreign key to Accounts
+-- Partitioned InnoDB tables can't have foreign keys. Every code path that
+-- inserts a Transactions row has locked (and so found) its account first,
+-- so the reference stays intact without the constraint. Its name was
+-- generated by MySQL, so look it up.
+SET @transactions_fk = (
+    SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+    WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = 'Transactions' AND REFERENCED_TABLE_NAME = 'Accounts'
+    LIMIT 1
+);
+SET @drop_transactions_fk = IF(@transactions_fk IS NULL, 'DO 0',
+    CONCAT('ALTER TABLE Transactions DROP FOREIGN KEY `', @transactions_fk, '`'));
+PREPARE drop_transactions_fk FROM @drop_transactions_fk;
+EXECUTE drop_transactions_fk;
+DEALLOCATE PREPARE drop_transactions_fk;
+
+
+-- 2. Transactions: the partitioning column must be part of every unique key
+ALTER TABLE Transactions
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (transaction_id, created_at);
+
+
+-- 3. TransactionsArchive: closed months moved out of Transactions
+-- Clustered by (account_id, created_at), so an account's archived history
+-- is one contiguous range; compressed, since it is only ever appended to.
+CREATE TABLE IF NOT EXISTS TransactionsArchive (
+    transaction_id INT NOT NULL,
+    account_id INT NOT NULL,
+    transaction_type ENUM('DEPOSIT', 'WITHDRAW', 'TRANSFER_IN', 'TRANSFER_OUT', 'OPEN_ACCOUNT') NOT NULL,
+    amount DECIMAL(15, 2) NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (account_id, created_at, transaction_id),
+    INDEX idx_transactionsarchive_created_id (created_at, transaction_id)
+) ROW_FORMAT=COMPRESSED;
+
+
+-- 4. ArchivedBalances: per account, the signed sum, count and newest id of
+-- its archived transactions. The ledger replays from here plus live rows.
+CREATE TABLE IF NOT EXISTS ArchivedBalances (
+    account_id INT PRIMARY KEY,
+    amount DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    transactions BIGINT NOT NULL DEFAULT 0,
+    last_transaction_id INT NOT NULL DEFAULT 0
+);
+
+
+-- 5. ArchiveLog: one row per archived month. MAX(range_end) is the archive
+-- boundary: live rows are those created at or after it.
+CREATE TABLE IF NOT EXISTS ArchiveLog (
+    partition_name VARCHAR(64) PRIMARY KEY,
+    range_end TIMESTAMP NOT NULL,
+    rows_archived BIGINT NOT NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+
+-- 6. Views
+-- AllCustomerTransactions shows live transactions; the archive is only read
+-- when asked for, through AllCustomerTransactionsWithArchive.
+DROP VIEW IF EXISTS AllCustomerTransactions;
+
+CREATE VIEW AllCustomerTransactions AS
+SELECT
+    c.name AS CustomerName,
+    t.account_id AS AccountID,
+    t.transaction_type AS Type,
+    t.amount AS Amount,
+    t.created_at AS Date,
+    t.transaction_id AS TransactionID
+FROM Transactions t
+JOIN Accounts a ON t.account_id = a.account_id
+JOIN Customers c ON a.customer_id = c.customer_id
+WHERE t.created_at >= (SELECT COALESCE(MAX(range_end), '1970-01-02') FROM ArchiveLog)
+ORDER BY t.created_at DESC, t.transaction_id DESC;
+
+
+DROP VIEW IF EXISTS AllCustomerTransactionsWithArchive;
+
+CREATE VIEW AllCustomerTransactionsWithArchive AS
+SELECT
+    c.name AS CustomerName,
+    t.account_id AS AccountID,
+    t.transaction_type AS Type,
+    t.amount AS Amount,
+    t.created_at AS Date,
+    t.transaction_id AS TransactionID
+FROM (
+    SELECT transaction_id, account_id, transaction_type, amount, created_at FROM Transactions
+    WHERE created_at >= (SELECT COALESCE(MAX(range_end), '1970-01-02') FROM ArchiveLog)
+    UNION ALL
+    SELECT transaction_id, account_id, transaction_type, amount, created_at FROM TransactionsArchive
+) t
+JOIN Accounts a ON t.account_id = a.account_id
+JOIN Customers c ON a.customer_id = c.customer_id
+ORDER BY t.created_at DESC, t.transaction_id DESC;
+
+
+-- The running balance starts from the account's archived carry-forward
+DROP VIEW IF EXISTS AccountStatement;
+
+CREATE VIEW AccountStatement AS
+SELECT
+    t.account_id AS AccountID,
+    t.transaction_id AS TransactionID,
+    t.transaction_type AS Type,
+    t.amount AS Amount,
+    t.created_at AS Date,
+    COALESCE(ab.amount, 0)
+        + SUM(CASE WHEN t.transaction_type IN ('WITHDRAW', 'TRANSFER_OUT') THEN -t.amount ELSE t.amount END)
+        OVER (PARTITION BY t.account_id ORDER BY t.created_at, t.transaction_id) AS RunningBalance
+FROM Transactions t
+LEFT JOIN ArchivedBalances ab ON ab.account_id = t.account_id
+WHERE t.created_at >= (SELECT COALESCE(MAX(range_end), '1970-01-02') FROM ArchiveLog);
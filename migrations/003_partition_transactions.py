@@ -0,0 +1,13 @@
+"""
+Migration 003: partition Transactions by month
+
+The partition bounds depend on the oldest row in the table, so this one is
+Python: one monthly partition from that row's month up to
+archive.MONTHS_AHEAD months from now, plus pmax. Rebuilds the table.
+"""
+
+import archive
+
+
+def upgrade(conn):
+    archive.partition_transactions(conn)
@@ -0,0 +1,30 @@
+-- Migration 004: row version on Accounts for optimistic locking
+-- banking_ops.OPTIMISTIC reads an account without locking it and writes it
+-- back with `WHERE account_id = ? AND version = ?`; no row changed means
+-- someone else wrote the account in between and the operation is retried.
+--
+-- ADD COLUMN with a constant default is an instant metadata change in
+-- MySQL 8.0, however many accounts there are.
+
+
+-- 1. Accounts.version, bumped by every write
+ALTER TABLE Accounts
+    ADD COLUMN version INT UNSIGNED NOT NULL DEFAULT 0;
+
+
+-- 2. Bump the version on writes that don't do it themselves
+-- The client, conditional and procedure modes, transfer_batch and any
+-- phpMyAdmin edit change balance without touching version; the trigger
+-- bumps it for them, so an optimistic writer never misses their changes.
+-- An UPDATE that sets version itself (the optimistic mode) is left as is.
+DROP TRIGGER IF EXISTS bump_accounts_version;
+DELIMITER $$
+CREATE TRIGGER bump_accounts_version
+BEFORE UPDATE ON Accounts
+FOR EACH ROW
+BEGIN
+    IF NEW.version = OLD.version THEN
+        SET NEW.version = OLD.version + 1;
+    END IF;
+END$$
+DELIMITER ;
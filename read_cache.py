@@ -0,0 +1,186 @@
+"""
+Read Cache
+==========
+Client-side cache for the GUI's read-only queries (balance checks, the
+reserve total and the All Accounts listing), so a teller clicking refresh
+over and over doesn't keep querying the primary.
+
+- entries are keyed (kind, argument), e.g. ('balance', 42), ('reserves', None)
+- every entry expires after `ttl` seconds; beyond max_entries the least
+  recently used entry is evicted
+- writes made by this client invalidate the affected entries right away
+  (invalidate_accounts), so a teller always sees their own changes
+- writes made by other clients are caught by a version probe, at most once
+  per probe_interval: every money movement inserts a Transactions row, so a
+  new MAX(transaction_id) means something changed, and the accounts booked
+  since the previous probe are the ones to invalidate (a new MAX(account_id)
+  catches accounts opened without a deposit)
+
+A write whose transaction_id is allocated before but committed after the
+probe is not seen by the probe; the TTL still bounds how long its entries
+stay stale. The probe and the load that follows run on the same connection
+and snapshot, so a stored value is never older than the version it is
+checked against.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+BALANCE = 'balance'
+RESERVES = 'reserves'
+ACCOUNTS = 'accounts'
+
+MAX_ENTRIES = 1024
+TTL = 5.0
+PROBE_INTERVAL = 1.0
+
+# More changed accounts than this since the last probe: drop every entry
+PROBE_MAX_ACCOUNTS = 500
+
+
+class ReadCache:
+    """TTL + LRU cache of read results, invalidated by writes and a version probe"""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL,
+                 probe_interval: float = PROBE_INTERVAL):
+        if max_entries < 1:
+            raise ValueError("Cache size must be at least 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.probe_interval = probe_interval
+        self._entries = OrderedDict()      # key -> (value, loaded_at)
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self._generation = 0               # bumped by every invalidation
+        self._version = None               # (max transaction_id, max account_id)
+        self._last_probe = 0.0
+        self._counters = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0,
+                          'invalidated': 0, 'probes': 0, 'probe_invalidated': 0}
+        self._hit_age_total = 0.0
+        self._hit_age_max = 0.0
+
+    def get(self, connection, kind: str, argument, load):
+        """
+        Cached result of load(connection) for (kind, argument)
+
+        May first run the version probe on connection; load runs on a miss.
+        """
+        if self.ttl <= 0:
+            with self._lock:
+                self._counters['misses'] += 1
+            return load(connection)
+
+        # taken before the probe: the probe may open the snapshot load() reads
+        # from, so any invalidation from here on must keep the value out
+        generation = self._generation
+        now = time.monotonic()
+        if now - self._last_probe >= self.probe_interval:
+            self._probe(connection, now)
+
+        key = (kind, argument)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry[1]
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._counters['hits'] += 1
+                    self._hit_age_total += age
+                    self._hit_age_max = max(self._hit_age_max, age)
+                    return entry[0]
+                del self._entries[key]
+                self._counters['expired'] += 1
+            self._counters['misses'] += 1
+
+        value = load(connection)
+
+        with self._lock:
+            # an invalidation while loading may have made the value stale
+            if generation == self._generation:
+                self._entries[key] = (value, now)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._counters['evicted'] += 1
+        return value
+
+    def _probe(self, connection, now: float):
+        """Invalidate what other clients changed since the previous probe"""
+        if not self._probe_lock.acquire(blocking=False):
+            return   # another thread is probing right now
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT (SELECT MAX(transaction_id) FROM Transactions) AS transaction_id,"
+                               " (SELECT MAX(account_id) FROM Accounts) AS account_id")
+                row = cursor.fetchone()
+                version = (row['transaction_id'] or 0, row['account_id'] or 0)
+                previous = self._version
+                changed = None
+                if previous is not None and version[0] > previous[0]:
+                    cursor.execute("SELECT DISTINCT account_id FROM Transactions WHERE transaction_id > %s LIMIT %s",
+                                   (previous[0], PROBE_MAX_ACCOUNTS + 1))
+                    changed = [r['account_id'] for r in cursor.fetchall()]
+
+            with self._lock:
+                self._counters['probes'] += 1
+                self._last_probe = now
+                self._version = version
+                if previous is None or version == previous:
+                    return
+                if version[0] < previous[0] or version[1] < previous[1] or \
+                        (changed is not None and len(changed) > PROBE_MAX_ACCOUNTS):
+                    # data was reset or too much changed: start over
+                    dropped = len(self._entries)
+                    self._entries.clear()
+                else:
+                    dropped = self._drop(ACCOUNTS, RESERVES)
+                    if changed:
+                        dropped += self._drop_balances(changed)
+                self._generation += 1
+                self._counters['probe_invalidated'] += dropped
+        finally:
+            self._probe_lock.release()
+
+    def _drop(self, *kinds) -> int:
+        """Remove every entry of the given kinds (caller holds _lock)"""
+        keys = [key for key in self._entries if key[0] in kinds]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def _drop_balances(self, account_ids) -> int:
+        """Remove the balance entries of the given accounts (caller holds _lock)"""
+        dropped = 0
+        for account_id in account_ids:
+            if self._entries.pop((BALANCE, account_id), None) is not None:
+                dropped += 1
+        return dropped
+
+    def invalidate_accounts(self, account_ids):
+        """
+        Forget everything a write to these accounts may have changed: their
+        balances, the reserve total and the account listing
+        """
+        with self._lock:
+            self._counters['invalidated'] += self._drop(ACCOUNTS, RESERVES) + self._drop_balances(account_ids)
+            self._generation += 1
+
+    def clear(self):
+        """Forget every entry (e.g. after reconnecting)"""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self._last_probe = 0.0
+            self._generation += 1
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters, hit ratio and the age of the entries served"""
+        with self._lock:
+            stats = dict(self._counters, entries=len(self._entries))
+            hits = stats['hits']
+            lookups = hits + stats['misses']
+            stats['hit_ratio'] = hits / lookups if lookups else 0.0
+            stats['hit_age_mean'] = self._hit_age_total / hits if hits else 0.0
+            stats['hit_age_max'] = self._hit_age_max
+        return stats
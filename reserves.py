@@ -0,0 +1,188 @@
+"""
+Striped Bank Reserves
+=====================
+The branch reserve is stored as several rows ("slots") of BankReserves
+instead of a single row. Every cash movement only locks the slot its
+account hashes to, so deposits and withdrawals on different accounts no
+longer queue behind one row lock. The branch total is the sum of its slots.
+
+Journal mode goes one step further: cash movements never touch BankReserves
+inside the customer's transaction. They append a row to the insert-only
+ReserveDeltas table, and a ReserveAggregator thread folds those deltas into
+the slots in batches. Reads add the still-pending deltas to the slot sum, so
+the reported reserve stays exact.
+"""
+
+import threading
+
+import pymysql
+
+BRANCH_ID = 1
+
+# Deltas folded per aggregator transaction / pause between roll-ups
+AGGREGATE_BATCH_SIZE = 500
+AGGREGATE_INTERVAL = 0.5
+
+
+class ReserveCounter:
+    """Reads and writes the striped reserve of one branch"""
+
+    def __init__(self, slots: int = 1, branch_id: int = BRANCH_ID, journal: bool = False):
+        if slots < 1:
+            raise ValueError("Reserve slot count must be at least 1")
+        self.slots = slots
+        self.branch_id = branch_id
+        self.journal = journal
+
+    @classmethod
+    def load(cls, cursor, branch_id: int = BRANCH_ID, journal: bool = False):
+        """
+        Build a counter matching the slot rows that exist in the database
+
+        Also sets @reserve_journal for the session so the reserve trigger
+        writes to the same place as this counter, and @reserve_explicit so the
+        trigger leaves the reserve to this counter instead of booking every
+        change a second time.
+        """
+        cursor.execute("SELECT COUNT(*) AS slots FROM BankReserves WHERE branch_id = %s", (branch_id, ))
+        slots = cursor.fetchone()['slots']
+        cursor.execute("SET @reserve_journal = %s, @reserve_explicit = 1", (1 if journal else 0, ))
+        return cls(max(slots, 1), branch_id, journal)
+
+    def slot_for(self, account_id: int) -> int:
+        """Slot that absorbs cash movements of the given account"""
+        return int(account_id) % self.slots
+
+    def lock(self, cursor, account_id: int):
+        """SELECT ... FOR UPDATE on the account's slot only (no-op in journal mode)"""
+        if self.journal:
+            return None
+        cursor.execute(
+            "SELECT total_reserve FROM BankReserves WHERE branch_id = %s AND slot_id = %s FOR UPDATE",
+            (self.branch_id, self.slot_for(account_id))
+        )
+        return cursor.fetchone()
+
+    def add(self, cursor, account_id: int, amount):
+        """Add amount (negative for withdrawals) to the account's slot"""
+        if self.journal:
+            cursor.execute(
+                "INSERT INTO ReserveDeltas (branch_id, slot_id, amount) VALUES (%s, %s, %s)",
+                (self.branch_id, self.slot_for(account_id), amount)
+            )
+            return
+        cursor.execute(
+            "UPDATE BankReserves SET total_reserve = total_reserve + %s WHERE branch_id = %s AND slot_id = %s",
+            (amount, self.branch_id, self.slot_for(account_id))
+        )
+
+    def total(self, cursor) -> float:
+        """Branch total reserve: all slots plus deltas not yet rolled up"""
+        # one statement, so both sums come from the same snapshot
+        cursor.execute(
+            "SELECT (SELECT SUM(total_reserve) FROM BankReserves WHERE branch_id = %s)"
+            " + (SELECT COALESCE(SUM(amount), 0) FROM ReserveDeltas WHERE branch_id = %s) AS total_reserve",
+            (self.branch_id, self.branch_id)
+        )
+        result = cursor.fetchone()
+        if result is None or result['total_reserve'] is None:
+            return None
+        return float(result['total_reserve'])
+
+    def reset(self, cursor, total_reserve):
+        """Recreate the branch's slot rows, placing the whole reserve in slot 0"""
+        cursor.execute("DELETE FROM ReserveDeltas WHERE branch_id = %s", (self.branch_id, ))
+        cursor.execute("DELETE FROM BankReserves WHERE branch_id = %s", (self.branch_id, ))
+        cursor.executemany(
+            "INSERT INTO BankReserves (branch_id, slot_id, total_reserve) VALUES (%s, %s, %s)",
+            [(self.branch_id, slot, total_reserve if slot == 0 else 0) for slot in range(self.slots)]
+        )
+
+
+def fold_reserve_deltas(conn, branch_id: int = BRANCH_ID, batch_size: int = AGGREGATE_BATCH_SIZE) -> int:
+    """
+    Roll up to batch_size pending deltas into their BankReserves slots
+
+    The deltas are locked, summed per slot, added to the slots and deleted in
+    one transaction, so a reader sees each delta either pending or folded,
+    never both. Returns the number of deltas folded.
+    """
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("START TRANSACTION")
+            cursor.execute(
+                "SELECT delta_id, slot_id, amount FROM ReserveDeltas WHERE branch_id = %s"
+                " ORDER BY delta_id LIMIT %s FOR UPDATE",
+                (branch_id, batch_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                conn.rollback()
+                return 0
+
+            per_slot = {}
+            for row in rows:
+                per_slot[row['slot_id']] = per_slot.get(row['slot_id'], 0) + row['amount']
+            cursor.executemany(
+                "UPDATE BankReserves SET total_reserve = total_reserve + %s WHERE branch_id = %s AND slot_id = %s",
+                [(amount, branch_id, slot) for slot, amount in sorted(per_slot.items())]
+            )
+            cursor.execute(
+                "DELETE FROM ReserveDeltas WHERE delta_id IN (" + ", ".join(["%s"] * len(rows)) + ")",
+                [row['delta_id'] for row in rows]
+            )
+        conn.commit()
+        return len(rows)
+    except Exception:
+        conn.rollback()
+        raise
+
+
+class ReserveAggregator(threading.Thread):
+    """Background thread that keeps folding ReserveDeltas into BankReserves"""
+
+    def __init__(self, connect, branch_id: int = BRANCH_ID,
+                 batch_size: int = AGGREGATE_BATCH_SIZE, interval: float = AGGREGATE_INTERVAL):
+        """
+        Args:
+            connect: callable returning a new pymysql connection
+        """
+        super().__init__(name="reserve-aggregator", daemon=True)
+        self.connect = connect
+        self.branch_id = branch_id
+        self.batch_size = batch_size
+        self.interval = interval
+        self.folded = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        conn = self.connect()
+        try:
+            # READ COMMITTED: no gap locks, so customer inserts into
+            # ReserveDeltas never wait on the roll-up
+            with conn.cursor() as cursor:
+                cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+            while not self._stop_event.is_set():
+                try:
+                    folded = fold_reserve_deltas(conn, self.branch_id, self.batch_size)
+                except pymysql.MySQLError as e:
+                    print(f"Reserve aggregator: roll-up failed, retrying: {e}")
+                    folded = 0
+                self.folded += folded
+                # keep draining while full batches come back
+                if folded < self.batch_size:
+                    self._stop_event.wait(self.interval)
+
+            # final drain so nothing is left pending after stop()
+            while True:
+                folded = fold_reserve_deltas(conn, self.branch_id, self.batch_size)
+                self.folded += folded
+                if folded == 0:
+                    break
+        finally:
+            conn.close()
+
+    def stop(self):
+        """Drain the remaining deltas and wait for the thread to exit"""
+        self._stop_event.set()
+        self.join()
@@ -0,0 +1,127 @@
+"""
+Retry Layer for Banking Operations
+==================================
+InnoDB resolves a deadlock by rolling back one of the transactions (error
+1213) and gives up on a lock after innodb_lock_wait_timeout (error 1205).
+Neither means the operation is invalid: running the whole transaction
+again usually succeeds. run_with_retry does that with bounded exponential
+backoff and full jitter, and counts what happened in a RetryStats. A lost
+optimistic write (banking_ops.VersionConflict, which names its reason in
+retry_reason) is retried the same way.
+
+Only whole operations are retried (every banking_ops write runs and rolls
+back its own transaction), never single statements.
+"""
+
+import random
+import threading
+import time
+
+import pymysql
+
+# Retryable MySQL error codes
+ER_LOCK_WAIT_TIMEOUT = 1205
+ER_LOCK_DEADLOCK = 1213
+RETRYABLE_ERRORS = {
+    ER_LOCK_DEADLOCK: 'deadlock',
+    ER_LOCK_WAIT_TIMEOUT: 'lock wait timeout'
+}
+
+# Defaults: at most 5 attempts, sleeping up to 5 ms, 10 ms, 20 ms, 40 ms
+MAX_ATTEMPTS = 5
+BASE_DELAY = 0.005
+MAX_DELAY = 0.2
+
+
+def retryable_error(error) -> str:
+    """Name of the retryable condition behind error, or None"""
+    if isinstance(error, pymysql.MySQLError) and error.args:
+        return RETRYABLE_ERRORS.get(error.args[0])
+    return getattr(error, 'retry_reason', None)
+
+
+class RetryStats:
+    """Thread-safe counters of retries and of operations that gave up"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.operations = 0
+        self.retries = 0
+        self.failures = 0               # gave up after MAX_ATTEMPTS
+        self.retries_by_operation = {}
+        self.retries_by_error = {}
+
+    def __getstate__(self):
+        # picklable (for multi-process stress runs) without the lock
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def record_retry(self, operation: str, reason: str):
+        with self._lock:
+            self.retries += 1
+            self.retries_by_operation[operation] = self.retries_by_operation.get(operation, 0) + 1
+            self.retries_by_error[reason] = self.retries_by_error.get(reason, 0) + 1
+
+    def record_operation(self, gave_up: bool = False):
+        with self._lock:
+            self.operations += 1
+            if gave_up:
+                self.failures += 1
+
+    def merge(self, other: "RetryStats"):
+        """Add another RetryStats' counts to this one"""
+        with self._lock:
+            self.operations += other.operations
+            self.retries += other.retries
+            self.failures += other.failures
+            for key, count in other.retries_by_operation.items():
+                self.retries_by_operation[key] = self.retries_by_operation.get(key, 0) + count
+            for key, count in other.retries_by_error.items():
+                self.retries_by_error[key] = self.retries_by_error.get(key, 0) + count
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                'operations': self.operations,
+                'retries': self.retries,
+                'failures': self.failures,
+                'retries_by_operation': dict(self.retries_by_operation),
+                'retries_by_error': dict(self.retries_by_error)
+            }
+
+
+def run_with_retry(func, *args, operation: str = None, stats: RetryStats = None,
+                   max_attempts: int = MAX_ATTEMPTS, base_delay: float = BASE_DELAY,
+                   max_delay: float = MAX_DELAY, **kwargs):
+    """
+    Call func(*args, **kwargs), retrying on deadlock / lock wait timeout
+    (and any other error retryable_error names)
+
+    Before attempt n+1 it sleeps a random time in
+    [0, min(max_delay, base_delay * 2**n)]. Any other exception, or a
+    retryable one on the last attempt, is re-raised unchanged.
+    """
+    operation = operation or getattr(func, '__name__', 'operation')
+    attempt = 0
+    while True:
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            reason = retryable_error(e)
+            attempt += 1
+            if reason is None or attempt >= max_attempts:
+                if stats is not None:
+                    stats.record_operation(gave_up=reason is not None)
+                raise
+            if stats is not None:
+                stats.record_retry(operation, reason)
+            time.sleep(random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1)))))
+        else:
+            if stats is not None:
+                stats.record_operation()
+            return result
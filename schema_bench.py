@@ -0,0 +1,245 @@
+"""
+Schema Benchmark
+================
+Measures the hot queries before and after the pending schema migrations.
+
+1. seeds a large data set (seed.seed_accounts + seed.seed_history) and
+   refreshes the optimizer statistics
+2. captures the EXPLAIN plan and the latency of every hot query
+3. applies the pending migrations (migrate.migrate)
+4. captures the same again and prints both side by side
+
+The queries are the ones the application issues: an account statement,
+balance-as-of replay, the Transactions tab pages, customer search, the
+verify_consistency totals, a ledger_verify chunk and the transaction count.
+A rolled-back transaction INSERT shows what the extra index columns cost
+on the write path.
+
+Seeding deletes all banking data first (see seed.py). Run it against a
+database initialized with init_db.sql and not migrated yet, otherwise both
+sides use the same schema.
+
+Example:
+    python schema_bench.py --accounts 100000 --history 50 --results schema_bench.json
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+import migrate
+import seed
+from archive import NO_BOUNDARY, SIGNED_AMOUNT
+from ledger_verify import CHUNK_SIZE, REPLAY_SQL
+from metrics import LatencyHistogram
+
+ACCOUNTS = 100000
+HISTORY = 50          # synthetic transactions per account
+REPEAT = 20           # timed runs per query
+PAGE_SIZE = 50
+STATEMENT_DAYS = 30
+
+# (name, SQL, parameter names); parameters come from sample_parameters()
+HOT_QUERIES = [
+    ('statement',
+     "SELECT transaction_id AS TransactionID, transaction_type AS Type, amount AS Amount,"
+     " created_at AS Date,"
+     f" %s + SUM({SIGNED_AMOUNT}) OVER (ORDER BY created_at, transaction_id) AS RunningBalance"
+     " FROM Transactions"
+     " WHERE account_id = %s AND created_at >= %s AND created_at < %s"
+     " ORDER BY created_at, transaction_id",
+     ('opening', 'account_id', 'start', 'end')),
+    ('balance_as_of',
+     f"SELECT COALESCE(SUM({SIGNED_AMOUNT}), 0) AS replayed FROM Transactions"
+     " WHERE account_id = %s AND transaction_id > %s AND created_at <= %s",
+     ('account_id', 'after_id', 'end')),
+    ('transactions_page',
+     "SELECT c.name AS CustomerName, t.account_id AS AccountID, t.transaction_type AS Type,"
+     " t.amount AS Amount, t.created_at AS Date, t.transaction_id AS TransactionID"
+     " FROM Transactions t"
+     " JOIN Accounts a ON t.account_id = a.account_id"
+     " JOIN Customers c ON a.customer_id = c.customer_id"
+     " ORDER BY t.created_at DESC, t.transaction_id DESC LIMIT %s",
+     ('page_size', )),
+    ('transactions_page_deep',
+     "SELECT c.name AS CustomerName, t.account_id AS AccountID, t.transaction_type AS Type,"
+     " t.amount AS Amount, t.created_at AS Date, t.transaction_id AS TransactionID"
+     " FROM Transactions t"
+     " JOIN Accounts a ON t.account_id = a.account_id"
+     " JOIN Customers c ON a.customer_id = c.customer_id"
+     " WHERE t.created_at < %s OR (t.created_at = %s AND t.transaction_id < %s)"
+     " ORDER BY t.created_at DESC, t.transaction_id DESC LIMIT %s",
+     ('page_date', 'page_date', 'page_id', 'page_size')),
+    ('customer_search',
+     "SELECT customer_id, name FROM Customers WHERE name LIKE %s ORDER BY name LIMIT %s",
+     ('name_prefix', 'page_size')),
+    ('test_accounts_total',
+     "SELECT SUM(balance) as total_accounts FROM Accounts WHERE customer_id IN"
+     " (SELECT customer_id FROM Customers WHERE name LIKE 'Test%')",
+     ()),
+    ('ledger_replay_chunk', REPLAY_SQL, ('chunk_first', 'chunk_last', 'archive_boundary')),
+    ('transaction_count', "SELECT COUNT(*) as count FROM Transactions", ()),
+]
+
+# timed, rolled back and not EXPLAINed
+INSERT_SQL = "INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, 'DEPOSIT', 1.00)"
+
+PLAN_COLUMNS = ('table', 'type', 'key', 'rows', 'filtered', 'Extra')
+
+
+def sample_parameters(cursor) -> dict:
+    """Query parameters that hit the middle of the seeded data"""
+    cursor.execute("SELECT MIN(account_id) AS first_id, MAX(account_id) AS last_id FROM Accounts")
+    accounts = cursor.fetchone()
+    account_id = (accounts['first_id'] + accounts['last_id']) // 2
+    cursor.execute("SELECT MAX(created_at) AS newest FROM Transactions")
+    end = cursor.fetchone()['newest'] + timedelta(seconds=1)
+    cursor.execute("SELECT COUNT(*) AS count FROM Transactions")
+    middle = cursor.fetchone()['count'] // 2
+    cursor.execute("SELECT created_at, transaction_id FROM Transactions"
+                   " ORDER BY created_at, transaction_id LIMIT 1 OFFSET %s", (middle, ))
+    page_key = cursor.fetchone()
+    return {
+        'opening': 0,
+        'account_id': account_id,
+        'after_id': 0,
+        'start': end - timedelta(days=STATEMENT_DAYS),
+        'end': end,
+        'page_size': PAGE_SIZE,
+        'page_date': page_key['created_at'],
+        'page_id': page_key['transaction_id'],
+        'name_prefix': f"TestUser{account_id // 10}%",
+        'chunk_first': account_id,
+        'chunk_last': account_id + CHUNK_SIZE - 1,
+        'archive_boundary': NO_BOUNDARY
+    }
+
+
+def analyze_tables(cursor):
+    """Refresh index statistics so both runs are planned from current data"""
+    cursor.execute("ANALYZE TABLE Customers, Accounts, Transactions")
+    cursor.fetchall()
+
+
+def explain(cursor, sql: str, args) -> list:
+    """EXPLAIN of one query, one dict per table access"""
+    cursor.execute("EXPLAIN " + sql, args)
+    return [{column: row.get(column) for column in PLAN_COLUMNS} for row in cursor.fetchall()]
+
+
+def time_query(cursor, sql: str, args, repeat: int) -> dict:
+    """Latency summary of repeat runs, after one untimed warm-up run"""
+    histogram = LatencyHistogram()
+    cursor.execute(sql, args)
+    cursor.fetchall()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(sql, args)
+        cursor.fetchall()
+        histogram.record(time.perf_counter() - start)
+    return histogram.summary()
+
+
+def time_insert(conn, account_id: int, repeat: int) -> dict:
+    """Latency of a transaction INSERT (index maintenance included), rolled back"""
+    histogram = LatencyHistogram()
+    with conn.cursor() as cursor:
+        for _ in range(repeat):
+            cursor.execute("START TRANSACTION")
+            start = time.perf_counter()
+            cursor.execute(INSERT_SQL, (account_id, ))
+            histogram.record(time.perf_counter() - start)
+            conn.rollback()
+    return histogram.summary()
+
+
+def run_benchmarks(conn, params: dict, repeat: int = REPEAT) -> dict:
+    """Plan and latency of every hot query, keyed by query name"""
+    results = {}
+    with conn.cursor() as cursor:
+        for name, sql, names in HOT_QUERIES:
+            # no args at all: pymysql must not %-format the LIKE 'Test%' literal
+            args = tuple(params[n] for n in names) or None
+            results[name] = {
+                'plan': explain(cursor, sql, args),
+                'latency': time_query(cursor, sql, args, repeat)
+            }
+    conn.commit()
+    results['transaction_insert'] = {'plan': [], 'latency': time_insert(conn, params['account_id'], repeat)}
+    return results
+
+
+def access_path(plan: list) -> str:
+    """Compact plan: table:type(key) per access, ' covering' when index-only"""
+    steps = []
+    for step in plan:
+        text = f"{step['table']}:{step['type']}"
+        if step['key']:
+            text += f"({step['key']})"
+        if step['Extra'] and 'Using index' in step['Extra'] and 'condition' not in step['Extra']:
+            text += " covering"
+        steps.append(text)
+    return ", ".join(steps) or "-"
+
+
+def print_comparison(before: dict, after: dict):
+    """Side-by-side p50 latency and access paths of both runs"""
+    print("\n" + "="*100)
+    print("SCHEMA BENCHMARK (p50 ms)")
+    print("="*100)
+    print(f"{'query':<24}{'before':>10}{'after':>10}{'speedup':>9}")
+    for name in before:
+        b = before[name]['latency']['p50_ms']
+        a = after[name]['latency']['p50_ms']
+        speedup = f"{b / a:.1f}x" if a > 0 else "-"
+        print(f"{name:<24}{b:>10.3f}{a:>10.3f}{speedup:>9}")
+        if before[name]['plan']:
+            print(f"    before: {access_path(before[name]['plan'])}")
+            print(f"    after:  {access_path(after[name]['plan'])}")
+    print("="*100)
+
+
+if __name__ == "__main__":
+    import test_acid
+
+    parser = argparse.ArgumentParser(description="EXPLAIN plans and timings of the hot queries before/after migrating")
+    parser.add_argument('--accounts', type=int, default=ACCOUNTS)
+    parser.add_argument('--history', type=int, default=HISTORY, help="synthetic transactions per account")
+    parser.add_argument('--repeat', type=int, default=REPEAT, help="timed runs per query")
+    parser.add_argument('--no-seed', action='store_true', help="benchmark the data already in the database")
+    parser.add_argument('--results', help="write both runs (plans and latencies) to this JSON file")
+    options = parser.parse_args()
+
+    conn = test_acid.get_connection()
+    try:
+        if not options.no_seed:
+            stats = seed.seed_accounts(conn, options.accounts, test_acid.INITIAL_BALANCE, test_acid.RESERVE_SLOTS)
+            print(f"Seeded {stats['accounts']:,} accounts in {stats['seconds']:.2f}s")
+            stats = seed.seed_history(conn, options.history)
+            print(f"Added {stats['rows']:,} history rows in {stats['seconds']:.2f}s")
+        if not migrate.pending_migrations(conn):
+            print("No pending migrations: before and after use the same schema.")
+
+        with conn.cursor() as cursor:
+            analyze_tables(cursor)
+            params = sample_parameters(cursor)
+        conn.commit()
+        version_before = migrate.schema_version(conn)
+        before = run_benchmarks(conn, params, options.repeat)
+
+        applied = migrate.migrate(conn)
+        with conn.cursor() as cursor:
+            analyze_tables(cursor)
+        conn.commit()
+        after = run_benchmarks(conn, params, options.repeat)
+    finally:
+        conn.close()
+
+    print_comparison(before, after)
+    if options.results:
+        with open(options.results, 'w') as f:
+            json.dump({'run_at': datetime.now().isoformat(), 'params': params,
+                       'schema_before': version_before, 'migrations_applied': applied,
+                       'before': before, 'after': after}, f, indent=2, default=str)
+        print(f"Results written to {options.results}")
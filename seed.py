@@ -0,0 +1,246 @@
+"""
+Bulk Seeding
+============
+Creates the test customers and accounts for large-scale benchmarks in
+seconds instead of hours.
+
+- tables are emptied with TRUNCATE (no per-row undo, AUTO_INCREMENT restarts
+  at 1) instead of DELETE
+- ids are assigned up front (customer i = account i = TestUser{i-1}), so no
+  round trip is needed to learn a lastrowid
+- rows go in as multi-row INSERTs (pymysql's executemany folds
+  INSERT ... VALUES into one statement per batch) or via LOAD DATA LOCAL
+  INFILE from generated CSV files, committed per batch
+- unique and foreign key checks are switched off for the session while
+  loading: the generated ids and tax ids are unique and consistent by
+  construction, and the checks are switched back on afterwards
+- every account gets an OPEN_ACCOUNT transaction for its opening balance, so
+  the ledger can be replayed from Transactions alone
+- seed_history adds a large synthetic transaction log for query benchmarks:
+  DEPOSIT/WITHDRAW pairs of equal amount spread over past days, so balances,
+  reserves and the ledger replay stay consistent
+
+LOAD DATA LOCAL INFILE needs `local_infile=True` on the client connection
+and `local_infile=ON` on the server.
+
+Example:
+    python seed.py --accounts 1000000 --method infile
+    python seed.py --accounts 100000 --history 50 --days 365
+"""
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pymysql
+
+from reserves import ReserveCounter
+
+EXECUTEMANY = 'executemany'
+INFILE = 'infile'
+SEED_METHODS = (EXECUTEMANY, INFILE)
+
+# Rows per INSERT statement / per commit
+BATCH_SIZE = 5000
+
+# Days of past activity generated by seed_history
+HISTORY_DAYS = 365
+
+
+# Emptied by reset_tables, where they exist (the archive tables come with migration 002).
+# BalanceSnapshots too: account and transaction ids restart at 1 after a
+# reseed, so old snapshots would match the new accounts with stale balances.
+SEED_TABLES = ('Transactions', 'TransactionsArchive', 'ArchivedBalances', 'ArchiveLog',
+               'BalanceSnapshots', 'ReserveDeltas', 'Accounts', 'Customers')
+
+
+def reset_tables(cursor):
+    """Empty the banking tables with TRUNCATE (also restarts AUTO_INCREMENT)"""
+    cursor.execute("SELECT TABLE_NAME AS name FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()")
+    existing = {row['name'].lower() for row in cursor.fetchall()}
+    # TRUNCATE refuses tables referenced by a foreign key while checks are on
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    try:
+        for table in SEED_TABLES:
+            if table.lower() in existing:
+                cursor.execute(f"TRUNCATE TABLE {table}")
+    finally:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+
+def _insert_batches(conn, cursor, num_accounts: int, initial_balance: float, batch_size: int):
+    for first in range(0, num_accounts, batch_size):
+        ids = range(first, min(first + batch_size, num_accounts))
+        cursor.executemany("INSERT INTO Customers (customer_id, name, tax_id) VALUES (%s, %s, %s)",
+                           [(i + 1, f"TestUser{i}", f"TEST{i:04d}") for i in ids])
+        cursor.executemany("INSERT INTO Accounts (account_id, customer_id, balance) VALUES (%s, %s, %s)",
+                           [(i + 1, i + 1, initial_balance) for i in ids])
+        if initial_balance > 0:
+            cursor.executemany("INSERT INTO Transactions (transaction_id, account_id, transaction_type, amount)"
+                               " VALUES (%s, %s, %s, %s)",
+                               [(i + 1, i + 1, 'OPEN_ACCOUNT', initial_balance) for i in ids])
+        conn.commit()
+
+
+def _load_infile(conn, cursor, num_accounts: int, initial_balance: float, batch_size: int):
+    """Write one CSV per table, then LOAD DATA LOCAL INFILE each (in batch_size chunks)"""
+    tables = [
+        ('Customers', '(customer_id, name, tax_id)', lambda i: (i + 1, f"TestUser{i}", f"TEST{i:04d}")),
+        ('Accounts', '(account_id, customer_id, balance)', lambda i: (i + 1, i + 1, initial_balance))
+    ]
+    if initial_balance > 0:
+        tables.append(('Transactions', '(transaction_id, account_id, transaction_type, amount)',
+                       lambda i: (i + 1, i + 1, 'OPEN_ACCOUNT', initial_balance)))
+
+    with tempfile.TemporaryDirectory(prefix='bank_seed_') as directory:
+        for table, columns, make_row in tables:
+            for first in range(0, num_accounts, batch_size):
+                path = os.path.join(directory, f"{table}_{first}.csv")
+                with open(path, 'w', newline='') as f:
+                    csv.writer(f, lineterminator='\n').writerows(
+                        make_row(i) for i in range(first, min(first + batch_size, num_accounts)))
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {table}"
+                    " FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' LINES TERMINATED BY '\\n' " + columns,
+                    (path, )
+                )
+                conn.commit()
+                os.remove(path)
+
+
+def seed_accounts(conn, num_accounts: int, initial_balance: float, reserve_slots: int = 1,
+                  method: str = EXECUTEMANY, batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Replace all banking data with num_accounts test accounts
+
+    Args:
+        conn: pymysql connection (with local_infile=True for method=INFILE)
+        reserve_slots: BankReserves slots to stripe the reserve over
+
+    Returns:
+        dict with rows inserted, elapsed seconds and rows per second
+    """
+    if method not in SEED_METHODS:
+        raise ValueError(f"Unknown seed method '{method}' (expected one of {', '.join(SEED_METHODS)})")
+
+    start = time.perf_counter()
+    try:
+        with conn.cursor() as cursor:
+            reset_tables(cursor)
+            cursor.execute("SET unique_checks = 0")
+            cursor.execute("SET foreign_key_checks = 0")
+            try:
+                if method == INFILE:
+                    _load_infile(conn, cursor, num_accounts, initial_balance, batch_size)
+                else:
+                    _insert_batches(conn, cursor, num_accounts, initial_balance, batch_size)
+            finally:
+                cursor.execute("SET unique_checks = 1")
+                cursor.execute("SET foreign_key_checks = 1")
+
+            ReserveCounter(reserve_slots).reset(cursor, num_accounts * initial_balance)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    elapsed = time.perf_counter() - start
+    rows = num_accounts * (3 if initial_balance > 0 else 2)
+    return {
+        'accounts': num_accounts,
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def seed_history(conn, transactions_per_account: int, days: int = HISTORY_DAYS,
+                 batch_size: int = BATCH_SIZE, seed: int = None) -> dict:
+    """
+    Append about transactions_per_account past transactions for every account
+
+    Each DEPOSIT is followed one second later by a WITHDRAW of the same
+    amount on the same account, so no balance changes (Accounts and
+    BankReserves are not touched). Rows are generated in time order with
+    increasing ids, spread evenly over the last `days` days.
+
+    Returns:
+        dict with rows inserted, elapsed seconds and rows per second
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) AS accounts, MIN(account_id) AS first_id, MAX(account_id) AS last_id"
+                           " FROM Accounts")
+            accounts = cursor.fetchone()
+            cursor.execute("SELECT COALESCE(MAX(transaction_id), 0) AS last_id FROM Transactions")
+            next_id = cursor.fetchone()['last_id'] + 1
+            pairs = accounts['accounts'] * (transactions_per_account // 2)
+            first_time = datetime.now().replace(microsecond=0) - timedelta(days=days)
+            step = days * 86400 / pairs if pairs else 0
+
+            cursor.execute("SET unique_checks = 0")
+            cursor.execute("SET foreign_key_checks = 0")
+            try:
+                rows = []
+                for pair in range(pairs):
+                    account_id = rng.randint(accounts['first_id'], accounts['last_id'])
+                    amount = round(rng.uniform(1, 500), 2)
+                    created_at = first_time + timedelta(seconds=int(pair * step))
+                    rows.append((next_id, account_id, 'DEPOSIT', amount, created_at))
+                    rows.append((next_id + 1, account_id, 'WITHDRAW', amount, created_at + timedelta(seconds=1)))
+                    next_id += 2
+                    if len(rows) >= batch_size or pair == pairs - 1:
+                        cursor.executemany("INSERT INTO Transactions"
+                                           " (transaction_id, account_id, transaction_type, amount, created_at)"
+                                           " VALUES (%s, %s, %s, %s, %s)", rows)
+                        conn.commit()
+                        rows = []
+            finally:
+                cursor.execute("SET unique_checks = 1")
+                cursor.execute("SET foreign_key_checks = 1")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': pairs * 2,
+        'seconds': elapsed,
+        'rows_per_second': pairs * 2 / elapsed if elapsed > 0 else 0.0
+    }
+
+
+if __name__ == "__main__":
+    import test_acid
+
+    parser = argparse.ArgumentParser(description="Bulk-create test customers and accounts")
+    parser.add_argument('--accounts', type=int, default=test_acid.NUM_ACCOUNTS)
+    parser.add_argument('--balance', type=float, default=test_acid.INITIAL_BALANCE,
+                        help="opening balance of every account")
+    parser.add_argument('--slots', type=int, default=test_acid.RESERVE_SLOTS)
+    parser.add_argument('--method', choices=SEED_METHODS, default=EXECUTEMANY)
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE, help="rows per statement / commit")
+    parser.add_argument('--history', type=int, default=0,
+                        help="synthetic past transactions per account (for query benchmarks)")
+    parser.add_argument('--days', type=int, default=HISTORY_DAYS, help="days the history is spread over")
+    options = parser.parse_args()
+
+    conn = pymysql.connect(**test_acid.DB_CONFIG, local_infile=(options.method == INFILE))
+    try:
+        stats = seed_accounts(conn, options.accounts, options.balance, options.slots,
+                              options.method, options.batch)
+        print(f"Seeded {stats['accounts']:,} accounts ({stats['rows']:,} rows) in {stats['seconds']:.2f}s "
+              f"= {stats['rows_per_second']:,.0f} rows/second")
+        if options.history > 0:
+            stats = seed_history(conn, options.history, options.days, options.batch)
+            print(f"Added {stats['rows']:,} history rows in {stats['seconds']:.2f}s "
+                  f"= {stats['rows_per_second']:,.0f} rows/second")
+    finally:
+        conn.close()
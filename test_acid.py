@@ -12,12 +12,24 @@ Learning Objectives:
 Students: Fill in the TODO sections with proper SQL queries using transactions.
 """
 
+import multiprocessing
 import pymysql
 import threading
 import time
 import random
 from typing import List
 
+import banking_ops
+import migrate
+from archive import NO_BOUNDARY, archive_boundary
+from db_pool import ConnectionPool
+from ledger_verify import print_verification, verify_ledger
+from metrics import OpTimer, StressRecorder, print_report, write_results
+from reserves import ReserveAggregator, ReserveCounter
+from retry import MAX_ATTEMPTS as RETRY_MAX_ATTEMPTS, RetryStats, run_with_retry
+from seed import seed_accounts
+from workload import AccountChooser, load_test_accounts, make_amount
+
 # Database Configuration
 DB_CONFIG = {
     'host': 'localhost',
@@ -34,282 +46,316 @@ NUM_THREADS = 20
 TRANSACTIONS_PER_THREAD = 50
 INITIAL_BALANCE = 1000.00
 
+# Which accounts workers pick and how much they move (see workload.py),
+# e.g. 'zipf:1.2' or 'hotset:0.1:0.9' to concentrate load on a few accounts
+ACCOUNT_DISTRIBUTION = 'uniform'
+TRANSFER_AMOUNTS = 'uniform:1:50'
+DEPOSIT_WITHDRAW_AMOUNTS = 'uniform:10:100'
+
+# Worker processes for run_stress_test, each running NUM_THREADS threads.
+# With 1 everything runs in this process; more keeps the client's GIL
+# (timing, random numbers, pymysql packet parsing) from capping throughput
+NUM_PROCESSES = 1
+
+# Reserve striping: BankReserves rows the branch total is split across
+RESERVE_SLOTS = 8
+
+# Reserve journal mode: workers append to ReserveDeltas and a background
+# aggregator rolls the deltas into BankReserves during the run
+RESERVE_JOURNAL = False
+
+# Reserve scaling test: every slot count is run at every thread count
+SCALING_SLOT_COUNTS = [1, 2, 4, 8, 16]
+SCALING_THREAD_COUNTS = [1, 5, 10, 20, 40]
+
+# How workers run each operation: 'client' (multi-statement transaction
+# from Python), 'procedure' (one CALL to a stored procedure),
+# 'conditional' (guarded single-statement UPDATE, no SELECT ... FOR UPDATE)
+# or 'optimistic' (unlocked read, version-checked write; needs migration 004)
+EXECUTION_MODE = banking_ops.CLIENT
+
+# Session isolation level of the workers, e.g. 'READ COMMITTED';
+# None = the server default (REPEATABLE READ)
+ISOLATION_LEVEL = None
+
+# Isolation matrix test: every workload under every isolation level and
+# locking strategy (strategy name -> execution mode)
+MATRIX_ISOLATION_LEVELS = ['READ COMMITTED', 'REPEATABLE READ', 'SERIALIZABLE']
+MATRIX_STRATEGIES = {
+    'pessimistic': banking_ops.CLIENT,
+    'optimistic': banking_ops.OPTIMISTIC,
+    'conditional': banking_ops.CONDITIONAL
+}
+MATRIX_WORKLOADS = ['transfer', 'deposit_withdraw']
+
+# Migration that adds Accounts.version (migrations/004_account_version.sql)
+OPTIMISTIC_SCHEMA_VERSION = 4
+
+# Execution mode comparison test: both workloads are run in each mode
+COMPARED_EXECUTION_MODES = [banking_ops.CLIENT, banking_ops.CONDITIONAL, banking_ops.PROCEDURE]
+
+# Transfers applied per database transaction (1 = one transfer per commit)
+TRANSFER_BATCH_SIZE = 1
+
+# Batch comparison test: transfer throughput for each batch size
+BATCH_SIZES = [1, 5, 10, 25, 50]
+
+# Write each run's latency/throughput summary here (.json or .csv); None = don't
+RESULTS_FILE = None
+
+# Connection pool: workers beyond POOL_MAX_SIZE wait up to POOL_TIMEOUT seconds
+POOL_MIN_SIZE = 2
+POOL_MAX_SIZE = 50
+POOL_TIMEOUT = 30.0
+
 
 def get_connection():
     """Create a new database connection"""
     return pymysql.connect(**DB_CONFIG)
 
 
-def setup_test_accounts():
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Connection pool shared by setup, workers and the consistency check"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(DB_CONFIG, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE,
+                                   timeout=POOL_TIMEOUT)
+        return _pool
+
+
+def set_session_isolation(conn, level: str = None):
+    """SET SESSION TRANSACTION ISOLATION LEVEL on a (pooled) connection; None restores the server default"""
+    with conn.cursor() as cursor:
+        if level is None:
+            cursor.execute("SET SESSION transaction_isolation = @@GLOBAL.transaction_isolation")
+        else:
+            cursor.execute(f"SET SESSION TRANSACTION ISOLATION LEVEL {level}")
+
+
+def setup_test_accounts(reserve_slots: int = RESERVE_SLOTS, num_accounts: int = NUM_ACCOUNTS):
     """
     Setup test accounts with initial balances
     Students: This is provided as an example
+
+    Replaces all banking data through seed.seed_accounts (TRUNCATE plus
+    multi-row INSERTs), so large account counts are quick to prepare.
+
+    Args:
+        reserve_slots: number of BankReserves slots to stripe the reserve over
+        num_accounts: number of test accounts to create
     """
-    conn = get_connection()
-    try:
-        with conn.cursor() as cursor:
-            # Clear existing test data
-            print("Setting up test accounts...")
-            cursor.execute("DELETE FROM Transactions")
-            cursor.execute("DELETE FROM Accounts")
-            cursor.execute("DELETE FROM Customers WHERE name LIKE 'Test%'")
-            cursor.execute("UPDATE BankReserves SET total_reserve = 0.00")
-            
-            # Create test customers and accounts
-            for i in range(NUM_ACCOUNTS):
-                cursor.execute(
-                    "INSERT INTO Customers (name, tax_id) VALUES (%s, %s)",
-                    (f"TestUser{i}", f"TEST{i:04d}")
-                )
-                customer_id = cursor.lastrowid
-                
-                cursor.execute(
-                    "INSERT INTO Accounts (customer_id, balance) VALUES (%s, %s)",
-                    (customer_id, INITIAL_BALANCE)
-                )
-                
-            # Initialize bank reserves
-            total_initial = NUM_ACCOUNTS * INITIAL_BALANCE
-            cursor.execute(
-                "UPDATE BankReserves SET total_reserve = %s WHERE branch_id = 1",
-                (total_initial,)
-            )
-            
-            conn.commit()
-            print(f"Created {NUM_ACCOUNTS} test accounts with ${INITIAL_BALANCE} each")
-            print(f"Total bank reserves: ${total_initial}")
-    finally:
-        conn.close()
+    print("Setting up test accounts...")
+    with get_pool().connection() as conn:
+        stats = seed_accounts(conn, num_accounts, INITIAL_BALANCE, reserve_slots)
+
+    total_initial = num_accounts * INITIAL_BALANCE
+    print(f"Created {num_accounts} test accounts with ${INITIAL_BALANCE} each "
+          f"({stats['rows_per_second']:,.0f} rows/second)")
+    print(f"Total bank reserves: ${total_initial} across {reserve_slots} slot(s)")
 
 
 def concurrent_transfer_worker(worker_id: int, results: List):
     """
     Worker thread that performs random transfers between accounts
     
-    TODO: Students must implement the transfer logic with proper transactions
+    Each transfer is one banking_ops.transfer call, either the client-side
+    multi-statement transaction or a single CALL transfer_money(...),
+    depending on EXECUTION_MODE.
     
     Learning points:
     - Without proper transaction isolation, race conditions can occur
     - Use SELECT ... FOR UPDATE to lock rows
     - Use START TRANSACTION, COMMIT, ROLLBACK
     """
-    conn = get_connection()
+    conn = get_pool().acquire()
+    set_session_isolation(conn, ISOLATION_LEVEL)
     success_count = 0
     failure_count = 0
+    rejected_count = 0
+    retry_stats = RetryStats()
+    recorder = StressRecorder()
     
     try:
+        with conn.cursor() as cursor:
+            # transfers don't change the reserve total: keep the reserve trigger out of it
+            cursor.execute("SET @reserve_explicit = 1")
+            chooser = AccountChooser(load_test_accounts(cursor), ACCOUNT_DISTRIBUTION, worker_id)
+        next_amount = make_amount(TRANSFER_AMOUNTS)
+
         for i in range(TRANSACTIONS_PER_THREAD):
-            # Random transfer between two accounts
-            from_account = random.randint(1, NUM_ACCOUNTS)
-            to_account = random.randint(1, NUM_ACCOUNTS)
-            
-            # Don't transfer to same account
-            if from_account == to_account:
-                continue
-                
-            amount = round(random.uniform(1.0, 50.0), 2)
+            # Random transfer between two different accounts
+            from_account, to_account = chooser.pick_pair()
+            amount = next_amount()
             
+            timer = OpTimer()
+            started = time.perf_counter()
             try:
-                with conn.cursor() as cursor:
-                    # TODO: Implement transfer with proper transaction
-                    # 
-                    # Steps:
-                    # 1. START TRANSACTION
-                    # 2. SELECT balance FROM Accounts WHERE account_id = from_account FOR UPDATE
-                    # 3. Check if balance >= amount
-                    # 4. SELECT balance FROM Accounts WHERE account_id = to_account FOR UPDATE
-                    # 5. UPDATE sender balance (-amount)
-                    # 6. UPDATE receiver balance (+amount)
-                    # 7. INSERT into Transactions (2 records: TRANSFER_OUT, TRANSFER_IN)
-                    # 8. COMMIT
-                    # 
-                    # If any step fails:
-                    # - ROLLBACK
-                    # - increment failure_count
-                    # 
-                    # Hints:
-                    # - Use cursor.execute("START TRANSACTION")
-                    # - Use FOR UPDATE to lock rows (prevents race conditions)
-                    # - Use try/except to catch errors and rollback
-
-                    first = min(from_account, to_account)
-                    second = max(from_account, to_account)
-                    
-                    # start transaction
-                    cursor.execute("START TRANSACTION")
-
-                    # check if the account exist
-                    cursor.execute("SELECT account_id FROM Accounts WHERE account_id IN (%s, %s)", (from_account, to_account))
-                    exist = cursor.fetchall()
-                    if (len(exist) != 2):
-                        conn.rollback()
-                        continue
-                    
-                    # lock rows
-                    cursor.execute("SELECT account_id, balance FROM Accounts WHERE account_id = %s FOR UPDATE", (first, ))
-                    row1 = cursor.fetchone()
-                    cursor.execute("SELECT account_id, balance FROM Accounts WHERE account_id = %s FOR UPDATE", (second, ))
-                    row2 = cursor.fetchone()
-
-                    # determine which account is first
-                    if from_account == first:
-                        balance = float(row1['balance'])
-                    else:
-                        balance = float(row2['balance'])
-
-                    # update tables
-                    if balance >= amount:
-                        cursor.execute("UPDATE Accounts SET balance = balance - %s WHERE account_id = %s", (amount, from_account))
-                        cursor.execute("UPDATE Accounts SET balance = balance + %s WHERE account_id = %s", (amount, to_account))
-                        cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
-                               (from_account, 'TRANSFER_OUT', amount)
-                        )
-                        cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
-                               (to_account, 'TRANSFER_IN', amount)
-                        )
-                        conn.commit()
-                        success_count += 1
-                    else:
-                        conn.rollback()
-                
+                run_with_retry(banking_ops.transfer, conn, from_account, to_account, amount,
+                               mode=EXECUTION_MODE, timer=timer, operation='transfer', stats=retry_stats)
+                success_count += 1
+            except banking_ops.BankingError:
+                # rejected by a business rule (e.g. insufficient funds), already rolled back
+                rejected_count += 1
             except Exception as e:
                 failure_count += 1
-                # Rollback is handled in your TODO implementation
-                conn.rollback()
+                continue
+            recorder.record('transfer', time.perf_counter() - started, timer.lock_wait, lock_hold=timer.lock_hold)
                 
         results.append({
             'worker_id': worker_id,
             'success': success_count,
-            'failure': failure_count
+            'failure': failure_count,
+            'rejected': rejected_count,
+            'retry_stats': retry_stats,
+            'recorder': recorder
         })
         
     finally:
-        conn.close()
+        get_pool().release(conn)
+
+
+def concurrent_batch_transfer_worker(worker_id: int, results: List, batch_size: int = TRANSFER_BATCH_SIZE):
+    """
+    Worker thread that applies its random transfers in batches
+
+    Each batch goes through banking_ops.transfer_batch: one lock statement,
+    one UPDATE, one multi-row INSERT and one commit for batch_size transfers.
+    """
+    conn = get_pool().acquire()
+    set_session_isolation(conn, ISOLATION_LEVEL)
+    success_count = 0
+    failure_count = 0
+    rejected_count = 0
+    retry_stats = RetryStats()
+    recorder = StressRecorder()
+
+    try:
+        with conn.cursor() as cursor:
+            # transfers don't change the reserve total: keep the reserve trigger out of it
+            cursor.execute("SET @reserve_explicit = 1")
+            chooser = AccountChooser(load_test_accounts(cursor), ACCOUNT_DISTRIBUTION, worker_id)
+        next_amount = make_amount(TRANSFER_AMOUNTS)
+
+        remaining = TRANSACTIONS_PER_THREAD
+        while remaining > 0:
+            batch = []
+            for i in range(min(batch_size, remaining)):
+                from_account, to_account = chooser.pick_pair()
+                batch.append((from_account, to_account, next_amount()))
+            remaining -= batch_size
+            timer = OpTimer()
+            started = time.perf_counter()
+            try:
+                outcomes = run_with_retry(banking_ops.transfer_batch, conn, batch, timer=timer,
+                                          operation='transfer_batch', stats=retry_stats)
+                success_count += outcomes.count(banking_ops.APPLIED)
+                rejected_count += len(outcomes) - outcomes.count(banking_ops.APPLIED)
+            except Exception:
+                # transfer_batch already rolled back the whole batch
+                failure_count += len(batch)
+                continue
+            recorder.record('transfer_batch', time.perf_counter() - started, timer.lock_wait, lock_hold=timer.lock_hold)
+
+        results.append({
+            'worker_id': worker_id,
+            'success': success_count,
+            'failure': failure_count,
+            'rejected': rejected_count,
+            'retry_stats': retry_stats,
+            'recorder': recorder
+        })
+
+    finally:
+        get_pool().release(conn)
 
 
 def concurrent_deposit_withdraw_worker(worker_id: int, results: List):
     """
     Worker thread that performs random deposits and withdrawals
     
-    TODO: Students must implement deposit/withdraw with proper transactions
+    Each operation is one banking_ops.deposit / banking_ops.withdraw call in
+    EXECUTION_MODE.
     
     Learning points:
     - Test atomicity: Both account balance AND bank reserves must update together
     - If one fails, the other must rollback
     """
-    conn = get_connection()
+    conn = get_pool().acquire()
+    set_session_isolation(conn, ISOLATION_LEVEL)
     success_count = 0
     failure_count = 0
+    rejected_count = 0
+    retry_stats = RetryStats()
+    recorder = StressRecorder()
     
     try:
+        with conn.cursor() as cursor:
+            reserves = ReserveCounter.load(cursor, journal=RESERVE_JOURNAL)
+            chooser = AccountChooser(load_test_accounts(cursor), ACCOUNT_DISTRIBUTION, worker_id)
+        next_amount = make_amount(DEPOSIT_WITHDRAW_AMOUNTS)
+
         for i in range(TRANSACTIONS_PER_THREAD):
-            account_id = random.randint(1, NUM_ACCOUNTS)
-            amount = round(random.uniform(10.0, 100.0), 2)
+            account_id = chooser.pick()
+            amount = next_amount()
             operation = random.choice(['deposit', 'withdraw'])
             
+            timer = OpTimer()
+            started = time.perf_counter()
             try:
-                with conn.cursor() as cursor:
-                    # TODO: Implement deposit or withdraw with proper transaction
-                    #
-                    # DEPOSIT steps:
-                    # 1. START TRANSACTION
-                    # 2. UPDATE Accounts balance (+amount)
-                    # 3. UPDATE BankReserves total_reserve (+amount)
-                    # 4. INSERT into Transactions
-                    # 5. COMMIT
-                    #
-                    # WITHDRAW steps:
-                    # 1. START TRANSACTION
-                    # 2. SELECT balance FOR UPDATE
-                    # 3. Check if balance >= amount
-                    # 4. UPDATE Accounts balance (-amount)
-                    # 5. UPDATE BankReserves total_reserve (-amount)
-                    # 6. INSERT into Transactions
-                    # 7. COMMIT
-                    #
-                    # Remember: If ANY step fails, ROLLBACK all changes!
-                    
-                    if operation == 'deposit':
-                        cursor.execute('START TRANSACTION')
-
-                        # check if the account exist
-                        cursor.execute("SELECT account_id FROM Accounts WHERE account_id = %s", (account_id, ))
-                        exist = cursor.fetchone()
-                        if (exist == None):
-                            conn.rollback()
-                            continue
-
-                        # lock rows
-                        cursor.execute("SELECT balance FROM Accounts WHERE account_id = %s FOR UPDATE", (account_id, ))
-                        cursor.execute("SELECT total_reserve FROM BankReserves WHERE branch_id = 1 FOR UPDATE")
-
-                        # update tables
-                        cursor.execute('UPDATE Accounts SET balance = balance + %s WHERE account_id = %s', (amount, account_id))
-                        cursor.execute("UPDATE BankReserves SET total_reserve = total_reserve + %s WHERE branch_id = 1", (amount, ))
-                        cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
-                               (account_id, 'DEPOSIT', amount)
-                        )
-                        conn.commit()
-            
-                    else:
-                        cursor.execute('START TRANSACTION')
-
-                        # check if the account exist
-                        cursor.execute("SELECT account_id FROM Accounts WHERE account_id = %s", (account_id, ))
-                        exist = cursor.fetchone()
-                        if (exist == None):
-                            conn.rollback()
-                            continue
-
-                        # lock row and check sufficient fund
-                        cursor.execute("SELECT total_reserve FROM BankReserves WHERE branch_id = 1 FOR UPDATE")
-                        cursor.execute("SELECT balance FROM Accounts WHERE account_id = %s FOR UPDATE", (account_id, ))
-                        balance = cursor.fetchone()['balance']
-                        if (balance < amount):
-                            conn.rollback()
-                            continue
-                        
-                        # update tables
-                        cursor.execute('UPDATE Accounts SET balance = balance - %s WHERE account_id = %s', (amount, account_id))
-                        cursor.execute("UPDATE BankReserves SET total_reserve = total_reserve - %s WHERE branch_id = 1", (amount, ))
-                        cursor.execute("INSERT INTO Transactions (account_id, transaction_type, amount) VALUES (%s, %s, %s)",
-                               (account_id, 'WITHDRAW', amount)
-                        )
-                        conn.commit()
+                func = banking_ops.deposit if operation == 'deposit' else banking_ops.withdraw
+                run_with_retry(func, conn, reserves, account_id, amount,
+                               mode=EXECUTION_MODE, timer=timer, operation=operation, stats=retry_stats)
                 success_count += 1
-                
+            except banking_ops.BankingError:
+                # rejected by a business rule (e.g. insufficient funds), already rolled back
+                rejected_count += 1
             except Exception as e:
                 failure_count += 1
-                conn.rollback()
+                continue
+            recorder.record(operation, time.perf_counter() - started, timer.lock_wait, lock_hold=timer.lock_hold)
                 
         results.append({
             'worker_id': worker_id,
             'success': success_count,
-            'failure': failure_count
+            'failure': failure_count,
+            'rejected': rejected_count,
+            'retry_stats': retry_stats,
+            'recorder': recorder
         })
         
     finally:
-        conn.close()
+        get_pool().release(conn)
 
 
-def verify_consistency():
+def verify_consistency(num_accounts: int = NUM_ACCOUNTS):
     """
     Verify ACID properties after stress test
     Students: This is provided to check your implementation
+
+    Args:
+        num_accounts: number of test accounts created by setup_test_accounts
+
+    Returns:
+        dict: 'passed' (balances match the reserves and every account matches
+        its history), the two differences and the ledger mismatch count
     """
-    conn = get_connection()
+    conn = get_pool().acquire()
     try:
         with conn.cursor() as cursor:
             # Check 1: Sum of all account balances
             cursor.execute("SELECT SUM(balance) as total_accounts FROM Accounts WHERE customer_id IN (SELECT customer_id FROM Customers WHERE name LIKE 'Test%')")
             total_accounts = float(cursor.fetchone()['total_accounts']) or 0
             
-            # Check 2: Bank reserves total
-            cursor.execute("SELECT total_reserve FROM BankReserves WHERE branch_id = 1")
-            total_reserves = float(cursor.fetchone()['total_reserve']) or 0
+            # Check 2: Bank reserves total (sum of all reserve slots)
+            total_reserves = ReserveCounter.load(cursor).total(cursor) or 0
             
             # Check 3: Expected total (should remain constant)
-            expected_total = NUM_ACCOUNTS * INITIAL_BALANCE
+            expected_total = num_accounts * INITIAL_BALANCE
             
             print("\n" + "="*60)
             print("CONSISTENCY CHECK")
@@ -321,7 +367,8 @@ def verify_consistency():
             print(f"Difference (reserves):   ${abs(expected_total - total_reserves):,.2f}")
             
             # ACID Property Check
-            if abs(total_accounts - total_reserves) < 0.01:
+            conserved = abs(total_accounts - total_reserves) < 0.01
+            if conserved:
                 print("\n✅ CONSISTENCY: PASS - Money is conserved!")
                 print("   This proves Atomicity and Consistency properties.")
             else:
@@ -332,55 +379,350 @@ def verify_consistency():
                 print("   - Partial updates (updating account but not reserves)")
                 print("   - Race conditions (not using FOR UPDATE)")
             
-            # Count transactions
-            cursor.execute("SELECT COUNT(*) as count FROM Transactions")
+            # Count transactions (live months, plus those moved to the archive)
+            boundary = archive_boundary(cursor)
+            cursor.execute("SELECT COUNT(*) as count FROM Transactions WHERE created_at >= %s", (boundary, ))
             transaction_count = cursor.fetchone()['count']
-            print(f"\nTotal transactions logged: {transaction_count}")
+            archived_count = 0
+            if boundary != NO_BOUNDARY:
+                cursor.execute("SELECT COALESCE(SUM(transactions), 0) as count FROM ArchivedBalances")
+                archived_count = cursor.fetchone()['count']
+            print(f"\nTotal transactions logged: {transaction_count + archived_count} ({archived_count} archived)")
             print("="*60)
             
     finally:
-        conn.close()
+        get_pool().release(conn)
 
+    # per-account check: every balance must match its transaction history
+    with get_pool().connection() as conn:
+        ledger = verify_ledger(conn)
+    print_verification(ledger)
+    return {
+        'passed': conserved and ledger['mismatch_count'] == 0,
+        'accounts_difference': abs(expected_total - total_accounts),
+        'reserves_difference': abs(expected_total - total_reserves),
+        'ledger_mismatches': ledger['mismatch_count']
+    }
 
-def run_stress_test(test_type: str):
-    """
-    Run concurrent stress test
-    
-    Args:
-        test_type: 'transfer' or 'deposit_withdraw'
-    """
-    print(f"\n{'='*60}")
-    print(f"Running {test_type.upper()} stress test")
-    print(f"Threads: {NUM_THREADS}, Transactions per thread: {TRANSACTIONS_PER_THREAD}")
-    print(f"{'='*60}\n")
-    
+
+def run_worker_threads(test_type: str, num_threads: int, batch_size: int, first_worker_id: int = 0) -> List:
+    """Start num_threads workers of the given test type and return their results"""
     threads = []
     results = []
     
     # Choose worker function
     worker_func = concurrent_transfer_worker if test_type == 'transfer' else concurrent_deposit_withdraw_worker
+    worker_args = ()
+    if test_type == 'transfer' and batch_size > 1:
+        worker_func = concurrent_batch_transfer_worker
+        worker_args = (batch_size, )
     
     # Start all threads
-    start_time = time.time()
-    for i in range(NUM_THREADS):
-        t = threading.Thread(target=worker_func, args=(i, results))
+    for i in range(first_worker_id, first_worker_id + num_threads):
+        t = threading.Thread(target=worker_func, args=(i, results) + worker_args)
         threads.append(t)
         t.start()
     
     # Wait for all threads to complete
     for t in threads:
         t.join()
+    return results
+
+
+def run_worker_process(test_type: str, num_threads: int, batch_size: int, first_worker_id: int, pipe,
+                       execution_mode: str = EXECUTION_MODE, isolation_level: str = ISOLATION_LEVEL):
+    """
+    Entry point of one load process in multi-process mode
+
+    Runs its own worker threads over its own connection pool and sends
+    their results (counters, RetryStats, StressRecorder) and the pool stats
+    back through pipe. The parent merges them exactly like the results of
+    local threads. execution_mode and isolation_level are the parent's
+    EXECUTION_MODE and ISOLATION_LEVEL (a spawned process starts from the
+    module defaults).
+    """
+    global EXECUTION_MODE, ISOLATION_LEVEL
+    EXECUTION_MODE = execution_mode
+    ISOLATION_LEVEL = isolation_level
+    try:
+        results = run_worker_threads(test_type, num_threads, batch_size, first_worker_id)
+        pipe.send((results, get_pool().stats()))
+    finally:
+        pipe.close()
+        get_pool().close()
+
+
+def combine_pool_stats(stats: List[dict]) -> dict:
+    """Add up ConnectionPool.stats() snapshots of several processes"""
+    combined = {key: sum(s[key] for s in stats)
+                for key in ('size', 'idle', 'checkouts', 'exhausted', 'timeouts', 'created', 'recycled', 'dead')}
+    total_wait = sum(s['avg_wait_ms'] * s['checkouts'] for s in stats)
+    combined['avg_wait_ms'] = total_wait / combined['checkouts'] if combined['checkouts'] else 0.0
+    combined['max_wait_ms'] = max(s['max_wait_ms'] for s in stats)
+    return combined
+
+
+def run_stress_test(test_type: str, num_threads: int = NUM_THREADS, batch_size: int = TRANSFER_BATCH_SIZE,
+                    num_processes: int = NUM_PROCESSES):
+    """
+    Run concurrent stress test
+    
+    Args:
+        test_type: 'transfer' or 'deposit_withdraw'
+        num_threads: number of concurrent worker threads (per process)
+        batch_size: transfers per database transaction (transfer test only)
+        num_processes: worker processes, each running num_threads threads
+
+    Returns:
+        dict with elapsed time, success/failure counts and throughput
+    """
+    print(f"\n{'='*60}")
+    print(f"Running {test_type.upper()} stress test")
+    print(f"Processes: {num_processes}, Threads per process: {num_threads}, "
+          f"Transactions per thread: {TRANSACTIONS_PER_THREAD}")
+    if test_type == 'transfer':
+        print(f"Transfers per database transaction: {batch_size}")
+    print(f"Account distribution: {ACCOUNT_DISTRIBUTION}")
+    print(f"Execution mode: {EXECUTION_MODE}, Reserve journal mode: {'on' if RESERVE_JOURNAL else 'off'}")
+    print(f"Isolation level: {ISOLATION_LEVEL or 'server default'}")
+    print(f"{'='*60}\n")
+
+    aggregator = None
+    if RESERVE_JOURNAL:
+        aggregator = ReserveAggregator(get_connection)
+        aggregator.start()
     
-    elapsed_time = time.time() - start_time
+    start_time = time.time()
+    if num_processes > 1:
+        # fresh interpreters (no inherited sockets); each sends its results over a pipe
+        context = multiprocessing.get_context('spawn')
+        processes = []
+        pipes = []
+        for p in range(num_processes):
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=run_worker_process,
+                                      args=(test_type, num_threads, batch_size, p * num_threads, sender,
+                                            EXECUTION_MODE, ISOLATION_LEVEL))
+            process.start()
+            sender.close()      # so recv() raises EOFError if the child dies
+            processes.append(process)
+            pipes.append(receiver)
+        per_process = [receiver.recv() for receiver in pipes]
+        for process in processes:
+            process.join()
+        results = [r for process_results, _ in per_process for r in process_results]
+        pool_stats = combine_pool_stats([process_pool for _, process_pool in per_process])
+    else:
+        results = run_worker_threads(test_type, num_threads, batch_size)
+        pool_stats = None
+    end_time = time.time()
+    elapsed_time = end_time - start_time
+
+    # fold whatever is still pending so the consistency check sees settled slots
+    if aggregator is not None:
+        aggregator.stop()
+        print(f"Reserve aggregator folded {aggregator.folded} deltas")
+
+    if pool_stats is None:
+        pool_stats = get_pool().stats()
     
     # Summarize results
     total_success = sum(r['success'] for r in results)
     total_failure = sum(r['failure'] for r in results)
+    total_rejected = sum(r['rejected'] for r in results)
+    retry_stats = RetryStats()
+    for r in results:
+        retry_stats.merge(r['retry_stats'])
+    retries = retry_stats.summary()
+    recorder = StressRecorder()
+    for r in results:
+        recorder.merge(r['recorder'])
+    latency = recorder.report(start_time, end_time)
     
     print(f"\nCompleted in {elapsed_time:.2f} seconds")
     print(f"Successful transactions: {total_success}")
+    print(f"Rejected by business rules (e.g. insufficient funds): {total_rejected}")
     print(f"Failed transactions: {total_failure}")
-    print(f"Success rate: {(total_success / (total_success + total_failure) * 100):.1f}%")
+    print(f"  of which gave up after {RETRY_MAX_ATTEMPTS} attempts on deadlock/lock wait: {retries['failures']}")
+    attempted = total_success + total_failure
+    print(f"Success rate: {(total_success / attempted * 100 if attempted else 0.0):.1f}% (excluding rejections)")
+    print(f"Retries (deadlock / lock wait timeout): {retries['retries']}")
+    for operation, count in sorted(retries['retries_by_operation'].items()):
+        print(f"  {operation}: {count} retries")
+    for reason, count in sorted(retries['retries_by_error'].items()):
+        print(f"  {reason}: {count}")
+    throughput = total_success / elapsed_time if elapsed_time > 0 else 0.0
+    print(f"Throughput: {throughput:.1f} committed transactions/second")
+    print(f"Connection pool: {pool_stats['size']} open, {pool_stats['checkouts']} checkouts, "
+          f"avg wait {pool_stats['avg_wait_ms']:.2f} ms, max wait {pool_stats['max_wait_ms']:.2f} ms, "
+          f"exhausted {pool_stats['exhausted']}, timeouts {pool_stats['timeouts']}")
+    print_report(latency)
+
+    summary = {
+        'run_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(start_time)),
+        'test_type': test_type,
+        'threads': num_threads * num_processes,
+        'processes': num_processes,
+        'execution_mode': EXECUTION_MODE,
+        'isolation_level': ISOLATION_LEVEL,
+        'distribution': ACCOUNT_DISTRIBUTION,
+        'batch_size': batch_size,
+        'elapsed': elapsed_time,
+        'success': total_success,
+        'failure': total_failure,
+        'rejected': total_rejected,
+        'retries': retries,
+        'throughput': throughput,
+        'pool': pool_stats,
+        'latency': latency
+    }
+    if RESULTS_FILE:
+        write_results(RESULTS_FILE, summary)
+        print(f"Results written to {RESULTS_FILE}")
+    return summary
+
+
+def run_reserve_scaling_test(slot_counts: List[int] = SCALING_SLOT_COUNTS,
+                             thread_counts: List[int] = SCALING_THREAD_COUNTS):
+    """
+    Measure deposit/withdraw throughput as reserve slots and threads change
+
+    With a single slot every deposit and withdrawal queues on one BankReserves
+    row lock, so throughput stays flat as threads are added. With more slots
+    the lock is split and throughput should grow with the thread count.
+    """
+    table = {}
+    for slots in slot_counts:
+        for threads in thread_counts:
+            setup_test_accounts(reserve_slots=slots)
+            summary = run_stress_test('deposit_withdraw', num_threads=threads)
+            table[(slots, threads)] = summary['throughput']
+
+    print("\n" + "="*60)
+    print("RESERVE STRIPING SCALING (committed transactions/second)")
+    print("="*60)
+    print(f"{'slots':>8}" + "".join(f"{f'{t} thr':>10}" for t in thread_counts))
+    for slots in slot_counts:
+        print(f"{slots:>8}" + "".join(f"{table[(slots, t)]:>10.1f}" for t in thread_counts))
+    print("="*60)
+    return table
+
+
+def run_batch_size_test(batch_sizes: List[int] = BATCH_SIZES):
+    """
+    Measure transfer throughput for each transfers-per-transaction batch size
+
+    Batching pays the lock round trip and the commit once per batch instead
+    of once per transfer.
+    """
+    table = {}
+    for batch_size in batch_sizes:
+        setup_test_accounts()
+        summary = run_stress_test('transfer', batch_size=batch_size)
+        table[batch_size] = summary['throughput']
+        verify_consistency()
+
+    print("\n" + "="*60)
+    print("TRANSFER BATCHING (applied transfers/second)")
+    print("="*60)
+    for batch_size in batch_sizes:
+        speedup = table[batch_size] / table[batch_sizes[0]] if table[batch_sizes[0]] else 0.0
+        print(f"batch {batch_size:>4}: {table[batch_size]:>10.1f}  ({speedup:.2f}x)")
+    print("="*60)
+    return table
+
+
+def run_execution_mode_test(modes: List[str] = COMPARED_EXECUTION_MODES):
+    """
+    Run the transfer and deposit/withdraw workloads in each execution mode
+
+    Compares throughput, p99 latency, and how long the row locks are waited
+    for and held. The conditional mode takes its locks in the UPDATE itself,
+    so it should hold them for less time than the client mode's
+    SELECT ... FOR UPDATE, check, UPDATE round trips. The procedure mode's
+    locks live inside its CALL, so they are not timed (shown as -).
+    """
+    global EXECUTION_MODE
+    default_mode = EXECUTION_MODE
+    table = {}
+    try:
+        for mode in modes:
+            EXECUTION_MODE = mode
+            for test_type in ['transfer', 'deposit_withdraw']:
+                setup_test_accounts()
+                summary = run_stress_test(test_type)
+                verify_consistency()
+                table[(mode, test_type)] = summary
+    finally:
+        EXECUTION_MODE = default_mode
+
+    print("\n" + "="*84)
+    print("EXECUTION MODES (lock wait / hold = mean ms from the first lock to commit)")
+    print("="*84)
+    print(f"{'mode':<13}{'operation':<12}{'tx/s':>10}{'p99 ms':>10}{'wait ms':>10}{'hold ms':>10}{'hold p99':>10}"
+          f"{'retries':>9}")
+    for mode in modes:
+        for test_type in ['transfer', 'deposit_withdraw']:
+            summary = table[(mode, test_type)]
+            for operation, s in summary['latency']['operations'].items():
+                if mode == banking_ops.PROCEDURE:
+                    locks = f"{'-':>10}{'-':>10}{'-':>10}"
+                else:
+                    locks = f"{s['lock_wait_mean_ms']:>10.2f}{s['lock_hold_mean_ms']:>10.2f}{s['lock_hold_p99_ms']:>10.2f}"
+                retries = summary['retries']['retries_by_operation'].get(operation, 0)
+                print(f"{mode:<13}{operation:<12}{summary['throughput']:>10.1f}{s['p99_ms']:>10.2f}{locks}{retries:>9}")
+    print("="*84)
+    return table
+
+
+def run_isolation_matrix_test(isolation_levels: List[str] = MATRIX_ISOLATION_LEVELS,
+                              strategies: dict = MATRIX_STRATEGIES, workloads: List[str] = MATRIX_WORKLOADS):
+    """
+    Run every workload under every isolation level and locking strategy
+
+    Each cell starts from fresh test accounts and records throughput, p99
+    latency of the slowest operation, deadlocks, other retries (lock wait
+    timeouts, optimistic version conflicts), operations that gave up, and
+    whether verify_consistency passed. The optimistic strategy needs the
+    Accounts.version column of migration 004 (python migrate.py).
+    """
+    global EXECUTION_MODE, ISOLATION_LEVEL
+    if banking_ops.OPTIMISTIC in strategies.values():
+        with get_pool().connection() as conn:
+            if migrate.schema_version(conn) < OPTIMISTIC_SCHEMA_VERSION:
+                raise RuntimeError("The optimistic strategy needs Accounts.version: run python migrate.py first")
+    defaults = (EXECUTION_MODE, ISOLATION_LEVEL)
+    table = {}
+    try:
+        for level in isolation_levels:
+            for strategy, mode in strategies.items():
+                EXECUTION_MODE, ISOLATION_LEVEL = mode, level
+                for workload in workloads:
+                    setup_test_accounts()
+                    summary = run_stress_test(workload)
+                    table[(level, strategy, workload)] = dict(summary, consistency=verify_consistency())
+    finally:
+        EXECUTION_MODE, ISOLATION_LEVEL = defaults
+
+    print("\n" + "="*98)
+    print("ISOLATION LEVEL x LOCKING STRATEGY")
+    print("="*98)
+    print(f"{'isolation':<18}{'strategy':<13}{'workload':<18}{'tx/s':>9}{'p99 ms':>9}{'deadlock':>9}"
+          f"{'retries':>9}{'gave up':>9}  consistent")
+    for level in isolation_levels:
+        for strategy in strategies:
+            for workload in workloads:
+                summary = table[(level, strategy, workload)]
+                retries = summary['retries']
+                deadlocks = retries['retries_by_error'].get('deadlock', 0)
+                p99 = max((s['p99_ms'] for s in summary['latency']['operations'].values()), default=0.0)
+                verdict = "PASS" if summary['consistency']['passed'] else "FAIL"
+                print(f"{level:<18}{strategy:<13}{workload:<18}{summary['throughput']:>9.1f}{p99:>9.2f}"
+                      f"{deadlocks:>9}{retries['retries'] - deadlocks:>9}{retries['failures']:>9}  {verdict}")
+    print("="*98)
+    print("(retries = lock wait timeouts and version conflicts; gave up = still failing after "
+          f"{RETRY_MAX_ATTEMPTS} attempts)")
+    return table
 
 
 if __name__ == "__main__":
@@ -401,8 +743,12 @@ if __name__ == "__main__":
     print("1. Transfer test (concurrent transfers between accounts)")
     print("2. Deposit/Withdraw test (concurrent deposits and withdrawals)")
     print("3. Both")
+    print("4. Reserve striping scaling (deposit/withdraw throughput per slot and thread count)")
+    print("5. Transfer batching (transfer throughput per batch size)")
+    print("6. Execution modes (client vs. conditional update vs. procedure, with lock hold times)")
+    print("7. Isolation matrix (every isolation level x locking strategy, both workloads)")
     
-    choice = input("\nEnter choice (1-3): ").strip()
+    choice = input("\nEnter choice (1-7): ").strip()
     
     if choice in ['1', '3']:
         run_stress_test('transfer')
@@ -413,6 +759,19 @@ if __name__ == "__main__":
             setup_test_accounts()  # Reset for second test
         run_stress_test('deposit_withdraw')
         verify_consistency()
+
+    if choice == '4':
+        run_reserve_scaling_test()
+        verify_consistency()
+
+    if choice == '5':
+        run_batch_size_test()
+
+    if choice == '6':
+        run_execution_mode_test()
+
+    if choice == '7':
+        run_isolation_matrix_test()
     
     print("\n" + "="*60)
     print("LEARNING POINTS:")
@@ -0,0 +1,128 @@
+"""
+Workload Distributions
+======================
+How the stress harness picks accounts and amounts.
+
+Uniform account selection spreads load evenly and hides lock contention.
+Real traffic concentrates on a few merchant and payroll accounts, so the
+choosers here can skew it:
+
+- uniform              every account equally likely
+- zipf:S               Zipfian with exponent S (rank r has weight 1/r^S);
+                       the lowest account ids are the hottest
+- hotset:F:P           the first fraction F of the accounts gets share P
+                       of the accesses, the rest share 1-P uniformly
+- sequential           walk the accounts in order (each worker starts at
+                       its own offset)
+
+Amount distributions:
+
+- uniform:LO:HI        uniform between LO and HI
+- fixed:A              always A
+- exponential:MEAN     many small amounts, a few large ones
+- lognormal:MU:SIGMA   log-normal, e.g. lognormal:3:1 (median ~$20)
+"""
+
+import bisect
+import itertools
+import random
+
+ACCOUNT_DISTRIBUTIONS = ('uniform', 'zipf', 'hotset', 'sequential')
+AMOUNT_DISTRIBUTIONS = ('uniform', 'fixed', 'exponential', 'lognormal')
+
+# Smallest amount a distribution may produce (amounts must be positive)
+MIN_AMOUNT = 0.01
+
+
+def load_test_accounts(cursor) -> list:
+    """Account ids of the accounts created by test_acid.setup_test_accounts"""
+    cursor.execute(
+        "SELECT a.account_id FROM Accounts a JOIN Customers c ON c.customer_id = a.customer_id"
+        " WHERE c.name LIKE 'Test%' ORDER BY a.account_id"
+    )
+    return [row['account_id'] for row in cursor.fetchall()]
+
+
+def _parse_spec(spec: str, kinds, what: str):
+    """'zipf:1.1' -> ('zipf', [1.1])"""
+    name, *params = spec.strip().split(':')
+    if name not in kinds:
+        raise ValueError(f"Unknown {what} distribution '{name}' (expected one of {', '.join(kinds)})")
+    try:
+        return name, [float(p) for p in params]
+    except ValueError:
+        raise ValueError(f"Invalid parameters in {what} distribution '{spec}'")
+
+
+class AccountChooser:
+    """Picks account ids from a fixed list according to a distribution"""
+
+    def __init__(self, accounts: list, spec: str = 'uniform', worker_id: int = 0):
+        if not accounts:
+            raise ValueError("AccountChooser needs at least one account")
+        self.accounts = list(accounts)
+        self.spec = spec
+        name, params = _parse_spec(spec, ACCOUNT_DISTRIBUTIONS, 'account')
+        n = len(self.accounts)
+        self._cumulative = None
+        self._sequence = None
+
+        if name == 'zipf':
+            exponent = params[0] if params else 1.0
+            if exponent < 0:
+                raise ValueError("Zipf exponent must not be negative")
+            self._cumulative = list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, n + 1)))
+        elif name == 'hotset':
+            hot_fraction = params[0] if params else 0.1
+            hot_share = params[1] if len(params) > 1 else 0.9
+            if not 0 < hot_fraction <= 1 or not 0 <= hot_share <= 1:
+                raise ValueError("hotset needs 0 < fraction <= 1 and 0 <= share <= 1")
+            hot = max(1, round(n * hot_fraction))
+            cold = n - hot
+            hot_weight = hot_share / hot
+            cold_weight = (1 - hot_share) / cold if cold else 0.0
+            self._cumulative = list(itertools.accumulate(
+                hot_weight if i < hot else cold_weight for i in range(n)))
+        elif name == 'sequential':
+            start = worker_id % n
+            self._sequence = itertools.cycle(self.accounts[start:] + self.accounts[:start])
+
+    def pick(self) -> int:
+        if self._sequence is not None:
+            return next(self._sequence)
+        if self._cumulative is not None:
+            point = random.random() * self._cumulative[-1]
+            return self.accounts[min(bisect.bisect_right(self._cumulative, point), len(self.accounts) - 1)]
+        return random.choice(self.accounts)
+
+    def pick_pair(self) -> tuple:
+        """Two different accounts, each drawn from the distribution"""
+        if len(self.accounts) < 2:
+            raise ValueError("A transfer needs at least two accounts")
+        first = self.pick()
+        for _ in range(16):
+            second = self.pick()
+            if second != first:
+                return first, second
+        # extremely skewed: fall back to any other account
+        return first, random.choice([a for a in self.accounts if a != first])
+
+
+def make_amount(spec: str):
+    """Callable returning a random amount (rounded to cents) per the spec"""
+    name, params = _parse_spec(spec, AMOUNT_DISTRIBUTIONS, 'amount')
+    if name == 'uniform':
+        low = params[0] if params else 1.0
+        high = params[1] if len(params) > 1 else 50.0
+        draw = lambda: random.uniform(low, high)
+    elif name == 'fixed':
+        value = params[0] if params else 25.0
+        draw = lambda: value
+    elif name == 'exponential':
+        mean = params[0] if params else 25.0
+        draw = lambda: random.expovariate(1.0 / mean)
+    else:
+        mu = params[0] if params else 3.0
+        sigma = params[1] if len(params) > 1 else 1.0
+        draw = lambda: random.lognormvariate(mu, sigma)
+    return lambda: max(round(draw(), 2), MIN_AMOUNT)